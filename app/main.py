@@ -1,11 +1,35 @@
+import asyncio
+import json
 import logging
+import os
 
-from fastapi import FastAPI, HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pathlib import Path
 from platformdirs import user_data_dir
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, Literal, Optional, Tuple
 
 from .schemas import ChannelTranscriptionRequest
-from video_to_text.core import run_transcription
+from video_to_text.backends import get_backend
+from video_to_text.config import get_youtube_api_key
+from video_to_text.constants import (BACKEND_ENV, DB_NAME, DEFAULT_BACKEND, DEFAULT_FAST_MODEL, DEFAULT_MAX_JOBS,
+                                     DEFAULT_MODEL_POLICY, DEFAULT_MODEL_SIZE, MAX_JOBS_ENV, MODEL_POLICIES,
+                                     STREAM_RETRY_AFTER_SECONDS, TRANSCRIBER_BACKENDS, WARMUP_MODELS_ENV)
+from video_to_text.core import run_transcription, stream_transcription
+from video_to_text.crawler import ChannelCrawler
+from video_to_text.database import init_db, search_transcripts
+from video_to_text.exceptions import JobsBusy, YouTubeAPIException
+from video_to_text.get_yt_videos import get_channel_id
+from video_to_text.jobs import JobManager
+from video_to_text.long_audio import close_parallel_transcribers
+from video_to_text.metadata_cache import MetadataCache
+from video_to_text.metrics import get_metrics
+from video_to_text.model_policy import get_model_policy
+from video_to_text.model_registry import get_registry
+from video_to_text.utils import load_env
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,27 +39,192 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    load_env()
+    # Fail at startup rather than on the first request needing the YouTube API
+    get_youtube_api_key()
+
+    # Comma separated list of model sizes to load before serving requests, "" disables warmup
+    warmup_models = [m.strip() for m in os.getenv(WARMUP_MODELS_ENV, DEFAULT_MODEL_SIZE).split(",") if m.strip()]
+    if warmup_models and get_backend(default_backend()).capabilities.needs_model:
+        get_registry().warmup(warmup_models)
+
+    app.state.jobs = JobManager(run=run_transcription, max_jobs=int(os.getenv(MAX_JOBS_ENV, DEFAULT_MAX_JOBS)))
+    yield
+    app.state.jobs.shutdown()
+    close_parallel_transcribers()
+    get_registry().clear()
+
+app = FastAPI(lifespan=lifespan)
+
+def default_backend() -> str:
+    # Backend of the requests that don't name one, e.g. fake to benchmark the API without model weights
+    backend = os.getenv(BACKEND_ENV, DEFAULT_BACKEND)
+    if backend not in TRANSCRIBER_BACKENDS:
+        raise ValueError(f"{BACKEND_ENV} must be one of {', '.join(TRANSCRIBER_BACKENDS)}, got '{backend}'")
+    return backend
 
 OUTPUT_DIR = Path(user_data_dir(appname="video-to-text"))
 
-@app.post("/transcribe/channel")
-def transcribe_channel(payload: ChannelTranscriptionRequest):
-    try:
-        video_data = run_transcription(
+@app.post("/transcribe/channel", status_code=202)
+def transcribe_channel(payload: ChannelTranscriptionRequest, request: Request):
+    job = request.app.state.jobs.submit(
                         channel_name=payload.channel_name,
+                        video_id=None,
                         output_dir=Path(OUTPUT_DIR),
                         max_videos=payload.max_videos,
                         min_duration=payload.min_duration,
                         max_duration=payload.max_duration,
                         start_date=payload.start_date,
                         end_date=payload.end_date,
-                        save_as_text=payload.save_as_text
+                        save_as_text=payload.save_as_text,
+                        model_size=payload.model_size,
+                        download_workers=payload.download_workers,
+                        transcribe_workers=payload.transcribe_workers,
+                        prefetch=payload.prefetch,
+                        incremental=payload.incremental,
+                        audio_format=payload.audio_format,
+                        stream=payload.stream,
+                        chunk_workers=payload.chunk_workers,
+                        batch_size=payload.batch_size,
+                        backend=payload.backend or default_backend(),
+                        model_policy=get_model_policy(payload.model_policy, fast_model=payload.fast_model,
+                                                      cpu_budget=payload.cpu_budget),
+                        refresh=payload.refresh
                     )
-        logger.info(f"Successfully transcribed {len(video_data)} video(s) located at {OUTPUT_DIR}")
-        return {"transcriptions": video_data}
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/jobs")
+def list_jobs(request: Request):
+    return {"jobs": [job.to_dict() for job in request.app.state.jobs.list()]}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, request: Request):
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+@app.delete("/jobs/{job_id}", status_code=202)
+def cancel_job(job_id: str, request: Request):
+    job = request.app.state.jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+@app.get("/transcribe/video/{video_id}/stream")
+def transcribe_video_stream(video_id: str,
+                            request: Request,
+                            model_size: str = DEFAULT_MODEL_SIZE,
+                            stream: bool = False,
+                            batch_size: int = Query(default=0, ge=0),
+                            backend: Optional[Literal[TRANSCRIBER_BACKENDS]] = None,
+                            model_policy: Literal[MODEL_POLICIES] = DEFAULT_MODEL_POLICY,
+                            fast_model: str = DEFAULT_FAST_MODEL,
+                            cpu_budget: Optional[float] = Query(default=None, gt=0),
+                            format: Literal["sse", "ndjson"] = "sse"):
+    events = stream_transcription(video_id=video_id,
+                                  output_dir=Path(OUTPUT_DIR),
+                                  model_size=model_size,
+                                  stream=stream,
+                                  batch_size=batch_size,
+                                  backend=backend or default_backend(),
+                                  model_policy=get_model_policy(model_policy, fast_model=fast_model,
+                                                                cpu_budget=cpu_budget),
+                                  # Streams share max_jobs with the queued jobs, but are refused instead of queued
+                                  slot=request.app.state.jobs.slot(blocking=False))
+    try:
+        # Look the video up before the response starts, so an unknown video is still a 404
+        first = next(events)
+    except YouTubeAPIException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except JobsBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(STREAM_RETRY_AFTER_SECONDS)})
 
+    encode = encode_sse if format == "sse" else encode_ndjson
+
+    return StreamingResponse(encode_events(first, events, encode, request),
+                             media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+                             # Keep reverse proxies from buffering the stream
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def encode_events(first: Tuple[str, Dict],
+                        events: Iterator[Tuple[str, Dict]],
+                        encode,
+                        request: Request) -> AsyncIterator[str]:
+    # Transcription blocks, so the events are produced in a thread of their own
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        yield encode(*first)
+        while not await request.is_disconnected():
+            item = await asyncio.wrap_future(executor.submit(next, events, None))
+            if item is None:
+                return
+            yield encode(*item)
+        logger.info("Client disconnected, stopping the transcription stream")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        # The response has already started, so errors are reported as a final event instead of a status code
+        logger.exception("Streaming transcription failed")
+        yield encode("error", {"detail": str(e)})
+    finally:
+        # Closing the events releases the job slot right away instead of whenever they are garbage collected.
+        # The thread runs it after the event it may still be producing
+        executor.submit(events.close)
+        executor.shutdown(wait=False)
+
+def encode_sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def encode_ndjson(event: str, data: Dict) -> str:
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+@app.get("/channels/{channel_name}/videos")
+async def list_videos(channel_name: str,
+                      max_videos: int = Query(default=50, ge=1),
+                      min_duration: Optional[int] = Query(default=None, ge=0),
+                      max_duration: Optional[int] = Query(default=None, gt=0),
+                      start_date: Optional[datetime] = None,
+                      end_date: Optional[datetime] = None):
+    # The YouTube client and SQLite are blocking, so they run in worker threads and the event loop stays free
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    db_file = OUTPUT_DIR / DB_NAME
+    await asyncio.to_thread(init_db, db_file)
+    cache = MetadataCache(db_file=db_file)
+
+    try:
+        channel_id = await asyncio.to_thread(get_channel_id, channel_name, get_youtube_api_key(), cache=cache)
+    except YouTubeAPIException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    crawler = ChannelCrawler(channel_id=channel_id,
+                             api_key=get_youtube_api_key(),
+                             max_num_of_videos=max_videos,
+                             min_duration=min_duration,
+                             max_duration=max_duration,
+                             start_date=start_date,
+                             end_date=end_date,
+                             cache=cache)
+
+    async def videos() -> AsyncIterator[str]:
+        try:
+            async for video in crawler:
+                yield encode_ndjson("video", video)
+        except Exception as e:
+            logger.exception("Listing channel videos failed")
+            yield encode_ndjson("error", {"detail": str(e)})
+
+    return StreamingResponse(videos(), media_type="application/x-ndjson")
 
+@app.get("/search")
+def search(q: str = Query(min_length=1), limit: int = Query(default=10, ge=1, le=100)):
+    db_file = OUTPUT_DIR / DB_NAME
+    if not db_file.exists():
+        return {"results": []}
 
+    return {"results": search_transcripts(db_file=db_file, query=q, limit=limit)}
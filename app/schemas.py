@@ -1,7 +1,11 @@
-from pydantic import BaseModel, conint, HttpUrl, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, confloat, conint, HttpUrl, ConfigDict, model_validator
+from typing import Literal, Optional
 from datetime import datetime
 
+from video_to_text.constants import (AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT, DEFAULT_DOWNLOAD_WORKERS,
+                                     DEFAULT_FAST_MODEL, DEFAULT_MODEL_POLICY, DEFAULT_MODEL_SIZE, DEFAULT_PREFETCH,
+                                     DEFAULT_TRANSCRIBE_WORKERS, MODEL_POLICIES, TRANSCRIBER_BACKENDS)
+
 # ----- Channel transcription -----
 class ChannelTranscriptionRequest(BaseModel):
     channel_name: str
@@ -11,6 +15,30 @@ class ChannelTranscriptionRequest(BaseModel):
     min_duration: Optional[conint(ge=0)] = None
     max_duration: Optional[conint(gt=0)] = None
     save_as_text: Optional[bool] = False
+    model_size: str = DEFAULT_MODEL_SIZE
+    download_workers: conint(ge=1) = DEFAULT_DOWNLOAD_WORKERS
+    transcribe_workers: conint(ge=1) = DEFAULT_TRANSCRIBE_WORKERS
+    prefetch: conint(ge=0) = DEFAULT_PREFETCH
+    incremental: bool = False
+    audio_format: Literal[AUDIO_FORMATS] = DEFAULT_AUDIO_FORMAT
+    stream: bool = False
+    # Processes long videos are split across, values below 2 disable chunking
+    chunk_workers: conint(ge=0) = 0
+    batch_size: conint(ge=0) = 0
+    # The server's default backend when not provided
+    backend: Optional[Literal[TRANSCRIBER_BACKENDS]] = None
+    model_policy: Literal[MODEL_POLICIES] = DEFAULT_MODEL_POLICY
+    fast_model: str = DEFAULT_FAST_MODEL
+    # Only used by the adaptive policy
+    cpu_budget: Optional[confloat(gt=0)] = None
+    refresh: bool = False
+
+    @model_validator(mode="after")
+    def check_stream_format(self):
+        # A streamed download is never written to disk, so there is no MP3 copy to keep
+        if self.stream and self.audio_format == "mp3":
+            raise ValueError("stream can't be combined with audio_format mp3")
+        return self
 
 class TranscriptionResult(BaseModel):
     video_url: HttpUrl
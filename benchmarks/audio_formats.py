@@ -0,0 +1,100 @@
+"""
+Compare per-video CPU time of the audio formats supported by download_audio.
+
+For every format the benchmark runs the same conversion yt-dlp would run after the
+download (none for "native") and then decodes the result the way faster-whisper does
+before transcription, reporting CPU seconds for both steps.
+
+    python benchmarks/audio_formats.py                 # synthetic 10 minute AAC clip
+    python benchmarks/audio_formats.py --input talk.m4a
+"""
+import argparse
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+from faster_whisper import decode_audio
+
+WHISPER_SAMPLE_RATE = 16000
+
+# ffmpeg output arguments matching the FFmpegExtractAudio post-processor for each format
+CONVERSIONS = {
+    "native": None,
+    "pcm": ["-vn", "-acodec", "pcm_s16le", "-ar", str(WHISPER_SAMPLE_RATE), "-ac", "1"],
+    "mp3": ["-vn", "-acodec", "libmp3lame", "-b:a", "192k"],
+}
+
+EXTENSIONS = {"pcm": "wav", "mp3": "mp3"}
+
+def children_cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def make_sample(path: Path, seconds: int):
+    """
+    Generate a noisy tone encoded as 128 kbps AAC, like YouTube audio format 140
+    """
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error",
+                    "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+                    "-f", "lavfi", "-i", f"anoisesrc=amplitude=0.05:duration={seconds}",
+                    "-filter_complex", "amix=inputs=2", "-ac", "2", "-ar", "44100",
+                    "-c:a", "aac", "-b:a", "128k", str(path)],
+                   check=True)
+
+def bench_format(audio_format: str, source: Path, workdir: Path) -> dict:
+    convert_cpu = 0.0
+    audio_path = source
+
+    if CONVERSIONS[audio_format]:
+        audio_path = workdir / f"converted.{EXTENSIONS[audio_format]}"
+        before = children_cpu_time()
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", str(source),
+                        *CONVERSIONS[audio_format], str(audio_path)],
+                       check=True)
+        convert_cpu = children_cpu_time() - before
+
+    before = time.process_time()
+    samples = decode_audio(str(audio_path), sampling_rate=WHISPER_SAMPLE_RATE)
+    decode_cpu = time.process_time() - before
+
+    return {
+        "format": audio_format,
+        "convert_cpu_s": convert_cpu,
+        "decode_cpu_s": decode_cpu,
+        "total_cpu_s": convert_cpu + decode_cpu,
+        "audio_s": len(samples) / WHISPER_SAMPLE_RATE,
+        "file_mb": audio_path.stat().st_size / 1e6,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", type=Path, help="Audio file as downloaded by yt-dlp (m4a/webm)")
+    parser.add_argument("--seconds", type=int, default=600, help="Length of the synthetic clip")
+    args = parser.parse_args(argv)
+
+    if not shutil.which("ffmpeg"):
+        sys.exit("ffmpeg is required to run this benchmark")
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        workdir = Path(tempdir)
+        source = args.input
+        if source is None:
+            source = workdir / "sample.m4a"
+            make_sample(source, args.seconds)
+
+        results = [bench_format(audio_format, source, workdir) for audio_format in CONVERSIONS]
+
+    baseline = next(r for r in results if r["format"] == "mp3")
+    print(f"{'format':<8}{'convert cpu':>13}{'decode cpu':>12}{'total cpu':>11}{'saved vs mp3':>14}{'file MB':>9}")
+    for r in results:
+        print(f"{r['format']:<8}{r['convert_cpu_s']:>12.2f}s{r['decode_cpu_s']:>11.2f}s{r['total_cpu_s']:>10.2f}s"
+              f"{baseline['total_cpu_s'] - r['total_cpu_s']:>13.2f}s{r['file_mb']:>9.1f}")
+    print(f"audio length: {results[0]['audio_s']:.0f}s")
+
+if __name__ == "__main__":
+    main()
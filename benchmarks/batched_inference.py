@@ -0,0 +1,57 @@
+"""
+Compare transcription throughput of sequential and batched inference on CPU.
+
+Every configuration transcribes the same audio with the same cached model and reports
+wall time, CPU time and the real-time factor (processing time / audio length; lower is
+better). Batched inference trades per-video latency for throughput per core.
+
+    python benchmarks/batched_inference.py --input talk.m4a --model-size small --batch-sizes 4 8 16
+"""
+import argparse
+import time
+
+from pathlib import Path
+
+from faster_whisper import decode_audio
+
+from video_to_text.audio_to_text import transcribe_segments
+from video_to_text.model_registry import ModelRegistry
+
+WHISPER_SAMPLE_RATE = 16000
+
+def bench(audio, model_size: str, batch_size: int, registry: ModelRegistry) -> dict:
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    segments = list(transcribe_segments(audio=audio, model_size=model_size, registry=registry, batch_size=batch_size))
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    audio_seconds = len(audio) / WHISPER_SAMPLE_RATE
+    return {
+        "mode": f"batched ({batch_size})" if batch_size else "sequential",
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "rtf": wall / audio_seconds,
+        "audio_hours_per_cpu_hour": audio_seconds / cpu if cpu else float("inf"),
+        "words": sum(len(s.text.split()) for s in segments),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", type=Path, required=True, help="Audio file with speech")
+    parser.add_argument("--model-size", default="small")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args(argv)
+
+    audio = decode_audio(str(args.input), sampling_rate=WHISPER_SAMPLE_RATE)
+    registry = ModelRegistry()
+    registry.warmup([args.model_size], device="cpu")
+
+    results = [bench(audio, args.model_size, batch_size, registry) for batch_size in [0, *args.batch_sizes]]
+
+    print(f"audio: {len(audio) / WHISPER_SAMPLE_RATE:.0f}s, model: {args.model_size}")
+    print(f"{'mode':<16}{'wall':>9}{'cpu':>9}{'RTF':>7}{'audio h / cpu h':>17}{'words':>7}")
+    for r in results:
+        print(f"{r['mode']:<16}{r['wall_s']:>8.1f}s{r['cpu_s']:>8.1f}s{r['rtf']:>7.3f}"
+              f"{r['audio_hours_per_cpu_hour']:>17.2f}{r['words']:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measure the cold-start latency of CLI commands that don't transcribe.
+
+Every command runs in a fresh interpreter several times and the fastest run is reported,
+which is the closest to the import cost without noise from the rest of the machine. Exits
+with status 1 when a command exceeds --budget, so it can guard against a heavy import
+(faster-whisper, yt-dlp) creeping back into the startup path.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget 0.5 --runs 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent/"src"
+
+COMMANDS = {
+    "--help": ["-m", "video_to_text.entrypoint", "--help"],
+    "search --help": ["-m", "video_to_text.entrypoint", "search", "--help"],
+    "import core": ["-c", "import video_to_text.core"],
+    "python": ["-c", "pass"],
+}
+
+def cold_start(args: list, runs: int) -> float:
+    env = {**os.environ, "PYTHONPATH": str(SRC) + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], env=env, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command, the fastest is reported")
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconds a command may take")
+    args = parser.parse_args(argv)
+
+    over = []
+    print(f"{'command':<16}{'seconds':>9}")
+    for name, command in COMMANDS.items():
+        seconds = cold_start(command, args.runs)
+        print(f"{name:<16}{seconds:>9.3f}")
+        if seconds > args.budget:
+            over.append(name)
+
+    if over:
+        print(f"Over the {args.budget}s budget: {', '.join(over)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
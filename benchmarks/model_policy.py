@@ -0,0 +1,113 @@
+"""
+Compare throughput and word error rate of fixed models and the adaptive model policy.
+
+Every clip in --clips needs a reference transcript next to it with the same name and a .txt
+extension (e.g. talk.m4a and talk.txt). Every configuration transcribes all clips and reports
+wall time, CPU time, the realtime factor (audio seconds per wall second, higher is better),
+videos/hour, the word error rate against the references and, for the adaptive policy, the
+share of the audio transcribed again by a larger model.
+
+    python benchmarks/model_policy.py --clips samples/ --models tiny base small medium
+    python benchmarks/model_policy.py --clips samples/ --fast-model base --cpu-budgets 30 120
+"""
+import argparse
+import re
+import time
+
+from pathlib import Path
+
+from faster_whisper import decode_audio
+
+from video_to_text.audio_to_text import FasterWhisperBackend, transcribe_segments
+from video_to_text.model_policy import ModelPolicy
+from video_to_text.model_registry import ModelRegistry
+
+WHISPER_SAMPLE_RATE = 16000
+
+def normalize(text: str) -> list:
+    # Case and punctuation don't count as errors
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+def word_errors(reference: str, hypothesis: str) -> int:
+    """
+    :return: Substitutions, deletions and insertions turning the reference into the hypothesis
+    """
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, start=1):
+        current = [i]
+        for j, other in enumerate(hyp, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1]
+
+class CountingBackend(FasterWhisperBackend):
+    """
+    faster-whisper backend counting the seconds of audio it transcribed, over all passes
+    """
+
+    def __init__(self, registry: ModelRegistry):
+        super().__init__(registry=registry)
+        self.seconds = 0.0
+
+    def transcribe(self, audio, model_size="medium", **options):
+        for segment in super().transcribe(audio, model_size=model_size, **options):
+            yield segment
+        self.seconds += len(audio) / WHISPER_SAMPLE_RATE
+
+def bench(name: str, clips: list, model_size: str, policy, registry: ModelRegistry) -> dict:
+    backend = CountingBackend(registry=registry)
+    errors = words = 0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for audio, reference in clips:
+        segments = transcribe_segments(audio=audio, model_size=model_size, backend=backend, model_policy=policy)
+        errors += word_errors(reference, " ".join(s.text for s in segments))
+        words += len(normalize(reference))
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    audio_seconds = sum(len(audio) for audio, _ in clips) / WHISPER_SAMPLE_RATE
+    # The fast pass transcribes every clip once, anything more was transcribed again
+    retried = backend.seconds - audio_seconds
+    return {"config": name,
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "rtf": audio_seconds / wall,
+            "videos_per_hour": len(clips) * 3600 / wall,
+            "wer": errors / words if words else 0.0,
+            "retried": retried / audio_seconds if policy else None}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=Path, required=True, help="Directory of audio clips with .txt references")
+    parser.add_argument("--models", nargs="*", default=["tiny", "base", "small", "medium"],
+                        help="Model sizes transcribed with the fixed policy")
+    parser.add_argument("--model-size", default="medium", help="Largest model of the adaptive policy")
+    parser.add_argument("--fast-model", default="base", help="Model of the fast pass of the adaptive policy")
+    parser.add_argument("--cpu-budgets", type=float, nargs="*", default=[],
+                        help="CPU budgets per clip of the adaptive policy, it also runs without a budget")
+    args = parser.parse_args(argv)
+
+    clips = [(decode_audio(str(path), sampling_rate=WHISPER_SAMPLE_RATE), path.with_suffix(".txt").read_text())
+             for path in sorted(args.clips.iterdir()) if path.suffix != ".txt" and path.with_suffix(".txt").exists()]
+    if not clips:
+        parser.error(f"No clips with a .txt reference in {args.clips}")
+
+    registry = ModelRegistry()
+    configs = [(f"fixed {model}", model, None) for model in args.models]
+    configs += [(f"adaptive {args.fast_model}->{args.model_size}" + (f" budget {budget:g}s" if budget else ""),
+                 args.model_size, ModelPolicy(fast_model=args.fast_model, cpu_budget=budget))
+                for budget in [None, *args.cpu_budgets]]
+
+    # Models are loaded before they are measured, loading isn't part of the transcription time
+    registry.warmup({model for _, model, _ in configs} | {args.fast_model})
+    results = [bench(name, clips, model_size, policy, registry) for name, model_size, policy in configs]
+
+    print(f"clips: {len(clips)}, audio: {sum(len(a) for a, _ in clips) / WHISPER_SAMPLE_RATE:.0f}s")
+    print(f"{'config':<36}{'wall':>9}{'cpu':>9}{'RTF':>8}{'videos/h':>10}{'WER':>8}{'retried':>9}")
+    for r in results:
+        retried = f"{r['retried']:.0%}" if r["retried"] is not None else "-"
+        print(f"{r['config']:<36}{r['wall_s']:>8.1f}s{r['cpu_s']:>8.1f}s{r['rtf']:>8.2f}{r['videos_per_hour']:>10.0f}"
+              f"{r['wer']:>8.1%}{retried:>9}")
+
+if __name__ == "__main__":
+    main()
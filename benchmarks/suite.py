@@ -0,0 +1,271 @@
+"""
+End-to-end benchmark suite of the transcription pipeline, with stored baselines.
+
+Every case runs in its own process, so its peak RSS isn't inflated by the cases before it,
+and is repeated to report the median wall time:
+
+    listing     list channel videos, replayed from the VCR cassettes of the tests
+    decode      decode and resample 44.1 kHz stereo audio to 16 kHz mono
+    transcribe  transcribe_audio with each --models size (and the fake backend) per clip
+    save_to_db  bulk insert transcripts with their segments
+
+The realtime factor is seconds of audio processed per wall second (higher is better) and
+videos/hour treats every clip as a video. Cases whose model can't be loaded are skipped, and the
+suite exits with 1 if every case was.
+
+    python benchmarks/suite.py                                  # synthetic clips, tiny/base/medium
+    python benchmarks/suite.py --clips samples/ --models tiny   # your own speech clips
+    python benchmarks/suite.py --save-baseline main             # store results in benchmarks/baselines/main.json
+    python benchmarks/suite.py --compare main                   # exit 1 if a case regressed
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+# Runs from a checkout without installing the package, the spawned case processes import this module too
+sys.path.insert(0, str(ROOT/"src"))
+BASELINES_DIR = ROOT/"benchmarks"/"baselines"
+CASSETTE = ROOT/"tests"/"cassettes"/"test_get_channel_videos_success.yaml"
+
+WHISPER_SAMPLE_RATE = 16000
+DEFAULT_MODELS = ["tiny", "base", "medium"]
+
+def make_clip(path: Path, seconds: int, seed: int):
+    """
+    Write a 44.1 kHz stereo WAV of tones in noise, the sample rate YouTube audio is downloaded in.
+    Synthetic clips measure decoding and model speed, not accuracy.
+    """
+    rate = 44100
+    rng = np.random.default_rng(seed)
+    t = np.arange(seconds * rate) / rate
+    signal = 0.3 * np.sin(2 * np.pi * (180 + 40 * np.sin(2 * np.pi * 0.5 * t)) * t) + 0.05 * rng.standard_normal(len(t))
+    samples = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(np.repeat(samples, 2).tobytes())
+
+def get_clips(clips_dir, workdir: Path, count: int, seconds: int) -> list:
+    if clips_dir:
+        return sorted(str(p) for p in Path(clips_dir).iterdir() if p.is_file())
+    clips = []
+    for i in range(count):
+        path = workdir/f"clip{i}.wav"
+        make_clip(path, seconds, seed=i)
+        clips.append(str(path))
+    return clips
+
+def audio_seconds(clips: list) -> float:
+    from faster_whisper import decode_audio
+    return sum(len(decode_audio(clip, sampling_rate=WHISPER_SAMPLE_RATE)) for clip in clips) / WHISPER_SAMPLE_RATE
+
+def bench_listing(repeat: int) -> dict:
+    import vcr
+
+    from video_to_text.get_yt_videos import get_channel_id, get_channel_videos
+
+    times = []
+    for _ in range(repeat):
+        with vcr.use_cassette(str(CASSETTE), record_mode="none", allow_playback_repeats=True,
+                              match_on=["method", "scheme", "host", "path"]):
+            start = time.perf_counter()
+            videos = get_channel_videos(get_channel_id("GoogleDevelopers", "DUMMY"), "DUMMY", max_num_of_videos=2)
+            times.append(time.perf_counter() - start)
+
+    wall = statistics.median(times)
+    return {"wall_s": wall, "videos_per_hour": len(videos) * 3600 / wall}
+
+def bench_decode(clips: list, repeat: int) -> dict:
+    from faster_whisper import decode_audio
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        samples = sum(len(decode_audio(clip, sampling_rate=WHISPER_SAMPLE_RATE)) for clip in clips)
+        times.append(time.perf_counter() - start)
+
+    wall = statistics.median(times)
+    return {"wall_s": wall, "realtime_factor": samples / WHISPER_SAMPLE_RATE / wall,
+            "videos_per_hour": len(clips) * 3600 / wall}
+
+def bench_transcribe(clips: list, backend: str, model_size: str, repeat: int) -> dict:
+    from video_to_text.audio_to_text import transcribe_audio
+    from video_to_text.backends import get_backend
+    from video_to_text.model_registry import ModelRegistry
+
+    backend = get_backend(backend, registry=ModelRegistry())
+    # Loading the model isn't part of the measurement, it happens once per process
+    backend.load(model_size)
+
+    seconds = audio_seconds(clips)
+    times = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for i, clip in enumerate(clips):
+                transcribe_audio(audio_path=clip, video={"URL": f"clip{i}"}, output_dir=Path(output_dir),
+                                 model_size=model_size, backend=backend)
+            times.append(time.perf_counter() - start)
+
+    wall = statistics.median(times)
+    return {"wall_s": wall, "realtime_factor": seconds / wall, "videos_per_hour": len(clips) * 3600 / wall}
+
+def bench_save_to_db(videos: int, segments: int, repeat: int) -> dict:
+    from video_to_text.database import init_db, save_to_db
+
+    rows = [SimpleNamespace(start=i * 5.0, end=i * 5.0 + 5.0, text=f" Segment {i} of a transcript.",
+                            avg_logprob=-0.2, no_speech_prob=0.01) for i in range(segments)]
+    text = " ".join(s.text for s in rows)
+
+    times = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            db_file = Path(directory)/"bench.db"
+            init_db(db_file=db_file)
+            start = time.perf_counter()
+            for i in range(videos):
+                save_to_db(video_url=f"https://www.youtube.com/watch?v={i}", title=f"Video {i}",
+                           published_at="2024-01-01", audio_text=text, db_file=db_file, segments=rows)
+            times.append(time.perf_counter() - start)
+
+    wall = statistics.median(times)
+    return {"wall_s": wall, "videos_per_hour": videos * 3600 / wall, "segments_per_s": videos * segments / wall}
+
+def run_case(case: tuple) -> dict:
+    name, function, kwargs = case
+    try:
+        metrics = globals()[function](**kwargs)
+        status = "ok"
+    except Exception as e:
+        metrics, status = {}, f"skipped: {type(e).__name__}: {e}".splitlines()[0]
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+    return {"case": name, "status": status, "peak_rss_mb": round(peak, 1),
+            **{metric: round(value, 4) for metric, value in metrics.items()}}
+
+def get_cases(args, clips: list) -> list:
+    cases = [("listing", "bench_listing", {"repeat": args.repeat}),
+             ("decode", "bench_decode", {"clips": clips, "repeat": args.repeat}),
+             ("transcribe[fake]", "bench_transcribe",
+              {"clips": clips, "backend": "fake", "model_size": "tiny", "repeat": args.repeat})]
+    cases += [(f"transcribe[{model}]", "bench_transcribe",
+               {"clips": clips, "backend": "faster-whisper", "model_size": model, "repeat": args.repeat})
+              for model in args.models]
+    cases.append(("save_to_db", "bench_save_to_db",
+                  {"videos": args.db_videos, "segments": args.db_segments, "repeat": args.repeat}))
+    return [case for case in cases if not args.cases or case[0].split("[")[0] in args.cases]
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """
+    Cases the baseline lacks or skipped can't be compared, they are reported with a warning.
+
+    :return: Descriptions of the cases slower or heavier than the baseline by more than threshold
+    """
+    base = {row["case"]: row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = base.get(row["case"])
+        if row["status"] != "ok":
+            continue
+        if not old or old["status"] != "ok":
+            print(f"Warning: {row['case']} is not compared, the baseline "
+                  f"{'was ' + old['status'] if old else 'lacks it'}", file=sys.stderr)
+            continue
+        for metric in ("wall_s", "peak_rss_mb"):
+            change = row[metric] / old[metric] - 1 if old[metric] else 0.0
+            row[f"{metric}_change"] = change
+            if change > threshold:
+                regressions.append(f"{row['case']}: {metric} {old[metric]:.3f} -> {row[metric]:.3f} "
+                                   f"(+{change:.0%})")
+    return regressions
+
+def print_results(results: list):
+    print(f"{'case':<22}{'wall':>10}{'RTF':>9}{'videos/h':>12}{'peak RSS':>11}{'vs base':>9}  status")
+    for r in results:
+        rtf = f"{r['realtime_factor']:.2f}" if "realtime_factor" in r else "-"
+        videos = f"{r['videos_per_hour']:.0f}" if "videos_per_hour" in r else "-"
+        wall = f"{r['wall_s']:.3f}s" if "wall_s" in r else "-"
+        change = f"{r['wall_s_change']:+.0%}" if "wall_s_change" in r else "-"
+        print(f"{r['case']:<22}{wall:>10}{rtf:>9}{videos:>12}{r['peak_rss_mb']:>9.0f}MB{change:>9}  {r['status']}")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=Path, help="Directory of audio clips, synthetic clips when not provided")
+    parser.add_argument("--clip-count", type=int, default=3, help="Number of synthetic clips")
+    parser.add_argument("--clip-seconds", type=int, default=30, help="Length of the synthetic clips")
+    parser.add_argument("--models", nargs="*", default=DEFAULT_MODELS, help="Model sizes to transcribe with")
+    parser.add_argument("--cases", nargs="*", choices=["listing", "decode", "transcribe", "save_to_db"],
+                        help="Only run these cases")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case, the median is reported")
+    parser.add_argument("--db-videos", type=int, default=200, help="Transcripts inserted by save_to_db")
+    parser.add_argument("--db-segments", type=int, default=200, help="Segments per transcript")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Store the results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="Compare with a stored baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads((BASELINES_DIR/f"{args.compare}.json").read_text())
+
+    with tempfile.TemporaryDirectory() as workdir:
+        clips = get_clips(args.clips, Path(workdir), args.clip_count, args.clip_seconds)
+        # A fresh process per case, spawned so it doesn't inherit the parent's memory
+        with multiprocessing.get_context("spawn").Pool(processes=1, maxtasksperchild=1) as pool:
+            results = [pool.apply(run_case, (case,)) for case in get_cases(args, clips)]
+
+    regressions = compare(results, baseline, args.threshold) if baseline else []
+
+    print(f"commit: {git_commit()}, python: {platform.python_version()}, machine: {platform.machine()}, "
+          f"clips: {args.clips or f'{args.clip_count} x {args.clip_seconds}s synthetic'}")
+    if baseline:
+        print(f"baseline: {args.compare} (commit {baseline['commit']})")
+    print_results(results)
+
+    if all(row["status"] != "ok" for row in results):
+        print("Every case was skipped")
+        sys.exit(1)
+
+    if args.save_baseline:
+        BASELINES_DIR.mkdir(parents=True, exist_ok=True)
+        path = BASELINES_DIR/f"{args.save_baseline}.json"
+        path.write_text(json.dumps({"commit": git_commit(),
+                                    "python": platform.python_version(),
+                                    "machine": platform.machine(),
+                                    "processor": platform.processor(),
+                                    "clips": str(args.clips) if args.clips else
+                                    f"{args.clip_count} x {args.clip_seconds}s synthetic",
+                                    "results": [{k: v for k, v in row.items() if not k.endswith("_change")}
+                                                for row in results]}, indent=2) + "\n")
+        print(f"Saved baseline {path}")
+
+    if regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
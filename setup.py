@@ -17,6 +17,7 @@ setup(
     ],
     extras_require={
         "gpu": ["torch>=2.1.0"],
+        "yaml": ["PyYAML>=6.0"],
         "dev": [
             "pytest>=8.4.1",
             "pytest-vcr>=1.0.2",
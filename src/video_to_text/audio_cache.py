@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from pathlib import Path
+from typing import Callable, Optional
+
+from video_to_text.constants import AUDIO_CACHE_INDEX_NAME, DEFAULT_AUDIO_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+class AudioCache:
+    """
+    Downloaded audio kept between runs, so transcribing a video again with another model or
+    settings doesn't download it again.
+
+    Files are stored under objects/ by the SHA-256 of their content, and an index maps
+    (video ID, audio format) to a file. Once the files exceed max_bytes, the least recently
+    used ones are evicted. A file is checked against its size and digest before it is used,
+    a missing or corrupt file is dropped from the cache so the video is downloaded again.
+    """
+
+    def __init__(self,
+                 directory: Path,
+                 max_bytes: int = DEFAULT_AUDIO_CACHE_MAX_BYTES,
+                 now: Callable[[], float] = time.time):
+        """
+        :param directory: Directory of the cache, can be shared by several output directories
+        :param max_bytes: Size the cached files are evicted down to
+        :param now: Returns the current time, used to find the least recently used files
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.now = now
+        self.index = self.directory/AUDIO_CACHE_INDEX_NAME
+        self._lock = threading.Lock()
+
+        (self.directory/"objects").mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(self.index, timeout=30) as conn:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS audio (
+                video_id TEXT NOT NULL,
+                audio_format TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (video_id, audio_format)
+            )
+            """)
+            conn.commit()
+
+    def fetch(self, video_id: str, audio_format: str, directory) -> Optional[str]:
+        """
+        Place the cached audio of a video in a directory, as a hard link or a copy when the
+        directory is on another file system
+
+        :param video_id: ID of the video
+        :param audio_format: Format the audio was downloaded in, see video_to_audio.get_download_options
+        :param directory: Directory to place the audio in
+        :return: Path of the audio, None if it isn't cached
+        """
+        with sqlite3.connect(self.index, timeout=30) as conn:
+            row = conn.execute("SELECT digest, ext, size FROM audio WHERE video_id = ? AND audio_format = ?",
+                               (video_id, audio_format)).fetchone()
+        if not row:
+            return None
+
+        digest, ext, size = row
+        cached = self._object_path(digest, ext)
+        if not self._verify(cached, digest, size):
+            logger.warning(f"Cached audio of {video_id} is missing or corrupt, downloading it again")
+            self._remove(video_id, audio_format)
+            return None
+
+        path = Path(directory)/f"{video_id}{ext}"
+        _link(cached, path)
+
+        with sqlite3.connect(self.index, timeout=30) as conn:
+            conn.execute("UPDATE audio SET last_used = ? WHERE video_id = ? AND audio_format = ?",
+                         (self.now(), video_id, audio_format))
+            conn.commit()
+
+        logger.info(f"Using cached audio of {video_id} ({size / 1024 ** 2:.1f} MB)")
+        return str(path)
+
+    def put(self, video_id: str, audio_format: str, path) -> str:
+        """
+        Add downloaded audio to the cache, then evict the least recently used files
+
+        :param video_id: ID of the video
+        :param audio_format: Format the audio was downloaded in
+        :param path: Path of the audio, left in place
+        :return: Digest of the audio
+        """
+        path = Path(path)
+        digest = _sha256(path)
+        size = path.stat().st_size
+        cached = self._object_path(digest, path.suffix)
+
+        if not cached.exists():
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            # Linked under a temporary name first, so a crash never leaves a partial file under the digest
+            partial = cached.with_name(f"{cached.name}.{uuid.uuid4().hex}.partial")
+            _link(path, partial)
+            os.replace(partial, cached)
+
+        with sqlite3.connect(self.index, timeout=30) as conn:
+            conn.execute("INSERT OR REPLACE INTO audio (video_id, audio_format, digest, ext, size, last_used) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         (video_id, audio_format, digest, path.suffix, size, self.now()))
+            conn.commit()
+
+        self.evict()
+        return digest
+
+    def size(self) -> int:
+        """
+        :return: Bytes used by the cached files
+        """
+        with sqlite3.connect(self.index, timeout=30) as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM "
+                                "(SELECT DISTINCT digest, size FROM audio)").fetchone()[0]
+
+    def evict(self):
+        """
+        Remove the least recently used files until the cache fits in max_bytes
+        """
+        with self._lock, sqlite3.connect(self.index, timeout=30) as conn:
+            total = self.size()
+            rows = conn.execute("SELECT video_id, audio_format, digest, ext, size FROM audio "
+                                "ORDER BY last_used").fetchall()
+            for video_id, audio_format, digest, ext, size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM audio WHERE video_id = ? AND audio_format = ?", (video_id, audio_format))
+                # Identical audio of several videos is stored once
+                if not conn.execute("SELECT 1 FROM audio WHERE digest = ?", (digest,)).fetchone():
+                    self._object_path(digest, ext).unlink(missing_ok=True)
+                    total -= size
+                logger.info(f"Evicted cached audio of {video_id}")
+            conn.commit()
+
+    def _remove(self, video_id: str, audio_format: str):
+        with sqlite3.connect(self.index, timeout=30) as conn:
+            row = conn.execute("SELECT digest, ext FROM audio WHERE video_id = ? AND audio_format = ?",
+                               (video_id, audio_format)).fetchone()
+            conn.execute("DELETE FROM audio WHERE video_id = ? AND audio_format = ?", (video_id, audio_format))
+            conn.commit()
+        if row:
+            self._object_path(*row).unlink(missing_ok=True)
+
+    def _object_path(self, digest: str, ext: str) -> Path:
+        return self.directory/"objects"/digest[:2]/f"{digest}{ext}"
+
+    @staticmethod
+    def _verify(path: Path, digest: str, size: int) -> bool:
+        try:
+            if path.stat().st_size != size:
+                return False
+        except FileNotFoundError:
+            return False
+        return _sha256(path) == digest
+
+def _sha256(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def _link(source: Path, destination: Path):
+    destination.unlink(missing_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        # Hard links don't cross file systems
+        shutil.copyfile(source, destination)
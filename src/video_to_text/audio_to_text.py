@@ -1,47 +1,395 @@
 import logging
+import threading
+
+import numpy as np
 
-from faster_whisper import WhisperModel
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from video_to_text.backends import Capabilities, TranscriberBackend, get_backend
+from video_to_text.constants import (DEFAULT_BACKEND, DEFAULT_BEAM_SIZE, DEFAULT_MODEL_SIZE, LONG_AUDIO_SECONDS,
+                                     STREAM_WINDOW_SECONDS, WHISPER_SAMPLE_RATE)
+from video_to_text.exceptions import TranscriptionCancelled
+from video_to_text.helper import shift_segment
+from video_to_text.long_audio import get_parallel_transcriber
+from video_to_text.metrics import get_metrics
+from video_to_text.model_policy import ModelPolicy, estimate_decode_seconds, segment_confidence
+from video_to_text.model_registry import ModelRegistry, get_registry
 
 logger = logging.getLogger(__name__)
 
-def get_device():
-    try:
-        import torch
-    except ModuleNotFoundError:
-        logger.warning("PyTorch not installed. Using CPU only.")
-        return "cpu"
-
-    # Check GPU availability
-    if torch.cuda.is_available():
-        logger.info("Using CUDA GPU")
-        return "cuda"
-    else:
-        logger.info("Using CPU")
-        return "cpu"
+def transcribe_audio(audio_path: Union[str, Iterable[np.ndarray]],
+                     video: Dict,
+                     output_dir: Path,
+                     save_as_text: Optional[bool] = False,
+                     model_size: str = DEFAULT_MODEL_SIZE,
+                     registry: Optional[ModelRegistry] = None,
+                     chunk_workers: int = 0,
+                     batch_size: int = 0,
+                     backend: Union[str, TranscriberBackend] = DEFAULT_BACKEND,
+                     model_policy: Optional[ModelPolicy] = None) -> str:
+    """
+    Transcribe audio of a video
 
-def transcribe_audio(audio_path: str, video: Dict, output_dir: Path, save_as_text: Optional[bool] = False) -> str:
-    device = get_device()
+    :param audio_path: Path to the audio file, or an iterable of 16 kHz mono float32 chunks
+                       (e.g. an AudioStream) which is transcribed as it arrives
+    :param video: Video data
+    :param output_dir: Directory to save transcribed text files
+    :param save_as_text: Save transcribed audio in .text file
+    :param model_size: Whisper model size
+    :param registry: Model registry, the process-wide registry when not provided
+    :param chunk_workers: Transcribe long audio in chunks across this many processes, values below 2 disable chunking
+    :param batch_size: Decode this many VAD segments per batch with faster-whisper's batched pipeline, 0 disables
+    :param backend: Name of the transcriber backend, see TRANSCRIBER_BACKENDS, or a backend instance
+    :param model_policy: Adapt the model to the audio with model_size as the largest model, see ModelPolicy.
+                         None always transcribes with model_size
+    :return: Transcribed text
+    """
+    audio_text, _ = transcribe_video(audio_path=audio_path,
+                                     video=video,
+                                     output_dir=output_dir,
+                                     save_as_text=save_as_text,
+                                     model_size=model_size,
+                                     registry=registry,
+                                     chunk_workers=chunk_workers,
+                                     batch_size=batch_size,
+                                     backend=backend,
+                                     model_policy=model_policy)
+    return audio_text
 
-    if device == "cpu":
-        compute_type = "int8"
-    else:
-        compute_type = "float16"
+def transcribe_video(audio_path: Union[str, np.ndarray, Iterable[np.ndarray]],
+                     video: Dict,
+                     output_dir: Path,
+                     save_as_text: Optional[bool] = False,
+                     model_size: str = DEFAULT_MODEL_SIZE,
+                     registry: Optional[ModelRegistry] = None,
+                     chunk_workers: int = 0,
+                     batch_size: int = 0,
+                     cancel: Optional[threading.Event] = None,
+                     backend: Union[str, TranscriberBackend] = DEFAULT_BACKEND,
+                     model_policy: Optional[ModelPolicy] = None) -> Tuple[str, List]:
+    """
+    Transcribe audio of a video, keeping the timestamped segments
 
-    model = WhisperModel(model_size_or_path="medium", device=device, compute_type=compute_type)
-    logger.info("Starting transcription ...")
-    segments, info = model.transcribe(audio=audio_path, log_progress=True)
-    logger.info("Successfully transcribed audio. Compiling segments ...")
+    Takes the same parameters as transcribe_audio.
 
-    filepath = output_dir / f"{video['PublishedAt']}_{video['Title']}].txt"
+    :param cancel: Stops transcription between two segments when set, raising TranscriptionCancelled
+    :return: Tuple of transcribed text and list of segments
+    """
+    logger.info("Starting transcription ...")
+    segments = []
+    for segment in transcribe_segments(audio=audio_path,
+                                       model_size=model_size,
+                                       registry=registry,
+                                       chunk_workers=chunk_workers,
+                                       batch_size=batch_size,
+                                       backend=backend,
+                                       model_policy=model_policy):
+        if cancel is not None and cancel.is_set():
+            raise TranscriptionCancelled(f"Transcription of {video['URL']} cancelled")
+        segments.append(segment)
+    logger.info(f"Successfully transcribed audio into {len(segments)} segment(s)")
 
     audio_text = " ".join(s.text for s in segments)
 
     if save_as_text:
-        write_segments_to_file(audio_text=audio_text, filepath=filepath)
+        write_segments_to_file(audio_text=audio_text, filepath=text_file_path(output_dir=output_dir, video=video))
 
-    return audio_text
+    return audio_text, segments
+
+def text_file_path(output_dir: Path, video: Dict) -> Path:
+    """
+    :param output_dir: Directory to save transcribed text files
+    :param video: Video data
+    :return: Path of the text file of a transcript
+    """
+    return output_dir / f"{video['PublishedAt']}_{video['Title']}].txt"
+
+def transcribe_segments(audio: Union[str, np.ndarray, Iterable[np.ndarray]],
+                        model_size: str = DEFAULT_MODEL_SIZE,
+                        registry: Optional[ModelRegistry] = None,
+                        chunk_workers: int = 0,
+                        batch_size: int = 0,
+                        backend: Union[str, TranscriberBackend] = DEFAULT_BACKEND,
+                        model_policy: Optional[ModelPolicy] = None) -> Iterator:
+    """
+    Transcribe audio, yielding segments as they are decoded
+
+    :param audio: Path to an audio file, 16 kHz mono samples, or an iterable of 16 kHz mono chunks
+    :param model_size: Whisper model size
+    :param registry: Model registry, the process-wide registry when not provided
+    :param chunk_workers: Transcribe audio longer than LONG_AUDIO_SECONDS in chunks split at silence
+                          across this many processes, values below 2 disable chunking
+    :param batch_size: Decode this many VAD segments per batch with faster-whisper's BatchedInferencePipeline,
+                       trading per-video latency for throughput. 0 disables. Ignored with a warning for audio
+                       transcribed in chunks
+    :param backend: Name of the transcriber backend, see TRANSCRIBER_BACKENDS, or a backend instance
+    :param model_policy: Adapt the model to the audio with model_size as the largest model, see transcribe_adaptive.
+                         None always transcribes with model_size
+    :return: Iterator of segments
+    """
+    backend = get_backend(backend, registry=registry)
+    capabilities = backend.capabilities
+
+    if isinstance(audio, Path):
+        audio = str(audio)
+
+    if chunk_workers > 1 and not capabilities.chunking:
+        logger.warning(f"The {backend.name} backend doesn't transcribe in chunks, ignoring chunk_workers")
+        chunk_workers = 0
+    if batch_size > 0 and not capabilities.batching:
+        logger.warning(f"The {backend.name} backend doesn't batch, ignoring batch_size")
+        batch_size = 0
+    if not isinstance(audio, (str, np.ndarray)) and not capabilities.streaming:
+        # The backend needs the whole audio at once
+        audio = np.concatenate([np.empty(0, dtype=np.float32), *audio])
+
+    if model_policy is not None:
+        yield from transcribe_adaptive(audio=audio, model_size=model_size, policy=model_policy, backend=backend,
+                                       chunk_workers=chunk_workers, batch_size=batch_size)
+        return
+
+    yield from backend.transcribe(audio, model_size=model_size, chunk_workers=chunk_workers, batch_size=batch_size)
+
+def transcribe_adaptive(audio: Union[str, np.ndarray, Iterable[np.ndarray]],
+                        model_size: str,
+                        policy: ModelPolicy,
+                        backend: TranscriberBackend,
+                        chunk_workers: int = 0,
+                        batch_size: int = 0) -> Iterator:
+    """
+    Transcribe audio with a fast pass, transcribing each run of consecutive segments the fast pass
+    is unsure about again with a larger model, see ModelPolicy. A run is replaced only if the larger
+    model is more confident about it.
+
+    Streamed audio is kept in memory from the end of the last confident segment, so the audio of
+    a run is still available once the run ends. When the fast pass already uses model_size, nothing
+    can be transcribed again, so files aren't decoded up front and streamed audio isn't kept.
+
+    :param audio: Path to an audio file, 16 kHz mono samples, or an iterable of 16 kHz mono chunks
+    :param model_size: Largest model to transcribe with
+    :param policy: Model policy
+    :param backend: Transcriber backend
+    :param chunk_workers: Processes long audio is split across in the fast pass, values below 2 disable chunking
+    :param batch_size: Batch size of the fast pass, 0 disables
+    :return: Iterator of segments
+    """
+    # The duration only picks between models smaller than model_size, so it isn't needed to tell
+    # whether there is a larger model to transcribe unsure segments with
+    single = policy.fast_pass(model_size=model_size)
+    if single.model_size == model_size:
+        logger.info(f"Single pass with {model_size} (beam size {single.beam_size})")
+        yield from backend.transcribe(audio, model_size=model_size, chunk_workers=chunk_workers,
+                                      batch_size=batch_size, beam_size=single.beam_size,
+                                      compute_type=single.compute_type)
+        return
+
+    if isinstance(audio, str):
+        from faster_whisper import decode_audio
+        audio = decode_audio(audio, sampling_rate=WHISPER_SAMPLE_RATE)
+
+    kept = _KeptAudio()
+    if isinstance(audio, np.ndarray):
+        duration = len(audio) / WHISPER_SAMPLE_RATE
+        kept.chunks.append(audio)
+    else:
+        duration = None
+        audio = kept.keep(audio)
+
+    fast = policy.fast_pass(model_size=model_size, duration=duration)
+    logger.info(f"Fast pass with {fast.model_size} (beam size {fast.beam_size})")
+    retried_cost = 0.0
+
+    def resolve(run: List) -> List:
+        nonlocal retried_cost
+        if not run:
+            return run
+        start, end = run[0].start, run[-1].end
+        # The fast pass of streamed audio is only paid for up to the end of the run so far
+        spent = estimate_decode_seconds(fast.model_size, duration or end, fast.beam_size) + retried_cost
+        decoding = policy.retry(model_size=model_size, fast=fast, seconds=end - start, spent=spent)
+        if decoding is None:
+            logger.info(f"No larger model fits the CPU budget, keeping {start:.1f}-{end:.1f}s of the fast pass")
+            return run
+
+        retried_cost += estimate_decode_seconds(decoding.model_size, end - start, decoding.beam_size)
+        get_metrics().inc("video_to_text_retranscribed_seconds_total", end - start, model=decoding.model_size)
+        retried = [shift_segment(segment, offset=start, segment_id=segment.id)
+                   for segment in backend.transcribe(kept.span(start, end),
+                                                     model_size=decoding.model_size,
+                                                     beam_size=decoding.beam_size,
+                                                     compute_type=decoding.compute_type)]
+        better = segment_confidence(retried) > segment_confidence(run)
+        logger.info(f"Transcribed {start:.1f}-{end:.1f}s again with {decoding.model_size}, "
+                    f"keeping the {'new' if better else 'fast pass'} transcript")
+        return retried if better else run
+
+    segment_id = 0
+    run = []
+    for segment in backend.transcribe(audio,
+                                      model_size=fast.model_size,
+                                      chunk_workers=chunk_workers,
+                                      batch_size=batch_size,
+                                      beam_size=fast.beam_size,
+                                      compute_type=fast.compute_type):
+        if policy.needs_retry(segment):
+            run.append(segment)
+            continue
+        for resolved in [*resolve(run), segment]:
+            segment_id += 1
+            yield shift_segment(resolved, offset=0.0, segment_id=segment_id)
+        run = []
+        kept.discard_until(segment.end)
+
+    for resolved in resolve(run):
+        segment_id += 1
+        yield shift_segment(resolved, offset=0.0, segment_id=segment_id)
+
+class _KeptAudio:
+    """
+    Audio kept from a given time on, to transcribe parts of it again
+    """
+
+    def __init__(self):
+        self.chunks: List[np.ndarray] = []
+        # Samples discarded before the first kept chunk
+        self.offset = 0
+
+    def keep(self, chunks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        for chunk in chunks:
+            self.chunks.append(chunk)
+            yield chunk
+
+    def span(self, start: float, end: float) -> np.ndarray:
+        audio = np.concatenate([np.empty(0, dtype=np.float32), *self.chunks])
+        return audio[max(int(start * WHISPER_SAMPLE_RATE) - self.offset, 0):int(end * WHISPER_SAMPLE_RATE) - self.offset]
+
+    def discard_until(self, seconds: float):
+        # Only whole chunks are discarded, the chunk containing the time is still needed
+        while len(self.chunks) > 1 and self.offset + len(self.chunks[0]) <= int(seconds * WHISPER_SAMPLE_RATE):
+            self.offset += len(self.chunks.pop(0))
+
+class FasterWhisperBackend:
+    """
+    Whisper models run with faster-whisper (CTranslate2), the default backend
+    """
+    name = "faster-whisper"
+    capabilities = Capabilities(streaming=True, batching=True, chunking=True, needs_model=True)
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        """
+        :param registry: Model registry, the process-wide registry when not provided
+        """
+        self._registry = registry
+
+    @property
+    def registry(self) -> ModelRegistry:
+        return self._registry or get_registry()
+
+    def load(self, model_size: str = DEFAULT_MODEL_SIZE, compute_type: Optional[str] = None) -> None:
+        self.registry.get(model_size=model_size, compute_type=compute_type)
+
+    def transcribe(self,
+                   audio: Union[str, np.ndarray, Iterable[np.ndarray]],
+                   model_size: str = DEFAULT_MODEL_SIZE,
+                   chunk_workers: int = 0,
+                   batch_size: int = 0,
+                   beam_size: int = DEFAULT_BEAM_SIZE,
+                   compute_type: Optional[str] = None) -> Iterator:
+        from faster_whisper import BatchedInferencePipeline, decode_audio
+
+        if chunk_workers > 1 and isinstance(audio, (str, np.ndarray)):
+            if isinstance(audio, str):
+                audio = decode_audio(audio, sampling_rate=WHISPER_SAMPLE_RATE)
+            if len(audio) >= LONG_AUDIO_SECONDS * WHISPER_SAMPLE_RATE:
+                if batch_size > 0:
+                    # The chunk workers decode their chunks sequentially with their own models
+                    logger.warning(f"Ignoring batch_size {batch_size} while transcribing in chunks across "
+                                   f"{chunk_workers} processes")
+                # The worker models are loaded with the compute type, every chunk is decoded with the beam size
+                transcriber = get_parallel_transcriber(model_size=model_size, workers=chunk_workers,
+                                                       compute_type=compute_type)
+                yield from transcriber.transcribe(audio, beam_size=beam_size)
+                return
+
+        with self.registry.acquire(model_size=model_size, compute_type=compute_type) as model:
+            options = {"beam_size": beam_size}
+            if batch_size > 0:
+                # The pipeline only wraps the cached model, but keeps per-transcription state so it isn't shared
+                model = BatchedInferencePipeline(model=model)
+                options["batch_size"] = batch_size
+
+            if isinstance(audio, (str, np.ndarray)):
+                segments, _ = model.transcribe(audio=audio, log_progress=True, **options)
+            else:
+                segments = transcribe_stream(model=model, chunks=audio, **options)
+            yield from segments
+
+def transcribe_stream(model,
+                      chunks: Iterable[np.ndarray],
+                      window_seconds: float = STREAM_WINDOW_SECONDS,
+                      **transcribe_options) -> Iterator:
+    """
+    Transcribe audio while it is still arriving.
+
+    Audio is buffered until window_seconds are available and then transcribed. The last
+    segment of a window may have been cut off mid-sentence, so its audio is carried over
+    and transcribed again as the start of the next window. Memory use is bounded by the
+    window size.
+
+    :param model: Loaded WhisperModel
+    :param chunks: Iterable of 16 kHz mono float32 arrays
+    :param window_seconds: Seconds of audio transcribed at once
+    :param transcribe_options: Extra options for model.transcribe
+    :return: Iterator of segments with timestamps relative to the start of the stream
+    """
+    window_samples = int(window_seconds * WHISPER_SAMPLE_RATE)
+    buffer = np.empty(0, dtype=np.float32)
+    offset = 0.0
+    segment_id = 0
+
+    chunks = iter(chunks)
+    final = False
+    while not final:
+        chunk = next(chunks, None)
+        if chunk is None:
+            final = True
+        else:
+            buffer = np.concatenate([buffer, chunk])
+            if len(buffer) < window_samples:
+                continue
+
+        if not len(buffer):
+            break
+
+        segments, _ = model.transcribe(audio=buffer, **transcribe_options)
+        segments = list(segments)
+        buffer_seconds = len(buffer) / WHISPER_SAMPLE_RATE
+
+        if final:
+            completed = segments
+        elif len(segments) > 1:
+            completed = segments[:-1]
+        elif segments and len(buffer) >= 2 * window_samples:
+            # A single segment spanning the whole window, don't let the buffer grow any further
+            completed = segments
+        else:
+            completed = []
+
+        for segment in completed:
+            segment_id += 1
+            yield shift_segment(segment, offset=offset, segment_id=segment_id)
+
+        if completed:
+            cut = min(completed[-1].end, buffer_seconds)
+        elif not segments:
+            # No speech in the window, keep only a short tail in case a word starts at the edge
+            cut = max(buffer_seconds - 1.0, 0.0)
+        else:
+            cut = 0.0
+
+        buffer = buffer[int(cut * WHISPER_SAMPLE_RATE):]
+        offset += cut
 
 def write_segments_to_file(audio_text: str, filepath: Path):
     logger.info(f"Writing full text to file: {filepath} ...")
@@ -0,0 +1,148 @@
+import logging
+import time
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Protocol, Union
+
+import numpy as np
+
+from video_to_text.constants import (DEFAULT_BACKEND, DEFAULT_BEAM_SIZE, DEFAULT_MODEL_SIZE, FAKE_SEGMENT_SECONDS,
+                                     TRANSCRIBER_BACKENDS, WHISPER_SAMPLE_RATE)
+
+logger = logging.getLogger(__name__)
+
+Audio = Union[str, Path, np.ndarray, Iterable[np.ndarray]]
+
+@dataclass(frozen=True)
+class Capabilities:
+    """
+    What a transcriber backend supports, options it doesn't support are ignored with a warning
+    """
+    # Transcribes an iterable of chunks as they arrive, otherwise the chunks are joined first
+    streaming: bool = False
+    # Decodes speech segments in batches, see batch_size
+    batching: bool = False
+    # Splits long audio across processes, see chunk_workers
+    chunking: bool = False
+    # Needs model weights, which are downloaded on first use
+    needs_model: bool = True
+
+class TranscriberBackend(Protocol):
+    """
+    Speech to text engine. Segments are faster-whisper Segments, whichever engine produced them,
+    so the rest of the pipeline doesn't depend on the backend.
+    """
+    name: str
+    capabilities: Capabilities
+
+    def load(self, model_size: str = DEFAULT_MODEL_SIZE, compute_type: Optional[str] = None) -> None:
+        """
+        Load a model ahead of time, e.g. at application startup
+
+        :param model_size: Model size name or path
+        :param compute_type: Compute type, the backend's default when not provided
+        """
+
+    def transcribe(self,
+                   audio: Audio,
+                   model_size: str = DEFAULT_MODEL_SIZE,
+                   chunk_workers: int = 0,
+                   batch_size: int = 0,
+                   beam_size: int = DEFAULT_BEAM_SIZE,
+                   compute_type: Optional[str] = None) -> Iterator:
+        """
+        Transcribe audio, yielding segments as they are decoded
+
+        :param audio: Path to an audio file, 16 kHz mono samples, or an iterable of 16 kHz mono chunks
+                      if the backend supports streaming
+        :param model_size: Model size name or path
+        :param chunk_workers: Processes long audio is split across, if the backend supports chunking. Values
+                              below 2 disable chunking
+        :param batch_size: Batch size, if the backend supports batching
+        :param beam_size: Beam size, 1 for greedy decoding. Only passed by the adaptive model policy
+        :param compute_type: Compute type, the backend's default when not provided. Only passed by the
+                             adaptive model policy
+        :return: Iterator of segments
+        """
+
+class FakeBackend:
+    """
+    Deterministic backend that needs neither model weights nor much CPU, to test and benchmark the
+    download, storage and API stages in isolation. It emits one segment per segment_seconds of
+    audio with a text derived from its position, and can simulate the speed of a real model.
+    """
+    name = "fake"
+    capabilities = Capabilities(streaming=True, needs_model=False)
+
+    def __init__(self,
+                 segment_seconds: float = FAKE_SEGMENT_SECONDS,
+                 realtime_factor: Optional[float] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        :param segment_seconds: Length of every segment
+        :param realtime_factor: Seconds of audio transcribed per second, e.g. 10 to take 6 s for a
+                                minute of audio. None returns immediately
+        :param sleep: Function used to simulate transcription time
+        """
+        self.segment_seconds = segment_seconds
+        self.realtime_factor = realtime_factor
+        self.sleep = sleep
+
+    def load(self, model_size: str = DEFAULT_MODEL_SIZE, compute_type: Optional[str] = None) -> None:
+        pass
+
+    def transcribe(self,
+                   audio: Audio,
+                   model_size: str = DEFAULT_MODEL_SIZE,
+                   chunk_workers: int = 0,
+                   batch_size: int = 0,
+                   beam_size: int = DEFAULT_BEAM_SIZE,
+                   compute_type: Optional[str] = None) -> Iterator:
+        from faster_whisper.transcribe import Segment
+
+        if isinstance(audio, (str, Path)):
+            from faster_whisper import decode_audio
+            audio = decode_audio(str(audio), sampling_rate=WHISPER_SAMPLE_RATE)
+        chunks = [audio] if isinstance(audio, np.ndarray) else audio
+
+        segment_samples = int(self.segment_seconds * WHISPER_SAMPLE_RATE)
+        buffered = 0
+        emitted = 0
+
+        def segment(samples: int) -> Segment:
+            start = emitted * self.segment_seconds
+            end = start + samples / WHISPER_SAMPLE_RATE
+            if self.realtime_factor:
+                self.sleep((end - start) / self.realtime_factor)
+            return Segment(id=emitted + 1, seek=0, start=start, end=end, text=f" Fake segment {emitted + 1}.",
+                           tokens=[], avg_logprob=0.0, compression_ratio=1.0, no_speech_prob=0.0, words=None,
+                           temperature=0.0)
+
+        for chunk in chunks:
+            buffered += len(chunk)
+            while buffered >= segment_samples:
+                yield segment(segment_samples)
+                buffered -= segment_samples
+                emitted += 1
+
+        if buffered:
+            yield segment(buffered)
+
+def get_backend(backend: Union[str, TranscriberBackend] = DEFAULT_BACKEND, registry=None) -> TranscriberBackend:
+    """
+    Return a transcriber backend by name
+
+    :param backend: One of TRANSCRIBER_BACKENDS, or a backend instance which is returned as-is
+    :param registry: Model registry of the faster-whisper backend, the process-wide registry when not provided
+    :return: TranscriberBackend
+    """
+    if not isinstance(backend, str):
+        return backend
+    if backend == "faster-whisper":
+        # Imported here, the faster-whisper backend lives with the code it wraps
+        from video_to_text.audio_to_text import FasterWhisperBackend
+        return FasterWhisperBackend(registry=registry)
+    if backend == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown transcriber backend '{backend}'. Expected one of {', '.join(TRANSCRIBER_BACKENDS)}")
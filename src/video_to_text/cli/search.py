@@ -0,0 +1,48 @@
+import click
+from pathlib import Path
+from platformdirs import user_data_dir
+
+from video_to_text.constants import APP_NAME, DB_NAME
+from video_to_text.database import search_transcripts
+from video_to_text.helper import format_timestamp
+
+@click.command()
+@click.argument("query")
+@click.option(
+    "--output-dir", "-o",
+    type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
+    default=Path(user_data_dir(appname=APP_NAME)),
+    show_default=True,
+    help=f"Directory containing {DB_NAME}"
+)
+@click.option(
+    "--limit", "-l",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Maximum number of videos to return"
+)
+@click.help_option("-h", "--help")
+def search(query, output_dir, limit):
+    """
+    Search transcripts for QUERY. All words must match, use quotes for phrases.
+    """
+    db_file = output_dir/DB_NAME
+    if not db_file.exists():
+        raise click.ClickException(f"No transcripts found at {db_file}")
+
+    results = search_transcripts(db_file=db_file, query=query, limit=limit)
+    if not results:
+        click.echo("No matches found.")
+        return
+
+    for result in results:
+        click.echo(click.style(result["Title"], bold=True) + f"  ({result['PublishedAt']})")
+        click.echo(f"  {result['URL']}")
+        if result["Segments"]:
+            for segment in result["Segments"]:
+                click.echo(f"  [{format_timestamp(segment['Start'])}] {segment['Text']}"
+                           f"  {result['URL']}&t={int(segment['Start'])}s")
+        else:
+            click.echo(f"  {result['Snippet']}")
+        click.echo()
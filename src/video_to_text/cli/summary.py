@@ -0,0 +1,49 @@
+from typing import Dict, List
+
+SUMMARY_COLUMNS = ("Source", "Listed", "Transcribed", "Reused", "Failed", "AudioSeconds", "WallSeconds",
+                   "VideosPerHour", "RealtimeFactor")
+
+STAGE_COLUMNS = ("Stage", "Count", "TotalSeconds", "MeanSeconds", "P95Seconds", "MBPerSecond", "RealtimeFactor")
+
+def format_summary(summary: List[Dict]) -> str:
+    """
+    Render the per source summary of a batch run as a text table, followed by the total and
+    the sources that failed.
+
+    :param summary: Summary as returned by core.run_batch
+    :return: Table
+    """
+    total_videos = sum(row["Transcribed"] for row in summary)
+    total_audio = sum((row["AudioSeconds"] for row in summary), 0.0)
+    rows = [[_format_cell(row[column]) for column in SUMMARY_COLUMNS] for row in summary]
+    rows.append(["total", str(sum(row["Listed"] for row in summary)), str(total_videos),
+                 str(sum(row["Reused"] for row in summary)), str(sum(row["Failed"] for row in summary)),
+                 _format_cell(round(total_audio, 1)), "", "", ""])
+
+    lines = _format_table(SUMMARY_COLUMNS, rows)
+
+    for row in summary:
+        if row["Error"]:
+            lines.append(f"Failed {row['Source']}: {row['Error']}")
+
+    return "\n".join(lines)
+
+def format_stage_summary(stages: List[Dict]) -> str:
+    """
+    Render the stage timings of a run as a text table, to tell which stage is the bottleneck.
+
+    :param stages: Stage summary as returned by metrics.get_stage_summary
+    :return: Table
+    """
+    return "\n".join(_format_table(STAGE_COLUMNS, [[_format_cell(row[column]) for column in STAGE_COLUMNS]
+                                                   for row in stages]))
+
+def _format_table(columns, rows: List[List[str]]) -> List[str]:
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    lines = ["  ".join(column.ljust(width) for column, width in zip(columns, widths)).rstrip()]
+    for row in rows:
+        lines.append("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+    return lines
+
+def _format_cell(value) -> str:
+    return "-" if value is None else str(value)
@@ -0,0 +1,41 @@
+import click
+from pathlib import Path
+
+from video_to_text.constants import DEFAULT_MAX_JOBS, DEFAULT_MODEL_SIZE, WORKER_SOCKET_ENV
+
+@click.command()
+@click.option(
+    "--socket", "socket_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help=f"Unix socket to listen on [default: ${WORKER_SOCKET_ENV} or worker.sock in the user data directory]"
+)
+@click.option(
+    "--warmup-models",
+    default=DEFAULT_MODEL_SIZE,
+    show_default=True,
+    help="Comma separated model sizes loaded before accepting work, empty to load on first use"
+)
+@click.option(
+    "--max-jobs",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_JOBS,
+    show_default=True,
+    help="Transcriptions run at the same time, further submissions wait"
+)
+@click.help_option("-h", "--help")
+def worker(socket_path, warmup_models, max_jobs):
+    """
+    Run a worker that keeps models loaded between invocations. While it runs, transcriptions
+    started from the command line are submitted to it instead of loading a model each time.
+    """
+    from video_to_text.exceptions import WorkerError
+    from video_to_text.utils import load_env
+    from video_to_text.worker import serve
+
+    load_env()
+    try:
+        serve(socket_path=socket_path,
+              warmup_models=[m.strip() for m in warmup_models.split(",") if m.strip()],
+              max_jobs=max_jobs)
+    except WorkerError as e:
+        raise click.ClickException(str(e))
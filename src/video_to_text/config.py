@@ -1,3 +1,16 @@
 from video_to_text.utils import get_api_key
 
-API_KEY = get_api_key("YOUTUBE_API_KEY")
+def get_youtube_api_key() -> str:
+    """
+    Read the YouTube API key when it is first needed rather than at import, so commands that
+    don't call the YouTube API (e.g. --help or search) run without it
+
+    :return: API key
+    """
+    return get_api_key("YOUTUBE_API_KEY")
+
+def __getattr__(name: str):
+    # Kept for callers importing the former module constant
+    if name == "API_KEY":
+        return get_youtube_api_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,231 @@
+APP_NAME = "video_to_text"
+
 YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
 
+# Maximum page size of playlistItems and maximum number of comma separated IDs per /videos request
+YOUTUBE_MAX_RESULTS = 50
+
+# Quota units charged per request by the YouTube Data API, every other endpoint costs 1
+YOUTUBE_QUOTA_COSTS = {"search": 100}
+
+# Retries of a YouTube API request failing with a transient error
+YOUTUBE_MAX_RETRIES = 5
+
+# Retries of a YouTube API request failing to connect or timing out, and the delay before the first one.
+# An unreachable API rarely recovers within seconds, so give up sooner than on HTTP errors
+YOUTUBE_MAX_CONNECTION_RETRIES = 1
+YOUTUBE_CONNECTION_BACKOFF_SECONDS = 0.5
+
+# HTTP statuses retried with backoff
+YOUTUBE_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# 403 reasons that are per-second rate limits, as opposed to the exhausted daily quota
+YOUTUBE_RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+YOUTUBE_TIMEOUT_SECONDS = 30
+
+# Concurrent YouTube API requests of the channel crawler
+DEFAULT_CRAWL_CONCURRENCY = 4
+
+# Responses kept to revalidate with If-None-Match
+YOUTUBE_ETAG_CACHE_SIZE = 256
+
 TABLE_NAME = "transcripts"
 
+SYNC_TABLE_NAME = "channel_sync"
+
+SEGMENTS_TABLE_NAME = "segments"
+
+TRANSCRIPTS_FTS_TABLE_NAME = "transcripts_fts"
+
+SEGMENTS_FTS_TABLE_NAME = "segments_fts"
+
+# Values bound per IN (...) query, below SQLite's limit on host parameters (999 before SQLite 3.32)
+SQLITE_MAX_PARAMS_BATCH = 500
+
+METADATA_CACHE_TABLE_NAME = "metadata_cache"
+
+JOURNAL_TABLE_NAME = "journal"
+
+FINGERPRINTS_TABLE_NAME = "fingerprints"
+
+FINGERPRINT_INDEX_TABLE_NAME = "fingerprint_index"
+
+RUNS_TABLE_NAME = "runs"
+
+# How long YouTube metadata is reused before it is fetched again. Channel IDs and uploads
+# playlists practically never change, titles occasionally do
+METADATA_CACHE_TTL_SECONDS = {
+    "channel_id": 30 * 24 * 3600,
+    "uploads_playlist": 30 * 24 * 3600,
+    "video": 7 * 24 * 3600,
+}
+
 DB_NAME = "transcripts.db"
+
+DEFAULT_MODEL_SIZE = "medium"
+
+# Approximate resident memory (MB) of a loaded faster-whisper model, used by the
+# model registry to decide when idle models must be evicted.
+MODEL_MEMORY_MB = {
+    "tiny": 150,
+    "base": 250,
+    "small": 600,
+    "medium": 1600,
+    "large": 3200,
+}
+
+MODEL_MEMORY_BUDGET_ENV = "VIDEO_TO_TEXT_MODEL_MEMORY_MB"
+
+WARMUP_MODELS_ENV = "VIDEO_TO_TEXT_WARMUP_MODELS"
+
+DEFAULT_DOWNLOAD_WORKERS = 2
+
+DEFAULT_TRANSCRIBE_WORKERS = 1
+
+# Number of videos downloaded ahead of the transcription stage
+DEFAULT_PREFETCH = 2
+
+# Whisper models consume 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+
+# Whisper decodes 30 second windows, no segment is longer than that
+WHISPER_WINDOW_SECONDS = 30
+
+# "native" keeps the downloaded stream, "pcm" converts to 16 kHz mono WAV, "mp3" archives as MP3
+AUDIO_FORMATS = ("native", "pcm", "mp3")
+
+DEFAULT_AUDIO_FORMAT = "native"
+
+# Seconds of streamed audio buffered before each transcription pass
+STREAM_WINDOW_SECONDS = 120
+
+# Seconds of audio in each chunk read from the streaming decoder
+STREAM_CHUNK_SECONDS = 10
+
+# Bytes copied at a time from the streaming downloader to the decoder
+STREAM_PIPE_BYTES = 64 * 1024
+
+# Audio longer than this is split at silence and transcribed in parallel when chunk workers are enabled
+LONG_AUDIO_SECONDS = 1200
+
+# Target length of a chunk of long audio
+LONG_AUDIO_CHUNK_SECONDS = 300
+
+# Audio added on both sides of a chunk so words at the edges are not cut off
+LONG_AUDIO_PADDING_SECONDS = 1.0
+
+# Maximum number of transcription jobs the API runs at the same time, further jobs wait in a queue.
+# Streamed transcriptions count towards it too
+MAX_JOBS_ENV = "VIDEO_TO_TEXT_MAX_JOBS"
+
+DEFAULT_MAX_JOBS = 1
+
+# Seconds a client refused a streamed transcription because all job slots are taken is asked to wait
+STREAM_RETRY_AFTER_SECONDS = 30
+
+# How often a queued job waiting for a slot taken by a streamed transcription checks whether it was cancelled
+JOB_SLOT_POLL_SECONDS = 0.5
+
+# Finished jobs kept in memory for GET /jobs/{id}, the oldest are forgotten first
+MAX_FINISHED_JOBS = 100
+
+# Keys of a batch manifest entry, the filters fall back to the command line options when unset
+MANIFEST_FILTERS = ("max_videos", "min_duration", "max_duration", "start_date", "end_date")
+
+MANIFEST_KEYS = ("channel_name", "video_id") + MANIFEST_FILTERS
+
+# Failed attempts after which --resume gives up on a video
+JOURNAL_MAX_ATTEMPTS = 3
+
+# Index of the audio cache, kept next to the cached files
+AUDIO_CACHE_INDEX_NAME = "index.db"
+
+# Size the audio cache is evicted down to, least recently used audio first
+DEFAULT_AUDIO_CACHE_SIZE_GB = 20
+
+DEFAULT_AUDIO_CACHE_MAX_BYTES = DEFAULT_AUDIO_CACHE_SIZE_GB * 1024 ** 3
+
+# Audio fingerprints: a 32 bit sub-fingerprint per 0.1 s hop, from 0.256 s frames split into 33 bands
+FINGERPRINT_FRAME_SAMPLES = 4096
+
+FINGERPRINT_HOP_SAMPLES = 1600
+
+FINGERPRINT_BANDS = 33
+
+# Only every n-th sub-fingerprint of a stored video is indexed, a match still hits about len/n of them
+FINGERPRINT_INDEX_STEP = 8
+
+# Alignments verified per lookup, the ones with the most index hits
+FINGERPRINT_CANDIDATES = 5
+
+# Unrelated audio differs in about half of the bits, re-encoded copies in far fewer
+FINGERPRINT_MAX_BIT_ERROR_RATE = 0.35
+
+# Audio shorter than this (10 s) is always transcribed, a match would be unreliable
+FINGERPRINT_MIN_FRAMES = 100
+
+# Speech to text engines, "fake" emits deterministic segments without a model for tests and benchmarks
+TRANSCRIBER_BACKENDS = ("faster-whisper", "fake")
+
+DEFAULT_BACKEND = "faster-whisper"
+
+# Backends whose transcripts aren't real speech to text. Their transcripts are stored with the backend
+# name, but don't stop a video from being transcribed again and are never reused for another video
+SIMULATED_BACKENDS = ("fake",)
+
+# Backend the API uses when a request doesn't name one
+BACKEND_ENV = "VIDEO_TO_TEXT_BACKEND"
+
+# Length of the segments emitted by the fake backend
+FAKE_SEGMENT_SECONDS = 5.0
+
+# Pipeline stages timed per video, see metrics.RunRecorder
+STAGES = ("metadata", "download", "transcode", "model_load", "decode", "db_write")
+
+# Bucket bounds of the stage duration histograms, in seconds
+STAGE_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600)
+
+# Bucket bounds of the realtime factor histogram, seconds of audio per second of decoding
+REALTIME_FACTOR_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+# Unix socket of the worker the CLI submits transcriptions to, see worker.serve
+WORKER_SOCKET_ENV = "VIDEO_TO_TEXT_WORKER_SOCKET"
+
+WORKER_SOCKET_NAME = "worker.sock"
+
+# Seconds the CLI waits to connect to the worker before transcribing in-process
+WORKER_CONNECT_TIMEOUT = 1.0
+
+# "fixed" transcribes with the model size as given, "adaptive" makes a fast pass and transcribes the segments
+# it is unsure about again with a larger model, see model_policy.ModelPolicy
+MODEL_POLICIES = ("fixed", "adaptive")
+
+DEFAULT_MODEL_POLICY = "fixed"
+
+# Model of the fast pass of the adaptive policy
+DEFAULT_FAST_MODEL = "base"
+
+# Beam size of faster-whisper, the fast pass decodes greedily
+DEFAULT_BEAM_SIZE = 5
+
+FAST_BEAM_SIZE = 1
+
+# Segments of the fast pass less confident than this are transcribed again, exp(-0.6) is about 0.55
+RETRY_MIN_AVG_LOGPROB = -0.6
+
+# Segments more likely than this to be silence or music aren't transcribed again
+RETRY_MAX_NO_SPEECH_PROB = 0.6
+
+# Approximate seconds of audio a CPU decodes per second with int8 and greedy decoding, used to estimate
+# the cost of a pass against the CPU budget of the adaptive policy
+MODEL_REALTIME_FACTOR = {
+    "tiny": 40.0,
+    "base": 20.0,
+    "small": 8.0,
+    "medium": 3.0,
+    "large": 1.5,
+}
+
+# Slowdown of beam search over greedy decoding
+BEAM_SEARCH_COST = 1.5
@@ -1,14 +1,38 @@
+import logging
 import tempfile
+import threading
+import time
+import uuid
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
-from video_to_text.audio_to_text import transcribe_audio
-from video_to_text.config import API_KEY
-from video_to_text.constants import DB_NAME
-from video_to_text.database import init_db, save_to_db
-from video_to_text.get_yt_videos import get_channel_id, get_channel_videos, get_single_video
-from video_to_text.video_to_audio import download_audio
+import numpy as np
+
+from video_to_text.audio_cache import AudioCache
+from video_to_text.audio_to_text import text_file_path, transcribe_segments, transcribe_video, write_segments_to_file
+from video_to_text.backends import TranscriberBackend, get_backend
+from video_to_text.config import get_youtube_api_key
+from video_to_text.constants import (DB_NAME, DEFAULT_AUDIO_FORMAT, DEFAULT_BACKEND, DEFAULT_DOWNLOAD_WORKERS, DEFAULT_MODEL_SIZE,
+                                     DEFAULT_PREFETCH, DEFAULT_TRANSCRIBE_WORKERS, JOURNAL_MAX_ATTEMPTS,
+                                     SIMULATED_BACKENDS)
+from video_to_text.crawler import ChannelCrawler
+from video_to_text.database import get_channel_sync, get_transcribed_urls, init_db, save_to_db, set_channel_sync
+from video_to_text.exceptions import YouTubeAPIException
+from video_to_text.fingerprint import decode_and_fingerprint, find_match, reuse_transcript, save_fingerprint
+from video_to_text.get_yt_videos import get_channel_id, get_single_video
+from video_to_text.helper import convert_iso_to_datetime, segment_to_dict, video_id_from_url
+from video_to_text.journal import (DOWNLOADED, FAILED, STORED, TRANSCRIBED, finish_run, get_given_up_urls,
+                                   get_unfinished, queue_videos, set_state, start_run)
+from video_to_text.metadata_cache import MetadataCache
+from video_to_text.metrics import RunRecorder, get_metrics
+from video_to_text.model_policy import ModelPolicy
+from video_to_text.pipeline import Pipeline
+from video_to_text.video_to_audio import AudioStream, download_audio
+from video_to_text.youtube_client import get_client
+
+logger = logging.getLogger(__name__)
 
 def run_transcription(channel_name: str,
                       video_id: str,
@@ -18,7 +42,24 @@ def run_transcription(channel_name: str,
                       max_duration: int,
                       start_date: datetime,
                       end_date: datetime,
-                      save_as_text: bool) -> List:
+                      save_as_text: bool,
+                      model_size: str = DEFAULT_MODEL_SIZE,
+                      download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+                      transcribe_workers: int = DEFAULT_TRANSCRIBE_WORKERS,
+                      prefetch: int = DEFAULT_PREFETCH,
+                      incremental: bool = False,
+                      audio_format: str = DEFAULT_AUDIO_FORMAT,
+                      stream: bool = False,
+                      chunk_workers: int = 0,
+                      batch_size: int = 0,
+                      refresh: bool = False,
+                      audio_cache: Optional[AudioCache] = None,
+                      reuse_transcripts: bool = False,
+                      backend: Union[str, TranscriberBackend] = DEFAULT_BACKEND,
+                      model_policy: Optional[ModelPolicy] = None,
+                      cancel: Optional[threading.Event] = None,
+                      on_listed: Optional[Callable[[List[Dict]], None]] = None,
+                      on_stored: Optional[Callable[[Dict], None]] = None) -> List:
     """
     Main logic that retrieves YouTube videos, downloads, transcribes abd saves in DB
 
@@ -31,46 +72,541 @@ def run_transcription(channel_name: str,
     :param start_date: Only include videos published on or after this date (YYYY-MM-DD)
     :param end_date: Only include videos published on or before this date (YYYY-MM-DD)
     :param save_as_text: Save transcribed audio in .text file
+    :param model_size: Whisper model size, loaded once per process through the model registry
+    :param download_workers: Number of concurrent downloads
+    :param transcribe_workers: Number of concurrent transcriptions
+    :param prefetch: Number of videos downloaded ahead of transcription
+    :param incremental: Skip videos already in the DB and stop listing the channel at the last synced upload
+    :param audio_format: "native" to transcribe the downloaded stream as-is, "pcm" for 16 kHz mono WAV or
+                         "mp3" to also keep an MP3 copy of the audio under output_dir/audio
+    :param stream: Pipe audio from yt-dlp through ffmpeg into the model without writing it to disk,
+                   transcription starts before the download completes
+    :param chunk_workers: Transcribe long videos in chunks split at silence across this many processes, values
+                          below 2 disable chunking
+    :param batch_size: Use batched inference with this batch size, 0 disables
+    :param refresh: Fetch channel and video metadata from the YouTube API even if it is cached in the DB
+    :param audio_cache: Reuse audio downloaded by previous runs and cache the audio downloaded by this one
+    :param reuse_transcripts: Reuse the stored transcript of a video with the same audio, see fingerprint.find_match
+    :param backend: Transcriber backend, see TRANSCRIBER_BACKENDS
+    :param model_policy: Adapt the model to every video with model_size as the largest model, see
+                         model_policy.ModelPolicy. None transcribes every video with model_size
+    :param cancel: Stops downloading and transcribing when set, raising TranscriptionCancelled. Videos
+                   transcribed before that are kept in the DB
+    :param on_listed: Called with the videos to transcribe once all of them have been listed
+    :param on_stored: Called with every video once its transcript is saved
     :return: List containing video data
     """
-    video_data: List = []
+    source = {"channel_name": channel_name,
+              "video_id": video_id,
+              "max_videos": max_videos,
+              "min_duration": min_duration,
+              "max_duration": max_duration,
+              "start_date": start_date,
+              "end_date": end_date}
+
+    video_data, _ = run_batch(sources=[source],
+                              output_dir=output_dir,
+                              save_as_text=save_as_text,
+                              model_size=model_size,
+                              download_workers=download_workers,
+                              transcribe_workers=transcribe_workers,
+                              prefetch=prefetch,
+                              incremental=incremental,
+                              audio_format=audio_format,
+                              stream=stream,
+                              chunk_workers=chunk_workers,
+                              batch_size=batch_size,
+                              refresh=refresh,
+                              audio_cache=audio_cache,
+                              reuse_transcripts=reuse_transcripts,
+                              backend=backend,
+                              model_policy=model_policy,
+                              isolate_errors=False,
+                              cancel=cancel,
+                              on_listed=on_listed,
+                              on_stored=on_stored)
+    return video_data
+
+def run_batch(sources: List[Dict],
+              output_dir: Path,
+              save_as_text: bool,
+              model_size: str = DEFAULT_MODEL_SIZE,
+              download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+              transcribe_workers: int = DEFAULT_TRANSCRIBE_WORKERS,
+              prefetch: int = DEFAULT_PREFETCH,
+              incremental: bool = False,
+              audio_format: str = DEFAULT_AUDIO_FORMAT,
+              stream: bool = False,
+              chunk_workers: int = 0,
+              batch_size: int = 0,
+              refresh: bool = False,
+              resume: bool = False,
+              audio_cache: Optional[AudioCache] = None,
+              reuse_transcripts: bool = False,
+              backend: Union[str, TranscriberBackend] = DEFAULT_BACKEND,
+              model_policy: Optional[ModelPolicy] = None,
+              isolate_errors: bool = True,
+              run_id: Optional[str] = None,
+              cancel: Optional[threading.Event] = None,
+              on_listed: Optional[Callable[[List[Dict]], None]] = None,
+              on_stored: Optional[Callable[[Dict], None]] = None) -> Tuple[List, List[Dict]]:
+    """
+    Transcribe several channels and videos, e.g. the entries of a manifest, in one pipeline.
+    The model, YouTube client and DB are shared by all sources, and the worker limits apply to
+    the whole batch: videos of the next source download while the previous one is transcribed.
+
+    Every video is tracked in the journal table as it moves from queued to stored. A video that
+    fails is marked as failed and skipped, the rest of the batch carries on.
+
+    :param sources: Dicts with a channel_name or video_id and the max_videos, min_duration,
+                    max_duration, start_date and end_date filters, see manifest.load_manifest
+    :param audio_cache: Reuse audio downloaded by previous runs and cache the audio downloaded by this one
+    :param reuse_transcripts: Fingerprint downloaded audio and reuse the stored transcript of a video
+                              containing the same audio, e.g. a re-upload or a short cut from a stream
+    :param resume: Transcribe the videos previous runs didn't store first, then list the sources
+                   skipping videos already transcribed or failed JOURNAL_MAX_ATTEMPTS times. Videos of
+                   runs still in progress are left to them, resumed videos are downloaded again
+    :param isolate_errors: Record a source that can't be listed in the summary and carry on with the
+                           others instead of failing the batch
+    :param run_id: ID of the run in the journal and runs tables, generated when not provided. The stage
+                   timings of the run are summarized by metrics.get_stage_summary
+    :return: Video data and a summary per source, see run_transcription for the other parameters
+    """
+    if stream and audio_format == "mp3":
+        raise ValueError("Streaming transcription can't keep an MP3 copy of the audio")
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
     db_file = output_dir/DB_NAME
     # Initialize DB
     init_db(db_file=db_file)
+    cache = MetadataCache(db_file=db_file, refresh=refresh)
 
-    if video_id:
-        videos = get_single_video(video_id=video_id,
-                                  api_key=API_KEY)
-    else:
-        channel_id = get_channel_id(channel_name, API_KEY)
-        videos = get_channel_videos(channel_id=channel_id,
-                                    api_key=API_KEY,
-                                    max_num_of_videos=max_videos,
-                                    min_duration=min_duration,
-                                    max_duration=max_duration,
-                                    start_date=start_date,
-                                    end_date=end_date)
-
-    for video in videos:
-        tempdir = tempfile.TemporaryDirectory()
-        audio_path = download_audio(youtube_url=video["URL"], tempdir=tempdir.name)
-        audio_text = transcribe_audio(audio_path=audio_path,
-                                      video=video,
-                                      output_dir=output_dir,
-                                      save_as_text=save_as_text)
-
-        db_id = save_to_db(video_url=video["URL"],
-                           title=video["Title"],
-                           published_at=video["PublishedAt"],
-                           audio_text=audio_text,
-                           db_file=db_file)
-        if db_id:
-            video["id"] = db_id
-
-        video_data.append(video)
-        tempdir.cleanup()
+    # Resolved once, so every video shares the backend's models
+    backend = get_backend(backend)
+    run_id = run_id or uuid.uuid4().hex
+    recorder = RunRecorder(db_file=db_file, run_id=run_id)
+    pending = get_unfinished(db_file=db_file, max_attempts=JOURNAL_MAX_ATTEMPTS) if resume else []
+    if resume:
+        logger.info(f"Resuming {len(pending)} unfinished video(s)")
 
-    return video_data
+    labels = [describe_source(source) for source in sources] + (["resumed"] if pending else [])
+    summary = [{"Source": label, "Listed": 0, "Transcribed": 0, "Reused": 0, "Failed": 0, "AudioSeconds": 0.0,
+                "Started": None, "Finished": None, "Error": None} for label in labels]
+    source_of: Dict[str, int] = {}
+    summary_lock = threading.Lock()
+    # High-water marks of the channels, only moved once the whole batch is stored
+    syncs = []
+    # Fingerprints of the downloaded videos, saved with their transcripts
+    fingerprints: Dict[str, np.ndarray] = {}
+    # Matches of the videos whose transcript is copied from another video, recorded with the copy
+    matches: Dict[str, Dict] = {}
+    # Model recorded with the transcripts, a copied transcript keeps the model of the original
+    transcript_model = model_policy.describe(model_size) if model_policy else model_size
+
+    def skipped_urls(video_urls: Optional[List[str]] = None) -> Optional[Set[str]]:
+        if not incremental and not resume:
+            return None
+        skipped = get_transcribed_urls(db_file=db_file, video_urls=video_urls)
+        if resume:
+            skipped |= get_given_up_urls(db_file=db_file, max_attempts=JOURNAL_MAX_ATTEMPTS)
+        return skipped
+
+    def list_source(index: int, source: Dict) -> Iterable[Dict]:
+        if source.get("video_id"):
+            videos = get_single_video(video_id=source["video_id"],
+                                      api_key=get_youtube_api_key(),
+                                      cache=cache)
+            skipped = skipped_urls(video_urls=[v["URL"] for v in videos])
+            if skipped:
+                videos = [v for v in videos if v["URL"] not in skipped]
+            yield from videos
+            return
+
+        channel_id = get_channel_id(source["channel_name"], get_youtube_api_key(), cache=cache)
+        sync = get_channel_sync(db_file=db_file, channel_id=channel_id) if incremental else None
+        if sync:
+            logger.info(f"Channel last synced at {sync['SyncedAt']} up to video {sync['VideoId']}")
+
+        # Uploads are crawled in the background while the first videos already download
+        crawler = ChannelCrawler(
+            channel_id=channel_id,
+            api_key=get_youtube_api_key(),
+            max_num_of_videos=source.get("max_videos"),
+            min_duration=source.get("min_duration"),
+            max_duration=source.get("max_duration"),
+            start_date=source.get("start_date"),
+            end_date=source.get("end_date"),
+            until_video_id=sync["VideoId"] if sync else None,
+            until_published_at=convert_iso_to_datetime(sync["PublishedAt"]) if sync else None,
+            exclude_urls=skipped_urls(),
+            cache=cache
+        )
+        yield from crawler
+
+        # Only move the high-water mark when every upload newer than it has been really transcribed. If the
+        # listing was cut short by max_videos, a date or duration filter left uploads out or a simulated
+        # backend transcribed them, the next run would skip them
+        filtered = any(source.get(key) for key in ("start_date", "end_date", "min_duration", "max_duration"))
+        simulated = backend.name in SIMULATED_BACKENDS
+        if incremental and crawler.newest_upload and not filtered and not simulated and not crawler.truncated:
+            syncs.append((index, channel_id, crawler.newest_upload))
+
+    def listed() -> Iterator[Dict]:
+        found = []
+        # Videos left unfinished by the previous run go first, sources are only listed once iterated
+        listings = [(index, list_source(index, source)) for index, source in enumerate(sources)]
+        if pending:
+            listings.insert(0, (len(sources), pending))
+
+        for index, listing in listings:
+            # Only the time spent waiting for the listing counts, not the time the pipeline takes to accept a video
+            waited = 0.0
+            try:
+                listing = iter(listing)
+                while True:
+                    start = time.perf_counter()
+                    video = next(listing, None)
+                    waited += time.perf_counter() - start
+                    if video is None:
+                        break
+                    # A video listed by an earlier source is transcribed once
+                    if video["URL"] in source_of:
+                        continue
+                    source_of[video["URL"]] = index
+                    summary[index]["Listed"] += 1
+                    queue_videos(db_file=db_file, videos=[video], run_id=run_id, source=labels[index])
+                    found.append(video)
+                    yield video
+            except Exception as e:
+                if not isolate_errors:
+                    raise
+                logger.error(f"Skipping {summary[index]['Source']}: {e}")
+                summary[index]["Error"] = str(e)
+            else:
+                if index < len(sources):
+                    recorder.record(stage="metadata", seconds=waited, source=labels[index])
+
+        get_client().log_stats()
+        if incremental:
+            logger.info(f"Found {len(found)} new video(s) to transcribe")
+        if on_listed:
+            on_listed(found)
+
+    # MP3 is an archival format, so it is downloaded next to the transcripts instead of a temporary directory
+    audio_dir = output_dir/"audio" if audio_format == "mp3" else None
+    if audio_dir:
+        audio_dir.mkdir(parents=True, exist_ok=True)
+
+    def download(video: Dict) -> Union[AudioStream, Tuple[tempfile.TemporaryDirectory, str]]:
+        stats = summary[source_of[video["URL"]]]
+        with summary_lock:
+            if stats["Started"] is None:
+                stats["Started"] = time.monotonic()
+
+        video_id = video_id_from_url(video["URL"])
+        downloaded = None
+
+        if audio_cache:
+            tempdir = tempfile.TemporaryDirectory()
+            try:
+                cached = audio_cache.fetch(video_id=video_id,
+                                           audio_format=audio_format,
+                                           directory=audio_dir or tempdir.name)
+            except OSError as e:
+                logger.warning(f"Could not read the cached audio of {video_id}: {e}")
+                cached = None
+            if cached:
+                downloaded = tempdir, cached
+            else:
+                tempdir.cleanup()
+
+        if downloaded is None and stream:
+            # Streamed audio never touches the disk, so it can't be cached. The pipe starts when the transcription
+            # reads it: started ahead, every prefetched video would hold a yt-dlp and an ffmpeg process blocked on it
+            downloaded = AudioStream(youtube_url=video["URL"])
+        elif downloaded is None:
+            tempdir = tempfile.TemporaryDirectory()
+            download_stats = {}
+            start = time.perf_counter()
+            try:
+                downloaded = tempdir, download_audio(youtube_url=video["URL"],
+                                                     tempdir=audio_dir or tempdir.name,
+                                                     audio_format=audio_format,
+                                                     stats=download_stats)
+            except BaseException:
+                tempdir.cleanup()
+                raise
+            transcode_seconds = download_stats.get("TranscodeSeconds", 0.0)
+            recorder.record(stage="download", seconds=time.perf_counter() - start - transcode_seconds,
+                            video_url=video["URL"], source=labels[source_of[video["URL"]]],
+                            num_bytes=download_stats.get("DownloadBytes"))
+            if transcode_seconds:
+                recorder.record(stage="transcode", seconds=transcode_seconds, video_url=video["URL"],
+                                source=labels[source_of[video["URL"]]])
+
+            if audio_cache:
+                try:
+                    audio_cache.put(video_id=video_id, audio_format=audio_format, path=downloaded[1])
+                except OSError as e:
+                    logger.warning(f"Could not cache the audio of {video_id}: {e}")
+
+        set_state(db_file=db_file, video_url=video["URL"], state=DOWNLOADED)
+        return downloaded
+
+    def transcribe(video: Dict, downloaded: Union[AudioStream, Tuple[tempfile.TemporaryDirectory, str]]) -> Tuple:
+        # Even with stream, audio found in the cache is a file, streamed audio includes the wait for the download
+        streamed = isinstance(downloaded, AudioStream)
+        audio = downloaded if streamed else downloaded[1]
+        if reuse_transcripts and not streamed:
+            # Fingerprinted here rather than after the download, so the samples are decoded once for both
+            try:
+                audio, fingerprints[video["URL"]] = decode_and_fingerprint(audio)
+            except Exception as e:
+                logger.warning(f"Could not fingerprint the audio of {video['URL']}: {e}")
+
+        transcript = reused_transcript(video)
+        if transcript is None:
+            source = labels[source_of[video["URL"]]]
+            # Long videos split across processes load their models in the worker processes
+            if backend.capabilities.needs_model and chunk_workers <= 1:
+                with recorder.stage("model_load", video_url=video["URL"], source=source):
+                    if model_policy:
+                        # Larger models are only loaded if the fast pass is unsure about some of the audio
+                        fast = model_policy.fast_pass(model_size=model_size)
+                        backend.load(fast.model_size, compute_type=fast.compute_type)
+                    else:
+                        backend.load(model_size)
+
+            with recorder.stage("decode", video_url=video["URL"], source=source) as extra:
+                transcript = transcribe_video(audio_path=audio,
+                                              video=video,
+                                              output_dir=output_dir,
+                                              save_as_text=save_as_text,
+                                              model_size=model_size,
+                                              chunk_workers=chunk_workers,
+                                              batch_size=batch_size,
+                                              cancel=cancel,
+                                              backend=backend,
+                                              model_policy=model_policy)
+                extra["AudioSeconds"] = transcript[1][-1].end if transcript[1] else 0.0
+            if streamed:
+                record_stream(video, downloaded)
+        set_state(db_file=db_file, video_url=video["URL"], state=TRANSCRIBED)
+        return transcript
+
+    def reused_transcript(video: Dict) -> Optional[Tuple]:
+        fingerprint = fingerprints.get(video["URL"])
+        if fingerprint is None:
+            return None
+
+        # A transcript made with a smaller model than requested is transcribed again
+        match = find_match(db_file=db_file, fingerprint=fingerprint, exclude_url=video["URL"],
+                           model_size=transcript_model)
+        transcript = reuse_transcript(db_file=db_file, match=match) if match else None
+        if transcript is None:
+            return None
+        matches[video["URL"]] = match
+
+        logger.info(f"Reusing the transcript of {match['URL']} from {match['Offset']}s for {video['URL']} "
+                    f"(bit error rate {match['BitErrorRate']:.2f})")
+        if save_as_text:
+            write_segments_to_file(audio_text=transcript[0],
+                                   filepath=text_file_path(output_dir=output_dir, video=video))
+        with summary_lock:
+            summary[source_of[video["URL"]]]["Reused"] += 1
+        get_metrics().inc("video_to_text_reused_transcripts_total")
+        return transcript
+
+    def record_stream(video: Dict, audio: AudioStream):
+        # The download of a stream overlaps its transcription, so it is recorded once the stream is closed
+        audio.close()
+        stats = audio.stats()
+        if stats["DownloadSeconds"] is not None:
+            recorder.record(stage="download", seconds=stats["DownloadSeconds"], video_url=video["URL"],
+                            source=labels[source_of[video["URL"]]], num_bytes=stats["DownloadBytes"])
+
+    def release(downloaded: Union[AudioStream, Tuple[tempfile.TemporaryDirectory, str]]):
+        if isinstance(downloaded, AudioStream):
+            downloaded.close()
+        else:
+            downloaded[0].cleanup()
+
+    def store(video: Dict, transcript: Tuple) -> Dict:
+        audio_text, segments = transcript
+        match = matches.pop(video["URL"], None)
+        with recorder.stage("db_write", video_url=video["URL"], source=labels[source_of[video["URL"]]]):
+            db_id = save_to_db(video_url=video["URL"],
+                               title=video["Title"],
+                               published_at=video["PublishedAt"],
+                               audio_text=audio_text,
+                               db_file=db_file,
+                               segments=segments,
+                               model=match["Model"] if match else transcript_model,
+                               backend=match["Backend"] if match else backend.name,
+                               reused_from=match["URL"] if match else None,
+                               reused_offset=match["Offset"] if match else None)
+        if not db_id:
+            raise RuntimeError(f"Could not save the transcript of {video['URL']}")
+        video["id"] = db_id
+        fingerprint = fingerprints.pop(video["URL"], None)
+        if fingerprint is not None and len(fingerprint):
+            save_fingerprint(db_file=db_file, video_url=video["URL"], fingerprint=fingerprint)
+        set_state(db_file=db_file, video_url=video["URL"], state=STORED)
+
+        stats = summary[source_of[video["URL"]]]
+        with summary_lock:
+            stats["Transcribed"] += 1
+            stats["AudioSeconds"] += segments[-1].end if segments else 0.0
+            stats["Finished"] = time.monotonic()
+        get_metrics().inc("video_to_text_videos_total", status="stored")
+
+        return video
+
+    def failed(video: Dict, error: Exception):
+        logger.error(f"Failed to transcribe {video['URL']}: {error}")
+        fingerprints.pop(video["URL"], None)
+        matches.pop(video["URL"], None)
+        set_state(db_file=db_file, video_url=video["URL"], state=FAILED, error=str(error))
+        with summary_lock:
+            summary[source_of[video["URL"]]]["Failed"] += 1
+        get_metrics().inc("video_to_text_videos_total", status="failed")
+
+    pipeline = Pipeline(download=download,
+                        transcribe=transcribe,
+                        store=store,
+                        release=release,
+                        download_workers=download_workers,
+                        transcribe_workers=transcribe_workers,
+                        prefetch=prefetch)
+
+    start_run(run_id)
+    try:
+        video_data = pipeline.run(listed(), cancel=cancel, on_result=on_stored, on_error=failed)
+    finally:
+        finish_run(run_id)
+
+    for index, channel_id, newest_upload in syncs:
+        # Failed videos must be listed again by the next incremental run
+        if summary[index]["Failed"]:
+            logger.warning(f"Not recording the sync of {labels[index]}, {summary[index]['Failed']} video(s) failed")
+            continue
+        set_channel_sync(db_file=db_file,
+                         channel_id=channel_id,
+                         video_id=newest_upload["VideoId"],
+                         published_at=newest_upload["PublishedAt"])
+
+    return video_data, [summarize(stats) for stats in summary]
+
+def describe_source(source: Dict) -> str:
+    """
+    :param source: Batch source
+    :return: Label of the source used in logs and summaries
+    """
+    if source.get("video_id"):
+        return f"video {source['video_id']}"
+    return f"channel {source['channel_name']}"
+
+def summarize(stats: Dict) -> Dict:
+    """
+    Compute the throughput of a batch source
+
+    :param stats: Counters collected while the source was transcribed
+    :return: Source, Listed, Transcribed, Reused (transcripts taken from matching audio), Failed,
+             AudioSeconds, WallSeconds (first download to last stored transcript), VideosPerHour,
+             RealtimeFactor (audio seconds per wall second) and Error
+    """
+    wall = stats["Finished"] - stats["Started"] if stats["Finished"] is not None else 0.0
+    return {"Source": stats["Source"],
+            "Listed": stats["Listed"],
+            "Transcribed": stats["Transcribed"],
+            "Reused": stats["Reused"],
+            "Failed": stats["Failed"],
+            "AudioSeconds": round(stats["AudioSeconds"], 1),
+            "WallSeconds": round(wall, 1),
+            "VideosPerHour": round(stats["Transcribed"] * 3600 / wall, 1) if wall > 0 else None,
+            "RealtimeFactor": round(stats["AudioSeconds"] / wall, 2) if wall > 0 else None,
+            "Error": stats["Error"]}
+
+def stream_transcription(video_id: str,
+                         output_dir: Path,
+                         model_size: str = DEFAULT_MODEL_SIZE,
+                         stream: bool = False,
+                         batch_size: int = 0,
+                         backend: Union[str, TranscriberBackend] = DEFAULT_BACKEND,
+                         model_policy: Optional[ModelPolicy] = None,
+                         slot: Optional[ContextManager] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Transcribe a single video, yielding its segments as soon as they are decoded. The
+    transcript is saved in the DB once the whole video has been transcribed.
+
+    Yields ("video", video) first, then ("segment", segment) for every segment in the format
+    of database.get_segments, and finally ("done", video) with the DB id of the transcript.
+
+    :param video_id: ID of the video
+    :param output_dir: Directory containing the DB
+    :param model_size: Whisper model size
+    :param stream: Pipe audio from yt-dlp through ffmpeg into the model instead of downloading it first
+    :param batch_size: Use batched inference with this batch size, 0 disables
+    :param backend: Transcriber backend, see TRANSCRIBER_BACKENDS
+    :param model_policy: Adapt the model to the video with model_size as the largest model, see
+                         model_policy.ModelPolicy
+    :param slot: Held from the first event until the transcript is saved or the iterator is closed,
+                 e.g. JobManager.slot() so streamed transcriptions count towards max_jobs
+    :return: Iterator of (event, data) tuples
+    """
+    backend = get_backend(backend)
+    # Taken before anything is downloaded, so a busy server fails fast on the first event
+    with slot if slot is not None else nullcontext():
+        output_dir.mkdir(parents=True, exist_ok=True)
+        db_file = output_dir/DB_NAME
+        init_db(db_file=db_file)
+
+        videos = get_single_video(video_id=video_id, api_key=get_youtube_api_key(),
+                                  cache=MetadataCache(db_file=db_file))
+        if not videos:
+            raise YouTubeAPIException(f"Video '{video_id}' not found")
+
+        video = videos[0]
+        yield "video", video
+
+        # Decoding is paced by the client reading the segments, so only download and DB write are timed
+        recorder = RunRecorder(db_file=db_file, run_id=uuid.uuid4().hex)
+        audio = AudioStream(youtube_url=video["URL"]).start() if stream else None
+        tempdir = None if stream else tempfile.TemporaryDirectory()
+
+        segments = []
+        try:
+            if tempdir:
+                with recorder.stage("download", video_url=video["URL"]) as extra:
+                    download_stats = {}
+                    audio = download_audio(youtube_url=video["URL"], tempdir=tempdir.name, stats=download_stats)
+                    extra["Bytes"] = download_stats.get("DownloadBytes")
+
+            for segment in transcribe_segments(audio=audio, model_size=model_size, batch_size=batch_size,
+                                               backend=backend, model_policy=model_policy):
+                yield "segment", segment_to_dict(segment, index=len(segments))
+                segments.append(segment)
+        finally:
+            # Also runs when the client disconnects and the generator is closed
+            if stream:
+                audio.close()
+            else:
+                tempdir.cleanup()
+
+        stream_stats = audio.stats() if stream else {}
+        if stream_stats.get("DownloadSeconds") is not None:
+            recorder.record(stage="download", seconds=stream_stats["DownloadSeconds"], video_url=video["URL"],
+                            num_bytes=stream_stats["DownloadBytes"])
+
+        with recorder.stage("db_write", video_url=video["URL"]):
+            video["id"] = save_to_db(video_url=video["URL"],
+                                     title=video["Title"],
+                                     published_at=video["PublishedAt"],
+                                     audio_text=" ".join(s.text for s in segments),
+                                     db_file=db_file,
+                                     segments=segments,
+                                     model=model_policy.describe(model_size) if model_policy else model_size,
+                                     backend=backend.name)
+        get_metrics().inc("video_to_text_videos_total", status="stored")
+        yield "done", video
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import queue
+import threading
+
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Container, Dict, Iterator, List, Optional
+
+from video_to_text.constants import DEFAULT_CRAWL_CONCURRENCY, YOUTUBE_MAX_RESULTS
+from video_to_text.exceptions import YouTubeAPIException
+from video_to_text.get_yt_videos import (filter_by_duration, get_playlist_page, get_uploads_playlist_id,
+                                         get_video_durations, select_playlist_items)
+from video_to_text.metadata_cache import MetadataCache
+from video_to_text.youtube_client import YouTubeClient, get_client
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+class ChannelCrawler:
+    """
+    Lists the uploads of a channel with asyncio, taking the same filters as
+    get_yt_videos.list_channel_videos.
+
+    Playlist pages have to be fetched one after the other, but the next page is requested
+    while the durations of the previous pages are still being looked up, with at most
+    `concurrency` requests in flight. The blocking YouTube client runs in worker threads, so
+    the event loop is never blocked. Videos are yielded in playlist order as soon as their
+    page is resolved:
+
+        async for video in ChannelCrawler(channel_id, api_key):
+            ...
+
+    The crawler can also be iterated synchronously, in which case it runs on its own event
+    loop in a background thread. Once exhausted, newest_upload holds the newest upload of the
+    channel and truncated tells whether listing stopped at max_num_of_videos.
+    """
+
+    def __init__(self,
+                 channel_id: str,
+                 api_key: str,
+                 max_num_of_videos: Optional[int] = None,
+                 min_duration: Optional[int] = None,
+                 max_duration: Optional[int] = None,
+                 start_date: Optional[datetime] = None,
+                 end_date: Optional[datetime] = None,
+                 until_video_id: Optional[str] = None,
+                 until_published_at: Optional[datetime] = None,
+                 exclude_urls: Optional[Container[str]] = None,
+                 client: Optional[YouTubeClient] = None,
+                 cache: Optional[MetadataCache] = None,
+                 concurrency: int = DEFAULT_CRAWL_CONCURRENCY):
+        """
+        :param channel_id: ID of the channel
+        :param api_key: API key for authentication
+        :param max_num_of_videos: Maximum number of videos to retrieve
+        :param min_duration: Minimum duration of the video to retrieve
+        :param max_duration: Maximum duration of the video to retrieve
+        :param start_date: Include videos published on or after this date
+        :param end_date: Include videos published on or before this date
+        :param until_video_id: Stop listing when this (already synced) upload is reached
+        :param until_published_at: Stop listing at uploads published before this date
+        :param exclude_urls: URLs of videos to skip, e.g. videos already transcribed
+        :param client: YouTube API client, the process-wide client when not provided
+        :param cache: Metadata cache
+        :param concurrency: Maximum number of concurrent API requests
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be positive")
+
+        self.channel_id = channel_id
+        self.api_key = api_key
+        self.max_num_of_videos = max_num_of_videos
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.start_date = start_date
+        self.end_date = end_date
+        self.until_video_id = until_video_id
+        self.until_published_at = until_published_at
+        self.exclude_urls = exclude_urls
+        self.client = client or get_client()
+        self.cache = cache
+        self.concurrency = concurrency
+        self.newest_upload: Optional[Dict] = None
+        self.truncated = False
+
+    def __aiter__(self) -> AsyncIterator[Dict]:
+        return self.crawl()
+
+    async def crawl(self) -> AsyncIterator[Dict]:
+        """
+        :return: Async iterator of videos, newest first
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def call(fn, **kwargs):
+            async with semaphore:
+                return await asyncio.to_thread(fn, **kwargs)
+
+        async def fetch_page(page_token: Optional[str]) -> Dict:
+            return await call(get_playlist_page, playlist_id=playlist_id, api_key=self.api_key,
+                              page_token=page_token, client=self.client)
+
+        async def resolve_page(candidates: List[Dict]) -> List[Dict]:
+            durations = {}
+            if candidates and (self.min_duration or self.max_duration):
+                durations = await call(get_video_durations,
+                                       video_ids=[item["contentDetails"]["videoId"] for item in candidates],
+                                       api_key=self.api_key,
+                                       client=self.client,
+                                       cache=self.cache)
+            return filter_by_duration(items=candidates, durations=durations,
+                                      min_duration=self.min_duration, max_duration=self.max_duration)
+
+        playlist_id = await call(get_uploads_playlist_id, channel_id=self.channel_id, api_key=self.api_key,
+                                 client=self.client, cache=self.cache)
+
+        count = 0
+        pending: "deque[asyncio.Task]" = deque()
+        next_page: Optional[asyncio.Task] = asyncio.create_task(fetch_page(None))
+        try:
+            while pending or next_page:
+                # Yield resolved pages in order. Wait for the oldest page when too many are
+                # in flight or when there is nothing left to fetch
+                while pending and (pending[0].done() or len(pending) >= self.concurrency or next_page is None):
+                    for video in await pending.popleft():
+                        yield video
+                        count += 1
+                        if self.max_num_of_videos and count >= self.max_num_of_videos:
+                            self.truncated = True
+                            return
+
+                if next_page is None:
+                    continue
+
+                res = await next_page
+                next_page = None
+                try:
+                    items = res.get("items", [])
+                    if self.newest_upload is None and items:
+                        self.newest_upload = {"VideoId": items[0]["contentDetails"]["videoId"],
+                                              "PublishedAt": items[0]["snippet"]["publishedAt"]}
+
+                    candidates, reached_synced_upload = select_playlist_items(
+                        items=items,
+                        start_date=self.start_date,
+                        end_date=self.end_date,
+                        until_video_id=self.until_video_id,
+                        until_published_at=self.until_published_at,
+                        exclude_urls=self.exclude_urls
+                    )
+                except (ValueError, KeyError) as e:
+                    raise YouTubeAPIException(e)
+
+                page_token = res.get("nextPageToken")
+                if page_token and not reached_synced_upload:
+                    next_page = asyncio.create_task(fetch_page(page_token))
+                pending.append(asyncio.create_task(resolve_page(candidates)))
+        finally:
+            for task in [next_page, *pending]:
+                if task:
+                    task.cancel()
+
+    def __iter__(self) -> Iterator[Dict]:
+        videos: "queue.Queue" = queue.Queue(maxsize=YOUTUBE_MAX_RESULTS)
+        stop = threading.Event()
+
+        async def put(item) -> bool:
+            # Never block the loop on a full queue, so in-flight requests keep completing
+            while not stop.is_set():
+                try:
+                    videos.put_nowait(item)
+                    return True
+                except queue.Full:
+                    await asyncio.sleep(0.05)
+            return False
+
+        async def produce():
+            try:
+                async for video in self.crawl():
+                    if not await put(video):
+                        return
+            except Exception as e:
+                await put(e)
+            finally:
+                await put(_DONE)
+
+        thread = threading.Thread(target=asyncio.run, args=(produce(),), name="channel-crawler", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = videos.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
@@ -1,7 +1,14 @@
+import math
 import sqlite3
 import logging
 
-from video_to_text.constants import TABLE_NAME
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from video_to_text.constants import (FINGERPRINT_INDEX_TABLE_NAME, FINGERPRINTS_TABLE_NAME, JOURNAL_TABLE_NAME,
+                                     METADATA_CACHE_TABLE_NAME, RUNS_TABLE_NAME, SEGMENTS_FTS_TABLE_NAME,
+                                     SEGMENTS_TABLE_NAME, SIMULATED_BACKENDS, SQLITE_MAX_PARAMS_BATCH, SYNC_TABLE_NAME,
+                                     TABLE_NAME, TRANSCRIPTS_FTS_TABLE_NAME, WHISPER_WINDOW_SECONDS)
 
 logger = logging.getLogger(__name__)
 
@@ -15,25 +22,379 @@ def init_db(db_file):
             video_url TEXT UNIQUE,
             title TEXT,
             published_at TEXT,
-            transcript TEXT
+            transcript TEXT,
+            model TEXT,
+            backend TEXT,
+            reused_from TEXT,
+            reused_offset REAL
+        )
+        """)
+        # Columns added after the first release, DBs created before lack them
+        _add_missing_columns(conn, TABLE_NAME, {"model": "TEXT", "backend": "TEXT", "reused_from": "TEXT",
+                                                "reused_offset": "REAL"})
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SEGMENTS_TABLE_NAME} (
+            video_id INTEGER NOT NULL REFERENCES {TABLE_NAME}(id),
+            idx INTEGER NOT NULL,
+            start_time REAL NOT NULL,
+            end_time REAL NOT NULL,
+            text TEXT,
+            avg_logprob REAL,
+            no_speech_prob REAL,
+            confidence REAL,
+            PRIMARY KEY (video_id, idx)
+        )
+        """)
+        conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{SEGMENTS_TABLE_NAME}_video_start
+        ON {SEGMENTS_TABLE_NAME} (video_id, start_time)
+        """)
+        _init_fts(conn)
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SYNC_TABLE_NAME} (
+            channel_id TEXT PRIMARY KEY,
+            last_video_id TEXT,
+            last_published_at TEXT,
+            synced_at TEXT
         )
         """)
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {METADATA_CACHE_TABLE_NAME} (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            fetched_at TEXT NOT NULL,
+            PRIMARY KEY (kind, key)
+        )
+        """)
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {JOURNAL_TABLE_NAME} (
+            video_url TEXT PRIMARY KEY,
+            video TEXT NOT NULL,
+            source TEXT,
+            run_id TEXT,
+            owner_pid INTEGER,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            updated_at TEXT NOT NULL
+        )
+        """)
+        _add_missing_columns(conn, JOURNAL_TABLE_NAME, {"owner_pid": "INTEGER"})
+        conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{JOURNAL_TABLE_NAME}_state
+        ON {JOURNAL_TABLE_NAME} (state)
+        """)
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FINGERPRINTS_TABLE_NAME} (
+            video_url TEXT PRIMARY KEY,
+            frames INTEGER NOT NULL,
+            fingerprint BLOB NOT NULL
+        )
+        """)
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FINGERPRINT_INDEX_TABLE_NAME} (
+            hash INTEGER NOT NULL,
+            video_url TEXT NOT NULL,
+            frame INTEGER NOT NULL
+        )
+        """)
+        conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{FINGERPRINT_INDEX_TABLE_NAME}_hash
+        ON {FINGERPRINT_INDEX_TABLE_NAME} (hash)
+        """)
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {RUNS_TABLE_NAME} (
+            run_id TEXT NOT NULL,
+            source TEXT,
+            video_url TEXT,
+            stage TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            bytes INTEGER,
+            audio_seconds REAL,
+            recorded_at TEXT NOT NULL
+        )
+        """)
+        conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{RUNS_TABLE_NAME}_run_id
+        ON {RUNS_TABLE_NAME} (run_id)
+        """)
         conn.commit()
 
-def save_to_db(video_url, title, published_at, audio_text, db_file) -> int:
+def batched(items: Iterable, size: int = SQLITE_MAX_PARAMS_BATCH) -> Iterator[List]:
+    """
+    Split values bound to an IN (...) query into batches, so a query stays below SQLite's limit on host parameters
+
+    :param items: Values to bind
+    :param size: Values per batch
+    :return: Iterator of lists of at most size values
+    """
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]):
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for column, column_type in columns.items():
+        if column not in existing:
+            logger.info(f"Adding column {column} to {table}")
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+def _init_fts(conn: sqlite3.Connection):
+    """
+    Create FTS5 indexes over transcripts and segments, kept in sync by triggers.
+    Indexes added to an existing DB are built from the rows already present.
+    """
+    for table, fts_table, columns, rowid in (
+            (TABLE_NAME, TRANSCRIPTS_FTS_TABLE_NAME, ("title", "transcript"), "id"),
+            (SEGMENTS_TABLE_NAME, SEGMENTS_FTS_TABLE_NAME, ("text",), "rowid"),
+    ):
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,)).fetchone()
+
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"new.{c}" for c in columns)
+        old_values = ", ".join(f"old.{c}" for c in columns)
+
+        conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+        USING fts5({column_list}, content='{table}', content_rowid='{rowid}', tokenize='porter unicode61')
+        """)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.{rowid}, {new_values});
+        END
+        """)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.{rowid}, {old_values});
+        END
+        """)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.{rowid}, {old_values});
+            INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.{rowid}, {new_values});
+        END
+        """)
+
+        if not exists:
+            logger.info(f"Building full-text index {fts_table}")
+            conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+def save_to_db(video_url,
+               title,
+               published_at,
+               audio_text,
+               db_file,
+               segments: Optional[Iterable] = None,
+               model: Optional[str] = None,
+               backend: Optional[str] = None,
+               reused_from: Optional[str] = None,
+               reused_offset: Optional[float] = None) -> int:
+    """
+    Save a transcript, replacing any previous transcript of the video
+
+    :param video_url: URL of the video
+    :param title: Title of the video
+    :param published_at: Publish date of the video
+    :param audio_text: Full transcript
+    :param db_file: Path to the DB
+    :param segments: Timestamped segments of the transcript (faster-whisper Segments)
+    :param model: Model the transcript was made with
+    :param backend: Transcriber backend the transcript was made with, see TRANSCRIBER_BACKENDS
+    :param reused_from: URL of the video the transcript was copied from, see fingerprint.reuse_transcript
+    :param reused_offset: Seconds into that video the copied transcript starts at
+    :return: ID of the transcript
+    """
     try:
         with sqlite3.connect(db_file, timeout=30) as conn:
             logger.info("Writing to DB")
 
             cur = conn.cursor()
+            # Replaced rows are deleted explicitly: REPLACE assigns a new id, so the old segments must go, and
+            # its implicit delete doesn't fire the triggers keeping the full-text index in sync
             cur.execute(
-                "INSERT OR REPLACE INTO transcripts (video_url, title, published_at, transcript) VALUES (?, ?, ?, ?)",
-                (video_url, title, published_at, audio_text)
+                f"DELETE FROM {SEGMENTS_TABLE_NAME} WHERE video_id IN (SELECT id FROM {TABLE_NAME} WHERE video_url = ?)",
+                (video_url,)
+            )
+            cur.execute(f"DELETE FROM {TABLE_NAME} WHERE video_url = ?", (video_url,))
+            cur.execute(
+                f"INSERT OR REPLACE INTO {TABLE_NAME} "
+                f"(video_url, title, published_at, transcript, model, backend, reused_from, reused_offset) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (video_url, title, published_at, audio_text, model, backend, reused_from, reused_offset)
             )
             new_id = cur.lastrowid
+
+            if segments:
+                cur.executemany(
+                    f"INSERT INTO {SEGMENTS_TABLE_NAME} "
+                    f"(video_id, idx, start_time, end_time, text, avg_logprob, no_speech_prob, confidence) "
+                    f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(new_id, idx, s.start, s.end, s.text.strip(), s.avg_logprob, s.no_speech_prob,
+                      math.exp(s.avg_logprob) if s.avg_logprob is not None else None)
+                     for idx, s in enumerate(segments)]
+                )
             conn.commit()
 
             return new_id
 
     except sqlite3.OperationalError as e:
         print(f"Could not write to DB: {e}")
+
+def get_segments(db_file, video_url: str, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
+    """
+    Return the segments of a transcript overlapping a time range
+
+    :param db_file: Path to the DB
+    :param video_url: URL of the video
+    :param start: Start of the range in seconds, from the beginning when not provided
+    :param end: End of the range in seconds, to the end when not provided
+    :return: List of segments ordered by time
+    """
+    query = (f"SELECT s.idx, s.start_time, s.end_time, s.text, s.avg_logprob, s.no_speech_prob, s.confidence "
+             f"FROM {SEGMENTS_TABLE_NAME} s JOIN {TABLE_NAME} t ON s.video_id = t.id "
+             f"WHERE t.video_url = ?")
+    params: List = [video_url]
+
+    if start is not None:
+        # Segments never exceed Whisper's 30 s window, which bounds the index range scan on start_time
+        query += " AND s.start_time > ? AND s.end_time > ?"
+        params.extend([start - WHISPER_WINDOW_SECONDS, start])
+    if end is not None:
+        query += " AND s.start_time < ?"
+        params.append(end)
+
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        rows = conn.execute(query + " ORDER BY s.start_time", params).fetchall()
+
+    return [{"Index": row[0], "Start": row[1], "End": row[2], "Text": row[3],
+             "AvgLogprob": row[4], "NoSpeechProb": row[5], "Confidence": row[6]}
+            for row in rows]
+
+def search_transcripts(db_file, query: str, limit: int = 10, segments_per_result: int = 3) -> List[Dict]:
+    """
+    Full-text search over transcripts, best matches first
+
+    :param db_file: Path to the DB
+    :param query: Words to search for. All words must match; "quoted phrases" are matched as phrases
+    :param limit: Maximum number of transcripts to return
+    :param segments_per_result: Maximum number of matching segments (with timestamps) per transcript
+    :return: List of matches with a highlighted snippet and, where segment data exists, matching segments
+    """
+    fts_query = to_fts_query(query)
+    if not fts_query:
+        return []
+
+    results = []
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        rows = conn.execute(f"""
+            SELECT t.id, t.video_url, t.title, t.published_at,
+                   snippet({TRANSCRIPTS_FTS_TABLE_NAME}, 1, '[', ']', '...', 16),
+                   bm25({TRANSCRIPTS_FTS_TABLE_NAME}, 5.0, 1.0) AS rank
+            FROM {TRANSCRIPTS_FTS_TABLE_NAME}
+            JOIN {TABLE_NAME} t ON t.id = {TRANSCRIPTS_FTS_TABLE_NAME}.rowid
+            WHERE {TRANSCRIPTS_FTS_TABLE_NAME} MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """, (fts_query, limit)).fetchall()
+
+        for db_id, video_url, title, published_at, snippet, rank in rows:
+            segments = conn.execute(f"""
+                SELECT s.start_time, s.end_time, s.text
+                FROM {SEGMENTS_FTS_TABLE_NAME}
+                JOIN {SEGMENTS_TABLE_NAME} s ON s.rowid = {SEGMENTS_FTS_TABLE_NAME}.rowid
+                WHERE {SEGMENTS_FTS_TABLE_NAME} MATCH ? AND s.video_id = ?
+                ORDER BY bm25({SEGMENTS_FTS_TABLE_NAME})
+                LIMIT ?
+            """, (fts_query, db_id, segments_per_result)).fetchall()
+
+            results.append({
+                "id": db_id,
+                "Title": title,
+                "URL": video_url,
+                "PublishedAt": published_at,
+                "Snippet": snippet,
+                "Rank": rank,
+                "Segments": [{"Start": start, "End": end, "Text": text}
+                             for start, end, text in sorted(segments)]
+            })
+
+    return results
+
+def to_fts_query(query: str) -> str:
+    """
+    Turn user input into an FTS5 query matching all words, so that punctuation in the
+    input can't be interpreted as FTS5 syntax
+
+    :param query: User input, may contain "quoted phrases"
+    :return: FTS5 query
+    """
+    terms = []
+    for i, part in enumerate(query.split('"')):
+        if i % 2:
+            # Inside quotes, keep the phrase
+            if part.strip():
+                terms.append(f'"{part.strip()}"')
+        else:
+            terms.extend(f'"{word}"' for word in part.split())
+    return " ".join(terms)
+
+def get_transcribed_urls(db_file, video_urls: Optional[Iterable[str]] = None) -> Set[str]:
+    """
+    Return URLs of videos that already have a transcript. Transcripts of SIMULATED_BACKENDS don't count,
+    so the videos are transcribed for real by the next run
+
+    :param db_file: Path to the DB
+    :param video_urls: Only check these URLs. All transcribed URLs are returned when not provided
+    :return: Set of video URLs
+    """
+    real = f"(backend IS NULL OR backend NOT IN ({','.join('?' * len(SIMULATED_BACKENDS))}))"
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        if video_urls is None:
+            rows = conn.execute(f"SELECT video_url FROM {TABLE_NAME} WHERE {real}", SIMULATED_BACKENDS)
+            return {row[0] for row in rows}
+
+        found = set()
+        for batch in batched(video_urls):
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(f"SELECT video_url FROM {TABLE_NAME} WHERE video_url IN ({placeholders}) AND {real}",
+                                [*batch, *SIMULATED_BACKENDS])
+            found.update(row[0] for row in rows)
+        return found
+
+def get_channel_sync(db_file, channel_id: str) -> Optional[Dict]:
+    """
+    Return the high-water mark of the last sync of a channel
+
+    :param db_file: Path to the DB
+    :param channel_id: ID of the channel
+    :return: Dict with VideoId, PublishedAt and SyncedAt of the newest synced upload, None if never synced
+    """
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        row = conn.execute(
+            f"SELECT last_video_id, last_published_at, synced_at FROM {SYNC_TABLE_NAME} WHERE channel_id = ?",
+            (channel_id,)
+        ).fetchone()
+
+    if not row:
+        return None
+
+    return {"VideoId": row[0], "PublishedAt": row[1], "SyncedAt": row[2]}
+
+def set_channel_sync(db_file, channel_id: str, video_id: str, published_at: str):
+    """
+    Record the newest upload of a channel that has been synced
+
+    :param db_file: Path to the DB
+    :param channel_id: ID of the channel
+    :param video_id: ID of the newest synced upload
+    :param published_at: Publish date of the newest synced upload
+    """
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        logger.info(f"Recording sync of channel {channel_id} up to video {video_id}")
+        conn.execute(
+            f"INSERT OR REPLACE INTO {SYNC_TABLE_NAME} (channel_id, last_video_id, last_published_at, synced_at) "
+            f"VALUES (?, ?, ?, ?)",
+            (channel_id, video_id, published_at, datetime.now(timezone.utc).isoformat())
+        )
+        conn.commit()
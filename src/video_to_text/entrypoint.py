@@ -1,11 +1,23 @@
 import click
 import logging
+import uuid
 from pathlib import Path
 from platformdirs import user_data_dir
 
-from video_to_text.constants import DB_NAME
+from video_to_text.audio_cache import AudioCache
+from video_to_text.constants import (APP_NAME, AUDIO_FORMATS, DB_NAME, DEFAULT_AUDIO_CACHE_SIZE_GB,
+                                     DEFAULT_AUDIO_FORMAT, DEFAULT_BACKEND, DEFAULT_DOWNLOAD_WORKERS, DEFAULT_FAST_MODEL,
+                                     DEFAULT_MODEL_POLICY, DEFAULT_MODEL_SIZE, DEFAULT_PREFETCH,
+                                     DEFAULT_TRANSCRIBE_WORKERS, LONG_AUDIO_SECONDS, MODEL_POLICIES,
+                                     TRANSCRIBER_BACKENDS)
 from video_to_text.cli.callbacks import parse_max_videos
-from video_to_text.core import run_transcription
+from video_to_text.cli.search import search
+from video_to_text.cli.summary import format_stage_summary, format_summary
+from video_to_text.cli.worker import worker
+from video_to_text.manifest import load_manifest
+from video_to_text.metrics import get_stage_summary
+from video_to_text.model_policy import get_model_policy
+from video_to_text.utils import load_env
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,7 +27,9 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-@click.command()
+DEFAULT_OUTPUT_DIR = Path(user_data_dir(appname=APP_NAME))
+
+@click.group(invoke_without_command=True)
 @click.option(
     "--channel-name", "-c",
     help="Name of the YouTube channel"
@@ -24,10 +38,16 @@ logger = logging.getLogger(__name__)
     "--video-id", "-v",
     help="ID of the video to be retrieved"
 )
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="JSON, YAML or CSV file listing channels and videos, with optional filters per entry, "
+         "transcribed in one run"
+)
 @click.option(
     "--output-dir", "-o",
     type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
-    default=Path(user_data_dir(appname="video_to_text")),
+    default=DEFAULT_OUTPUT_DIR,
     show_default=True,        # shows [~] in help
     help="Directory to save transcribed text files"
 )
@@ -65,30 +85,248 @@ default=False,
 show_default=True,
 help="Save transcribed audio in .text file"
 )
+@click.option(
+    "--model-size",
+    default=DEFAULT_MODEL_SIZE,
+    show_default=True,
+    help="Whisper model size (tiny, base, small, medium, large-v3) or path to a converted model"
+)
+@click.option(
+    "--download-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_DOWNLOAD_WORKERS,
+    show_default=True,
+    help="Number of videos downloaded concurrently"
+)
+@click.option(
+    "--transcribe-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_TRANSCRIBE_WORKERS,
+    show_default=True,
+    help="Number of videos transcribed concurrently"
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=0),
+    default=DEFAULT_PREFETCH,
+    show_default=True,
+    help="Number of videos downloaded ahead of transcription"
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Skip videos already transcribed and stop listing the channel at the last synced upload"
+)
+@click.option(
+    "--audio-format",
+    type=click.Choice(AUDIO_FORMATS),
+    default=DEFAULT_AUDIO_FORMAT,
+    show_default=True,
+    help="native: transcribe the downloaded stream as-is, pcm: 16 kHz mono WAV, mp3: keep an MP3 copy of the audio"
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help="Transcribe audio while it downloads, without writing it to disk (requires ffmpeg)"
+)
+@click.option(
+    "--chunk-workers",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help=f"Split videos longer than {LONG_AUDIO_SECONDS // 60} minutes at silence and transcribe the chunks "
+         f"across this many processes (values below 2 disable chunking)"
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Decode speech segments in batches of this size for higher throughput (0 disables). Ignored for videos "
+         "split across --chunk-workers processes"
+)
+@click.option(
+    "--backend",
+    type=click.Choice(TRANSCRIBER_BACKENDS),
+    default=DEFAULT_BACKEND,
+    show_default=True,
+    help="Speech to text engine, fake emits placeholder segments without a model for testing and benchmarking"
+)
+@click.option(
+    "--model-policy",
+    type=click.Choice(MODEL_POLICIES),
+    default=DEFAULT_MODEL_POLICY,
+    show_default=True,
+    help="fixed: transcribe with --model-size, adaptive: make a fast pass with --fast-model and transcribe the "
+         "segments it is unsure about again with models up to --model-size"
+)
+@click.option(
+    "--fast-model",
+    default=DEFAULT_FAST_MODEL,
+    show_default=True,
+    help="Model of the fast pass of the adaptive policy"
+)
+@click.option(
+    "--cpu-budget",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Estimated seconds of CPU decoding per video the adaptive policy stays within, "
+         "by using smaller models on long videos"
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    help="Fetch channel and video metadata from the YouTube API instead of the cache in the DB"
+)
+@click.option(
+    "--audio-cache",
+    type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
+    help="Keep downloaded audio in this directory and reuse it when a video is transcribed again"
+)
+@click.option(
+    "--audio-cache-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_AUDIO_CACHE_SIZE_GB,
+    show_default=True,
+    help="Size in GB the audio cache is kept under, least recently used audio is evicted first"
+)
+@click.option(
+    "--reuse-transcripts/--no-reuse-transcripts",
+    default=False,
+    show_default=True,
+    help="Fingerprint downloaded audio and reuse the transcript of a stored video with the same audio, "
+         "e.g. a re-upload or a short cut from a stream"
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="First transcribe the videos a previous run didn't finish, then skip videos already transcribed"
+)
+@click.option(
+    "--use-worker/--no-worker",
+    default=False,
+    show_default=True,
+    help="Submit the transcription to a running worker (see the worker command) instead of running it in this process"
+)
 @click.help_option("-h", "--help")
-def main(channel_name, video_id, output_dir, max_videos, min_duration, max_duration, start_date, end_date, save_as_text):
+@click.pass_context
+def main(ctx, channel_name, video_id, manifest, output_dir, max_videos, min_duration, max_duration, start_date,
+         end_date, save_as_text, model_size, download_workers, transcribe_workers, prefetch, incremental, audio_format,
+         stream, chunk_workers, batch_size, backend, model_policy, fast_model, cpu_budget, refresh, audio_cache,
+         audio_cache_size, reuse_transcripts, resume, use_worker):
+    """
+    Download and transcribe YouTube videos. Use a subcommand (e.g. search) to query existing transcripts.
+    """
+    if ctx.invoked_subcommand:
+        return
+
     click.echo("Starting video transcription...")
 
-    if channel_name and video_id:
-        raise click.UsageError("You must provide either --channel-name or --video-id and not both.")
+    if sum(bool(source) for source in (channel_name, video_id, manifest)) > 1:
+        raise click.UsageError("You must provide only one of --channel-name, --video-id or --manifest.")
+
+    if not channel_name and not video_id and not manifest and not resume:
+        raise click.UsageError("You must provide either --channel-name, --video-id, --manifest or --resume.")
+
+    if stream and audio_format == "mp3":
+        raise click.UsageError("--stream can't be combined with --audio-format mp3.")
+
+    if cpu_budget is not None and model_policy != "adaptive":
+        raise click.UsageError("--cpu-budget requires --model-policy adaptive.")
+
+    # Filters given on the command line are the defaults of every manifest entry
+    defaults = {"max_videos": max_videos,
+                "min_duration": min_duration,
+                "max_duration": max_duration,
+                "start_date": start_date,
+                "end_date": end_date}
 
-    if not channel_name and not video_id:
-        raise click.UsageError("You must provide either --channel-name or --video-id.")
+    if manifest:
+        try:
+            entries = load_manifest(manifest)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--manifest")
+    elif channel_name or video_id:
+        entries = [{"channel_name": channel_name, "video_id": video_id}]
+    else:
+        entries = []
 
-    run_transcription(channel_name=channel_name,
-                      video_id=video_id,
-                      output_dir=output_dir,
-                      max_videos=max_videos,
-                      min_duration=min_duration,
-                      max_duration=max_duration,
-                      start_date=start_date,
-                      end_date=end_date,
-                      save_as_text=save_as_text)
+    run_id = uuid.uuid4().hex
+    params = {"sources": [{**defaults, **entry} for entry in entries],
+              "output_dir": output_dir,
+              "save_as_text": save_as_text,
+              "model_size": model_size,
+              "download_workers": download_workers,
+              "transcribe_workers": transcribe_workers,
+              "prefetch": prefetch,
+              "incremental": incremental,
+              "audio_format": audio_format,
+              "stream": stream,
+              "chunk_workers": chunk_workers,
+              "batch_size": batch_size,
+              "backend": backend,
+              "model_policy": get_model_policy(model_policy, fast_model=fast_model, cpu_budget=cpu_budget),
+              "refresh": refresh,
+              "resume": resume,
+              "reuse_transcripts": reuse_transcripts,
+              "audio_cache": AudioCache(directory=audio_cache,
+                                        max_bytes=audio_cache_size * 1024 ** 3) if audio_cache else None,
+              # A single channel or video that can't be listed is an error of the command
+              "isolate_errors": bool(manifest),
+              "run_id": run_id}
+
+    summary = submit_to_worker(params) if use_worker else None
+    if summary is None:
+        # Imported once a transcription runs, the models and yt-dlp would slow down --help and the subcommands
+        from video_to_text.core import run_batch
+        from video_to_text.long_audio import close_parallel_transcribers
+
+        load_env()
+        try:
+            _, summary = run_batch(**params)
+        finally:
+            close_parallel_transcribers()
+
+    click.echo(format_summary(summary))
+    stages = get_stage_summary(db_file=output_dir/DB_NAME, run_id=run_id)
+    if stages:
+        click.echo(format_stage_summary(stages))
 
     if save_as_text:
         click.echo(f"Text files saved under {output_dir}")
 
     click.echo(f"Done! {DB_NAME} located at {output_dir}")
 
+    failed = sum(row["Failed"] for row in summary)
+    if failed:
+        raise click.ClickException(f"{failed} video(s) failed, run again with --resume to retry them.")
+
+def submit_to_worker(params: dict):
+    """
+    :param params: Keyword arguments of core.run_batch
+    :return: Summary of the batch, None if no worker is running
+    """
+    from video_to_text.exceptions import WorkerError, WorkerUnavailable
+    from video_to_text.worker import get_socket_path, submit
+
+    socket_path = get_socket_path()
+    try:
+        summary = submit(params, socket_path=socket_path,
+                         on_stored=lambda video: click.echo(f"Transcribed {video['Title']}"))
+    except WorkerUnavailable as e:
+        click.echo(f"{e}, transcribing in this process", err=True)
+        return None
+    except WorkerError as e:
+        raise click.ClickException(f"Worker failed: {e}")
+
+    click.echo(f"Transcribed by the worker on {socket_path}")
+    return summary
+
+main.add_command(search)
+main.add_command(worker)
+
 if __name__ == "__main__":
     main()
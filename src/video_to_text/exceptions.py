@@ -1,2 +1,17 @@
 class YouTubeAPIException(Exception):
     pass
+
+class TranscriptionCancelled(Exception):
+    pass
+
+class WorkerUnavailable(Exception):
+    pass
+
+class WorkerError(Exception):
+    pass
+
+class JobsBusy(Exception):
+    pass
+
+class ManifestError(ValueError):
+    pass
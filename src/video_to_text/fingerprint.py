@@ -0,0 +1,203 @@
+import logging
+import sqlite3
+
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from video_to_text.constants import (FINGERPRINT_BANDS, FINGERPRINT_CANDIDATES, FINGERPRINT_FRAME_SAMPLES,
+                                     FINGERPRINT_HOP_SAMPLES, FINGERPRINT_INDEX_STEP, FINGERPRINT_INDEX_TABLE_NAME,
+                                     FINGERPRINT_MAX_BIT_ERROR_RATE, FINGERPRINT_MIN_FRAMES, FINGERPRINTS_TABLE_NAME,
+                                     SIMULATED_BACKENDS, TABLE_NAME, WHISPER_SAMPLE_RATE)
+from video_to_text.database import batched, get_segments
+from video_to_text.model_registry import model_covers
+
+logger = logging.getLogger(__name__)
+
+HOP_SECONDS = FINGERPRINT_HOP_SAMPLES / WHISPER_SAMPLE_RATE
+
+# Sub-fingerprints of silence and clipping carry no information
+_UNINFORMATIVE = (0, 0xFFFFFFFF)
+
+def compute_fingerprint(audio: np.ndarray) -> np.ndarray:
+    """
+    Compute an audio fingerprint robust to re-encoding and volume changes (Haitsma & Kalker).
+
+    Every hop, the spectrum of a frame is split into 33 log-spaced bands between 300 and
+    2000 Hz, and each bit of the frame's 32 bit sub-fingerprint is the sign of the change of
+    the energy difference between two adjacent bands from the previous frame.
+
+    :param audio: 16 kHz mono samples
+    :return: One uint32 sub-fingerprint per hop
+    """
+    if len(audio) < FINGERPRINT_FRAME_SAMPLES + FINGERPRINT_HOP_SAMPLES:
+        return np.zeros(0, dtype=np.uint32)
+
+    frames = 1 + (len(audio) - FINGERPRINT_FRAME_SAMPLES) // FINGERPRINT_HOP_SAMPLES
+    window = np.hanning(FINGERPRINT_FRAME_SAMPLES).astype(np.float32)
+    freqs = np.fft.rfftfreq(FINGERPRINT_FRAME_SAMPLES, d=1 / WHISPER_SAMPLE_RATE)
+    bounds = np.searchsorted(freqs, np.geomspace(300, 2000, FINGERPRINT_BANDS + 1))
+
+    energies = np.empty((frames, FINGERPRINT_BANDS), dtype=np.float32)
+    offsets = np.arange(FINGERPRINT_FRAME_SAMPLES)
+    # Frames are transformed in blocks to bound memory on long audio
+    for start in range(0, frames, 1024):
+        index = np.arange(start, min(start + 1024, frames))[:, None] * FINGERPRINT_HOP_SAMPLES + offsets
+        spectrum = np.abs(np.fft.rfft(audio[index] * window, axis=1)) ** 2
+        energies[start:start + len(index)] = np.add.reduceat(spectrum[:, bounds[0]:bounds[-1]],
+                                                             bounds[:-1] - bounds[0], axis=1)
+
+    differences = energies[:, :-1] - energies[:, 1:]
+    bits = (differences[1:] - differences[:-1]) > 0
+    return np.packbits(bits, axis=1).view(">u4").astype(np.uint32).ravel()
+
+def decode_and_fingerprint(audio_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode an audio file and fingerprint it. The samples are what the transcriber would decode
+    from the file, so transcribing them instead of the file decodes it only once.
+
+    :param audio_path: Path to an audio file in any format ffmpeg decodes
+    :return: 16 kHz mono samples and their fingerprint, see compute_fingerprint
+    """
+    from faster_whisper import decode_audio
+
+    audio = decode_audio(audio_path, sampling_rate=WHISPER_SAMPLE_RATE)
+    return audio, compute_fingerprint(audio)
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    :param a: Fingerprint
+    :param b: Fingerprint of the same length
+    :return: Share of differing bits, around 0.5 for unrelated audio
+    """
+    if len(a) == 0:
+        return 1.0
+    return float(np.unpackbits((a ^ b).view(np.uint8)).sum() / (32 * len(a)))
+
+def save_fingerprint(db_file, video_url: str, fingerprint: np.ndarray):
+    """
+    Store the fingerprint of a transcribed video, indexing every FINGERPRINT_INDEX_STEP-th
+    sub-fingerprint for lookups
+
+    :param db_file: Path to the DB
+    :param video_url: URL of the video
+    :param fingerprint: Fingerprint of its audio
+    """
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        conn.execute(f"DELETE FROM {FINGERPRINT_INDEX_TABLE_NAME} WHERE video_url = ?", (video_url,))
+        conn.execute(f"INSERT OR REPLACE INTO {FINGERPRINTS_TABLE_NAME} (video_url, frames, fingerprint) "
+                     f"VALUES (?, ?, ?)", (video_url, len(fingerprint), fingerprint.astype("<u4").tobytes()))
+        conn.executemany(
+            f"INSERT INTO {FINGERPRINT_INDEX_TABLE_NAME} (hash, video_url, frame) VALUES (?, ?, ?)",
+            [(int(value), video_url, frame)
+             for frame, value in enumerate(fingerprint) if frame % FINGERPRINT_INDEX_STEP == 0
+             and value not in _UNINFORMATIVE]
+        )
+        conn.commit()
+
+def find_match(db_file,
+               fingerprint: np.ndarray,
+               exclude_url: Optional[str] = None,
+               model_size: Optional[str] = None) -> Optional[Dict]:
+    """
+    Find a stored video containing the audio of a fingerprint, either the whole video (a re-upload)
+    or a span of it (e.g. a short cut from a stream)
+
+    :param db_file: Path to the DB
+    :param fingerprint: Fingerprint of the new audio
+    :param exclude_url: URL not to match, e.g. the video itself
+    :param model_size: Only match videos transcribed with this model or a larger one, see
+                       model_registry.model_covers. Any video when not provided
+    :return: Dict with the URL of the stored video, the Offset in seconds the audio starts at in it,
+             the Duration of the new audio, the BitErrorRate of the match and the Model and Backend
+             the stored video was transcribed with, None without a match. Transcripts of
+             SIMULATED_BACKENDS are never matched
+    """
+    if len(fingerprint) < FINGERPRINT_MIN_FRAMES:
+        return None
+
+    positions = defaultdict(list)
+    for frame, value in enumerate(fingerprint):
+        if value not in _UNINFORMATIVE:
+            positions[int(value)].append(frame)
+
+    # Every exact hit of an indexed sub-fingerprint votes for an alignment of the two videos
+    votes: Counter = Counter()
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        for batch in batched(positions):
+            rows = conn.execute(f"SELECT hash, video_url, frame FROM {FINGERPRINT_INDEX_TABLE_NAME} "
+                                f"WHERE hash IN ({','.join('?' * len(batch))})", batch)
+            for value, video_url, frame in rows:
+                if video_url != exclude_url:
+                    for position in positions[value]:
+                        votes[(video_url, frame - position)] += 1
+
+        transcripts = _transcripts(conn, {video_url for video_url, _ in votes})
+
+        def reusable(video_url: str) -> bool:
+            model, backend = transcripts.get(video_url, (None, None))
+            return backend not in SIMULATED_BACKENDS and (model_size is None or model_covers(model, model_size))
+
+        votes = Counter({key: count for key, count in votes.items() if reusable(key[0])})
+
+        best = None
+        for (video_url, offset), _ in votes.most_common(FINGERPRINT_CANDIDATES):
+            stored = _load(conn, video_url)
+            rate = _aligned_bit_error_rate(fingerprint, stored, offset)
+            if rate <= FINGERPRINT_MAX_BIT_ERROR_RATE and (best is None or rate < best["BitErrorRate"]):
+                model, backend = transcripts.get(video_url, (None, None))
+                best = {"URL": video_url,
+                        "Offset": round(offset * HOP_SECONDS, 2),
+                        "Duration": round(len(fingerprint) * HOP_SECONDS, 2),
+                        "BitErrorRate": rate,
+                        "Model": model,
+                        "Backend": backend}
+
+    return best
+
+def reuse_transcript(db_file, match: Dict) -> Optional[Tuple[str, List]]:
+    """
+    Cut the transcript of a matched video down to the matched span
+
+    :param db_file: Path to the DB
+    :param match: Match returned by find_match
+    :return: Transcribed text and segments with timestamps relative to the new audio, None if the
+             matched video has no stored segments
+    """
+    from faster_whisper.transcribe import Segment
+
+    offset, duration = match["Offset"], match["Duration"]
+    stored = get_segments(db_file, match["URL"], start=offset, end=offset + duration)
+    # Segments straddling the edges of the span belong to it if most of them is inside
+    stored = [s for s in stored if offset <= (s["Start"] + s["End"]) / 2 < offset + duration]
+    if not stored:
+        return None
+
+    segments = [Segment(id=i, seek=0, start=max(s["Start"] - offset, 0.0), end=min(s["End"] - offset, duration),
+                        text=s["Text"], tokens=[], avg_logprob=s["AvgLogprob"], compression_ratio=0.0,
+                        no_speech_prob=s["NoSpeechProb"], words=None, temperature=None)
+                for i, s in enumerate(stored, start=1)]
+    return " ".join(s.text for s in segments), segments
+
+def _transcripts(conn: sqlite3.Connection, video_urls) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    # Model and backend of the stored transcripts
+    transcripts = {}
+    for batch in batched(video_urls):
+        rows = conn.execute(f"SELECT video_url, model, backend FROM {TABLE_NAME} "
+                            f"WHERE video_url IN ({','.join('?' * len(batch))})", batch)
+        transcripts.update((video_url, (model, backend)) for video_url, model, backend in rows)
+    return transcripts
+
+def _load(conn: sqlite3.Connection, video_url: str) -> np.ndarray:
+    row = conn.execute(f"SELECT fingerprint FROM {FINGERPRINTS_TABLE_NAME} WHERE video_url = ?",
+                       (video_url,)).fetchone()
+    return np.frombuffer(row[0], dtype="<u4").astype(np.uint32) if row else np.zeros(0, dtype=np.uint32)
+
+def _aligned_bit_error_rate(fingerprint: np.ndarray, stored: np.ndarray, offset: int) -> float:
+    # The new audio must lie within the stored audio, apart from a few frames at the edges
+    start = max(0, -offset)
+    end = min(len(fingerprint), len(stored) - offset)
+    if end - start < 0.9 * len(fingerprint):
+        return 1.0
+    return bit_error_rate(fingerprint[start:end], stored[start + offset:end + offset])
@@ -4,25 +4,37 @@ import isodate
 import requests
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Container, Dict, Iterable, List, Optional, Tuple, Union
 
-from video_to_text.constants import YOUTUBE_API_URL
+from video_to_text.constants import YOUTUBE_MAX_RESULTS
 from video_to_text.exceptions import YouTubeAPIException
 from video_to_text.helper import convert_iso_to_datetime
+from video_to_text.metadata_cache import MetadataCache
+from video_to_text.youtube_client import YouTubeClient, get_client
 
 logger = logging.getLogger(__name__)
 
-def get_channel_id(channel_name: str, api_key: str) -> str:
+def get_channel_id(channel_name: str,
+                   api_key: str,
+                   client: Optional[YouTubeClient] = None,
+                   cache: Optional[MetadataCache] = None) -> str:
     """
     Retrieves channel ID based on channel name provided
 
     :param channel_name: Name of the channel
     :param api_key:
+    :param client: YouTube API client, the process-wide client when not provided
+    :param cache: Metadata cache, the /search request costs 100 quota units
     :return: string containing channel ID
     """
+    client = client or get_client()
     if channel_name.startswith("@"):
         channel_name = channel_name[1:]
 
+    cached = cache.get("channel_id", channel_name.lower()) if cache else None
+    if cached:
+        return cached
+
     params = {
         "part": "snippet",
         "q": channel_name,
@@ -32,47 +44,53 @@ def get_channel_id(channel_name: str, api_key: str) -> str:
     }
 
     try:
-        url = f"{YOUTUBE_API_URL}/search"
-        resp = requests.get(url=url, params=params)
-
-        if not resp.ok:
-            extract_error_message(resp, url)
-
-        items = resp.json().get("items", [])
+        res = client.get("search", params=params)
+        items = res.get("items", [])
         if not items:
             raise ValueError("Channel not found.")
 
-        return items[0]["snippet"]["channelId"]
+        channel_id = items[0]["snippet"]["channelId"]
+        if cache:
+            cache.set("channel_id", channel_name.lower(), channel_id)
+        return channel_id
 
     except (requests.HTTPError, ValueError) as e:
         raise YouTubeAPIException(e)
 
-def get_uploads_playlist_id(channel_id: str, api_key: str) -> str:
+def get_uploads_playlist_id(channel_id: str,
+                            api_key: str,
+                            client: Optional[YouTubeClient] = None,
+                            cache: Optional[MetadataCache] = None) -> str:
     """
     Get the 'uploads' playlist ID for a channel
 
     :param channel_id: ID of the YouTube channel
     :param api_key: API key for authentication
+    :param client: YouTube API client, the process-wide client when not provided
+    :param cache: Metadata cache
     :return: str
     """
+    client = client or get_client()
+    cached = cache.get("uploads_playlist", channel_id) if cache else None
+    if cached:
+        return cached
+
     params = {
         "part": "contentDetails",
         "id": channel_id,
         "key": api_key
     }
     try:
-        url = f"{YOUTUBE_API_URL}/channels"
-        logger.debug(f"Retrieving Uploads playlist ID from {url}. Channel ID: {channel_id}")
-        resp = requests.get(url=url, params=params)
-
-        if not resp.ok:
-            extract_error_message(resp, url)
-
-        items = resp.json().get("items", [])
+        logger.debug(f"Retrieving Uploads playlist ID from /channels. Channel ID: {channel_id}")
+        res = client.get("channels", params=params)
+        items = res.get("items", [])
         if not items:
             raise ValueError("Could not fetch channel details")
 
-        return items[0]["contentDetails"]["relatedPlaylists"]["uploads"]
+        uploads_playlist_id = items[0]["contentDetails"]["relatedPlaylists"]["uploads"]
+        if cache:
+            cache.set("uploads_playlist", channel_id, uploads_playlist_id)
+        return uploads_playlist_id
 
     except (requests.HTTPError, ValueError, KeyError) as e:
         logger.error(f"An error occurred while retrieving Upload ID: {e}")
@@ -84,7 +102,12 @@ def get_channel_videos(channel_id: str,
                        min_duration: Optional[int] = None,
                        max_duration: Optional[int] = None,
                        start_date: Optional[datetime] = None,
-                       end_date: Optional[datetime] = None) -> List:
+                       end_date: Optional[datetime] = None,
+                       until_video_id: Optional[str] = None,
+                       until_published_at: Optional[datetime] = None,
+                       exclude_urls: Optional[Container[str]] = None,
+                       client: Optional[YouTubeClient] = None,
+                       cache: Optional[MetadataCache] = None) -> List:
     """
     Retrieve videos from YouTube channel
 
@@ -95,127 +118,343 @@ def get_channel_videos(channel_id: str,
     :param max_duration: Maximum duration of the video to retrieve
     :param start_date: Include videos published on or after this date
     :param end_date: Include videos published on or before this date
+    :param until_video_id: Stop listing when this (already synced) upload is reached
+    :param until_published_at: Stop listing at uploads published before this date
+    :param exclude_urls: URLs of videos to skip, e.g. videos already transcribed
+    :param client: YouTube API client, the process-wide client when not provided
+    :param cache: Metadata cache
     :return: List of videos
     """
+    videos, _ = list_channel_videos(channel_id=channel_id,
+                                    api_key=api_key,
+                                    max_num_of_videos=max_num_of_videos,
+                                    min_duration=min_duration,
+                                    max_duration=max_duration,
+                                    start_date=start_date,
+                                    end_date=end_date,
+                                    until_video_id=until_video_id,
+                                    until_published_at=until_published_at,
+                                    exclude_urls=exclude_urls,
+                                    client=client,
+                                    cache=cache)
+    return videos
+
+def list_channel_videos(channel_id: str,
+                        api_key: str,
+                        max_num_of_videos: Optional[int],
+                        min_duration: Optional[int] = None,
+                        max_duration: Optional[int] = None,
+                        start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None,
+                        until_video_id: Optional[str] = None,
+                        until_published_at: Optional[datetime] = None,
+                        exclude_urls: Optional[Container[str]] = None,
+                        client: Optional[YouTubeClient] = None,
+                        cache: Optional[MetadataCache] = None) -> Tuple[List, Optional[Dict]]:
+    """
+    Retrieve videos from YouTube channel along with the newest upload of the channel.
+    The uploads playlist is ordered newest first, so listing stops as soon as
+    until_video_id (or an upload older than until_published_at) is reached.
+
+    :param channel_id: ID of the channel
+    :param api_key: API key for authentication
+    :param max_num_of_videos: Maximum number of videos to retrieve
+    :param min_duration: Minimum duration of the video to retrieve
+    :param max_duration: Maximum duration of the video to retrieve
+    :param start_date: Include videos published on or after this date
+    :param end_date: Include videos published on or before this date
+    :param until_video_id: Stop listing when this (already synced) upload is reached
+    :param until_published_at: Stop listing at uploads published before this date
+    :param exclude_urls: URLs of videos to skip, e.g. videos already transcribed
+    :param client: YouTube API client, the process-wide client when not provided
+    :param cache: Metadata cache
+    :return: Tuple of list of videos and dict with VideoId and PublishedAt of the newest upload
+    """
+    client = client or get_client()
     videos = []
+    newest_upload = None
     page_token = None
 
-    uploads_playlist_id = get_uploads_playlist_id(channel_id, api_key)
+    uploads_playlist_id = get_uploads_playlist_id(channel_id, api_key, client=client, cache=cache)
 
     while True:
-        params = {
-            "part": "snippet,contentDetails",
-            "playlistId": uploads_playlist_id,
-            "maxResults": 50,
-            "key": api_key
-        }
-        if page_token:
-            params["pageToken"] = page_token
-
+        res = get_playlist_page(playlist_id=uploads_playlist_id, api_key=api_key, page_token=page_token,
+                                client=client)
         try:
-            url = f"{YOUTUBE_API_URL}/playlistItems"
-            logger.debug(f"Retrieving videos from {url}. Playlist ID: {uploads_playlist_id}")
-            resp = requests.get(url=url, params=params)
-
-            if not resp.ok:
-                extract_error_message(resp, url)
-
-            res = resp.json()
-            for item in res.get("items", []):
-                video_id = item["contentDetails"]["videoId"]
-                title = item["snippet"]["title"]
-                published_at = item["snippet"]["publishedAt"]
-                duration = get_video_duration(video_id=video_id, api_key=api_key)
-                published_at_datetime = convert_iso_to_datetime(published_at)
-
-                if (
-                        (min_duration and duration < min_duration)
-                        or (max_duration and duration > max_duration)
-                        or (start_date and published_at_datetime.date() < start_date.date())
-                        or (end_date and published_at_datetime.date() > end_date.date())
-                ):
-                    continue
-
-                videos.append({
-                    "Title": title,
-                    "URL": f"https://www.youtube.com/watch?v={video_id}",
-                    "PublishedAt": published_at
-                })
+            items = res.get("items", [])
+            if newest_upload is None and items:
+                newest_upload = {"VideoId": items[0]["contentDetails"]["videoId"],
+                                 "PublishedAt": items[0]["snippet"]["publishedAt"]}
+
+            candidates, reached_synced_upload = select_playlist_items(items=items,
+                                                                      start_date=start_date,
+                                                                      end_date=end_date,
+                                                                      until_video_id=until_video_id,
+                                                                      until_published_at=until_published_at,
+                                                                      exclude_urls=exclude_urls)
+
+            # Resolve durations for the whole page with a single batched request
+            durations = {}
+            if candidates and (min_duration or max_duration):
+                durations = get_video_durations(video_ids=[item["contentDetails"]["videoId"] for item in candidates],
+                                                api_key=api_key,
+                                                client=client,
+                                                cache=cache)
+
+            for video in filter_by_duration(items=candidates,
+                                            durations=durations,
+                                            min_duration=min_duration,
+                                            max_duration=max_duration):
+                videos.append(video)
 
                 if max_num_of_videos and len(videos) == max_num_of_videos:
-                    return videos
+                    return videos, newest_upload
 
             page_token = res.get("nextPageToken")
-            if not page_token:
+            if reached_synced_upload or not page_token:
                 break
 
-        except (requests.HTTPError, ValueError, KeyError) as e:
+        except (ValueError, KeyError) as e:
             raise YouTubeAPIException(e)
 
-    return videos
+    return videos, newest_upload
 
-def get_single_video(video_id: str, api_key: str):
+def get_playlist_page(playlist_id: str,
+                      api_key: str,
+                      page_token: Optional[str] = None,
+                      client: Optional[YouTubeClient] = None) -> Dict:
     """
-    Retrieve single video from YouTube channel
+    Retrieve one page of playlist items
 
-    :param video_id: ID of the video to be retrieved
+    :param playlist_id: ID of the playlist
     :param api_key: API key for authentication
-    :return: List of videos
+    :param page_token: nextPageToken of the previous page, the first page when not provided
+    :param client: YouTube API client, the process-wide client when not provided
+    :return: playlistItems response
     """
-    video = []
-
+    client = client or get_client()
     params = {
         "part": "snippet,contentDetails",
-        "id": f"{video_id}",
+        "playlistId": playlist_id,
+        "maxResults": YOUTUBE_MAX_RESULTS,
         "key": api_key
     }
+    if page_token:
+        params["pageToken"] = page_token
 
     try:
-        url = f"{YOUTUBE_API_URL}/videos"
-        logger.debug(f"Retrieving video from {url} with Video ID: {video_id}")
-        resp = requests.get(url=url, params=params)
+        logger.debug(f"Retrieving videos from /playlistItems. Playlist ID: {playlist_id}")
+        return client.get("playlistItems", params=params)
+
+    except (requests.HTTPError, ValueError) as e:
+        raise YouTubeAPIException(e)
 
-        if not resp.ok:
-            extract_error_message(resp, url)
+def select_playlist_items(items: List[Dict],
+                          start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None,
+                          until_video_id: Optional[str] = None,
+                          until_published_at: Optional[datetime] = None,
+                          exclude_urls: Optional[Container[str]] = None) -> Tuple[List[Dict], bool]:
+    """
+    Apply the date, sync and exclusion filters to a page of the uploads playlist
 
-        res = resp.json()
-        for item in res.get("items", []):
-            title = item["snippet"]["title"]
-            published_at = item["snippet"]["publishedAt"]
+    :param items: Playlist items, newest first
+    :param start_date: Include videos published on or after this date
+    :param end_date: Include videos published on or before this date
+    :param until_video_id: Stop at this (already synced) upload
+    :param until_published_at: Stop at uploads published before this date
+    :param exclude_urls: URLs of videos to skip
+    :return: Tuple of the selected items and whether an already synced upload was reached
+    """
+    candidates = []
+    for item in items:
+        video_id = item["contentDetails"]["videoId"]
+        published_at_datetime = convert_iso_to_datetime(item["snippet"]["publishedAt"])
 
-            video.append({
-                "Title": title,
-                "URL": f"https://www.youtube.com/watch?v={video_id}",
-                "PublishedAt": published_at
-            })
+        if ((until_video_id and video_id == until_video_id)
+                or (until_published_at and published_at_datetime < until_published_at)):
+            logger.info(f"Reached already synced upload {video_id}. Stopping")
+            return candidates, True
 
-    except (requests.HTTPError, ValueError, KeyError) as e:
-        raise YouTubeAPIException(e)
+        if (
+                (start_date and published_at_datetime.date() < start_date.date())
+                or (end_date and published_at_datetime.date() > end_date.date())
+                or (exclude_urls and f"https://www.youtube.com/watch?v={video_id}" in exclude_urls)
+        ):
+            continue
+
+        candidates.append(item)
+
+    return candidates, False
+
+def filter_by_duration(items: List[Dict],
+                       durations: Dict[str, int],
+                       min_duration: Optional[int] = None,
+                       max_duration: Optional[int] = None) -> List[Dict]:
+    """
+    Turn playlist items into videos, dropping those outside the duration range
+
+    :param items: Playlist items
+    :param durations: Dict of video ID to duration in seconds, unknown durations count as 0
+    :param min_duration: Minimum duration of the video
+    :param max_duration: Maximum duration of the video
+    :return: List of videos
+    """
+    videos = []
+    for item in items:
+        video_id = item["contentDetails"]["videoId"]
+        duration = durations.get(video_id, 0)
+
+        if (min_duration and duration < min_duration) or (max_duration and duration > max_duration):
+            continue
+
+        videos.append({
+            "Title": item["snippet"]["title"],
+            "URL": f"https://www.youtube.com/watch?v={video_id}",
+            "PublishedAt": item["snippet"]["publishedAt"]
+        })
+
+    return videos
+
+def get_single_video(video_id: Union[str, List[str]],
+                     api_key: str,
+                     client: Optional[YouTubeClient] = None,
+                     cache: Optional[MetadataCache] = None):
+    """
+    Retrieve single video, or a list of videos, from YouTube
+
+    :param video_id: ID of the video to be retrieved, or a list of IDs
+    :param api_key: API key for authentication
+    :param client: YouTube API client, the process-wide client when not provided
+    :param cache: Metadata cache
+    :return: List of videos
+    """
+    video_ids = [video_id] if isinstance(video_id, str) else list(video_id)
+    details = get_video_details(video_ids=video_ids, api_key=api_key, client=client, cache=cache)
+
+    video = []
+    for vid in video_ids:
+        if vid not in details:
+            continue
+        if details[vid]["Title"] is None or details[vid]["PublishedAt"] is None:
+            raise YouTubeAPIException(f"Incomplete details of video '{vid}'")
+
+        video.append({
+            "Title": details[vid]["Title"],
+            "URL": f"https://www.youtube.com/watch?v={vid}",
+            "PublishedAt": details[vid]["PublishedAt"]
+        })
 
     return video
 
-def get_video_duration(video_id: str, api_key: str) -> int:
+def get_video_details(video_ids: Iterable[str],
+                      api_key: str,
+                      client: Optional[YouTubeClient] = None,
+                      cache: Optional[MetadataCache] = None) -> Dict[str, Dict]:
+    """
+    Retrieve title, publish date and duration of videos. Cached videos are not requested again
+
+    :param video_ids: IDs of the videos
+    :param api_key: API key for authentication
+    :param client: YouTube API client, the process-wide client when not provided
+    :param cache: Metadata cache
+    :return: Dict of video ID to dict with Title, PublishedAt and Duration in seconds. Unknown IDs are omitted
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    details = cache.get_many("video", video_ids) if cache else {}
+
+    missing = [vid for vid in video_ids if vid not in details]
+    if missing:
+        fetched = {}
+        try:
+            for item in get_videos(video_ids=missing, api_key=api_key, part="snippet,contentDetails", client=client):
+                snippet = item.get("snippet", {})
+                content_details = item.get("contentDetails", {})
+                fetched[item["id"]] = {
+                    "Title": snippet.get("title"),
+                    "PublishedAt": snippet.get("publishedAt"),
+                    "Duration": parse_duration(content_details["duration"]) if "duration" in content_details else None
+                }
+        except KeyError as e:
+            raise YouTubeAPIException(e)
+
+        if cache:
+            cache.set_many("video", {vid: d for vid, d in fetched.items() if None not in d.values()})
+        details.update(fetched)
+
+    return details
+
+def get_videos(video_ids: Iterable[str],
+               api_key: str,
+               part: str = "contentDetails",
+               client: Optional[YouTubeClient] = None) -> List[Dict]:
+    """
+    Retrieve video resources, batching up to 50 IDs per request
+
+    :param video_ids: IDs of the videos to be retrieved
+    :param api_key: API key for authentication
+    :param part: Comma separated resource parts to retrieve
+    :param client: YouTube API client, the process-wide client when not provided
+    :return: List of video resources. Unknown IDs are omitted
+    """
+    client = client or get_client()
+    video_ids = list(video_ids)
+    items = []
+
+    for i in range(0, len(video_ids), YOUTUBE_MAX_RESULTS):
+        batch = video_ids[i:i + YOUTUBE_MAX_RESULTS]
+        params = {
+            "part": part,
+            "id": ",".join(batch),
+            "maxResults": YOUTUBE_MAX_RESULTS,
+            "key": api_key
+        }
+
+        try:
+            logger.debug(f"Retrieving {len(batch)} video(s) from /videos")
+            res = client.get("videos", params=params)
+            items.extend(res.get("items", []))
+
+        except (requests.HTTPError, ValueError) as e:
+            raise YouTubeAPIException(e)
+
+    return items
+
+def get_video_durations(video_ids: Iterable[str],
+                        api_key: str,
+                        client: Optional[YouTubeClient] = None,
+                        cache: Optional[MetadataCache] = None) -> Dict[str, int]:
+    """
+    Get durations of YouTube videos using batched requests
+
+    :param video_ids: IDs of the YouTube videos
+    :param api_key: API key for authentication
+    :param client: YouTube API client, the process-wide client when not provided
+    :param cache: Metadata cache
+    :return: Dict of video ID to duration in seconds. Unknown IDs are omitted
+    """
+    details = get_video_details(video_ids=video_ids, api_key=api_key, client=client, cache=cache)
+    return {vid: d["Duration"] for vid, d in details.items() if d["Duration"] is not None}
+
+def get_video_duration(video_id: str, api_key: str, client: Optional[YouTubeClient] = None) -> int:
     """
     Get duration of the YouTube video
 
     :param video_id: ID of the YouTube video
     :param api_key: API key for authentication
+    :param client: YouTube API client, the process-wide client when not provided
     :return: int
     """
+    client = client or get_client()
     params = {
         "part": "contentDetails",
         "id": video_id,
         "key": api_key
     }
     try:
-        url = f"{YOUTUBE_API_URL}/videos"
-        logger.debug(f"Retrieving video duration from {url}. Video ID: {video_id}")
-        resp = requests.get(url=url, params=params)
-
-        if not resp.ok:
-            extract_error_message(resp, url)
-
-        items = resp.json().get("items", [])
+        logger.debug(f"Retrieving video duration from /videos. Video ID: {video_id}")
+        res = client.get("videos", params=params)
+        items = res.get("items", [])
         if not items:
             return 0
 
@@ -234,18 +473,3 @@ def parse_duration(duration: str) -> int:
     """
     duration_str = isodate.parse_duration(duration)
     return int(duration_str.total_seconds())
-
-def extract_error_message(resp, url):
-    """
-    Extract detailed error message from YouTube API
-
-    :param resp: Response from YouTube API
-    :param url: URL request was made to
-    :return:
-    """
-    error_message = resp.json().get("error", {}).get("message")
-    if error_message:
-        logger.error(f"An error occurred while making request to {url}: {error_message}")
-        raise ValueError(f"YouTube API error: {error_message}")
-
-    resp.raise_for_status()
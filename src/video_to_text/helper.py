@@ -1,4 +1,7 @@
+import dataclasses
+import math
 from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
 import isodate
 
 def convert_iso_to_datetime(iso_str: str) -> datetime:
@@ -10,3 +13,60 @@ def convert_iso_to_datetime(iso_str: str) -> datetime:
     if dt.tzinfo:
         dt = dt.replace(tzinfo=None)
     return dt
+
+def shift_segment(segment, offset: float, segment_id: int):
+    """
+    Copy of a transcript segment moved by offset seconds, e.g. from chunk to stream time.
+
+    :param segment: faster-whisper Segment
+    :param offset: Seconds added to start and end (and word timestamps)
+    :param segment_id: ID of the new segment
+    :return: Segment
+    """
+    words = segment.words
+    if words:
+        words = [dataclasses.replace(w, start=w.start + offset, end=w.end + offset) for w in words]
+
+    return dataclasses.replace(segment,
+                               id=segment_id,
+                               start=segment.start + offset,
+                               end=segment.end + offset,
+                               words=words)
+
+def segment_to_dict(segment, index: int) -> dict:
+    """
+    Segment in the format returned by database.get_segments
+
+    :param segment: faster-whisper Segment
+    :param index: Position of the segment in the transcript
+    :return: dict
+    """
+    return {"Index": index,
+            "Start": segment.start,
+            "End": segment.end,
+            "Text": segment.text.strip(),
+            "AvgLogprob": segment.avg_logprob,
+            "NoSpeechProb": segment.no_speech_prob,
+            "Confidence": math.exp(segment.avg_logprob) if segment.avg_logprob is not None else None}
+
+def format_timestamp(seconds: float) -> str:
+    """
+    Format seconds as H:MM:SS, or M:SS under an hour
+
+    :param seconds: Seconds from the start of the video
+    :return: str
+    """
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+def video_id_from_url(video_url: str) -> str:
+    """
+    Extract the video ID from a YouTube watch URL
+
+    :param video_url: URL such as https://www.youtube.com/watch?v=ID
+    :return: ID of the video, the URL itself if it has no v parameter
+    """
+    return parse_qs(urlparse(video_url).query).get("v", [video_url])[0]
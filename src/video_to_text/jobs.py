@@ -0,0 +1,209 @@
+import logging
+import threading
+import uuid
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from video_to_text.constants import DEFAULT_MAX_JOBS, JOB_SLOT_POLL_SECONDS, MAX_FINISHED_JOBS
+from video_to_text.exceptions import JobsBusy, TranscriptionCancelled
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLING = "cancelling"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+class Job:
+    """
+    A transcription submitted to the JobManager. Progress is updated from the worker
+    thread while the job runs.
+    """
+
+    def __init__(self, params: Dict):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = QUEUED
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.total: Optional[int] = None
+        self.transcriptions: List[Dict] = []
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    def to_dict(self) -> Dict:
+        """
+        :return: JSON serializable status of the job
+        """
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "progress": {"completed": len(self.transcriptions), "total": self.total},
+            "transcriptions": list(self.transcriptions),
+            "error": self.error
+        }
+
+class JobManager:
+    """
+    Runs transcription jobs in the background on a fixed number of worker threads.
+
+    Jobs beyond max_jobs wait in a queue, so submitting many jobs does not overload the
+    machine. Work running outside the queue, e.g. a streamed transcription, takes one of
+    the max_jobs slots with slot(). Workers share the process-wide model registry, so a
+    model is loaded once and reused by every job.
+    """
+
+    def __init__(self,
+                 run: Callable[..., List],
+                 max_jobs: int = DEFAULT_MAX_JOBS,
+                 max_finished: int = MAX_FINISHED_JOBS):
+        """
+        :param run: Function running a job, called with the job parameters and the cancel,
+                    on_listed and on_stored keyword arguments of run_transcription
+        :param max_jobs: Number of jobs running at the same time
+        :param max_finished: Number of finished jobs remembered
+        """
+        if max_jobs < 1:
+            raise ValueError("max_jobs must be positive")
+
+        self.run = run
+        self.max_jobs = max_jobs
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Held by running jobs and by work taking a slot, so both count towards max_jobs
+        self._slots = threading.BoundedSemaphore(max_jobs)
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job")
+
+    def submit(self, **params) -> Job:
+        """
+        Queue a job
+
+        :param params: Keyword arguments for the run function
+        :return: Job
+        """
+        job = Job(params=params)
+        with self._lock:
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run_job, job)
+        logger.info(f"Queued job {job.id}")
+        return job
+
+    @contextmanager
+    def slot(self, blocking: bool = True) -> Iterator[None]:
+        """
+        Take one of the max_jobs slots for the duration of the with block, e.g. for a streamed
+        transcription. Queued jobs wait until the slot is released.
+
+        :param blocking: Wait for a free slot instead of raising JobsBusy
+        """
+        if not self._slots.acquire(blocking=blocking):
+            raise JobsBusy(f"All {self.max_jobs} job slot(s) are taken")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        :param job_id: ID returned by submit
+        :return: Job, None if unknown or forgotten
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """
+        :return: Known jobs, oldest first
+        """
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job. A queued job is cancelled immediately, a running job stops after the
+        segment being decoded and keeps the videos transcribed so far.
+
+        :param job_id: ID returned by submit
+        :return: Job, None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+
+            job.cancel_event.set()
+            if job.future.cancel():
+                self._finish(job, CANCELLED)
+            else:
+                job.status = CANCELLING
+        logger.info(f"Cancelling job {job_id}")
+        return job
+
+    def shutdown(self, wait: bool = True):
+        """
+        Cancel all jobs and stop the workers
+
+        :param wait: Wait for running jobs to stop
+        """
+        for job in self.list():
+            self.cancel(job.id)
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run_job(self, job: Job):
+        # The job stays queued while slot() holders keep every slot
+        acquired = False
+        while not job.cancel_event.is_set() and not acquired:
+            acquired = self._slots.acquire(timeout=JOB_SLOT_POLL_SECONDS)
+
+        with self._lock:
+            if job.cancel_event.is_set():
+                self._finish(job, CANCELLED)
+                if acquired:
+                    self._slots.release()
+                return
+            job.status = RUNNING
+            job.started_at = datetime.now(timezone.utc)
+
+        def on_listed(videos: List[Dict]):
+            job.total = len(videos)
+
+        try:
+            self.run(**job.params,
+                     cancel=job.cancel_event,
+                     on_listed=on_listed,
+                     on_stored=job.transcriptions.append)
+            status = COMPLETED
+        except TranscriptionCancelled:
+            status = CANCELLED
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            job.error = str(e)
+            status = FAILED
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            self._finish(job, status)
+        logger.info(f"Job {job.id} {status} with {len(job.transcriptions)} transcription(s)")
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = datetime.now(timezone.utc)
+
+        finished = [j for j in self._jobs.values() if j.status in FINISHED]
+        for old in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[old.id]
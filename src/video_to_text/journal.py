@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from video_to_text.constants import JOURNAL_TABLE_NAME
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+DOWNLOADED = "downloaded"
+TRANSCRIBED = "transcribed"
+STORED = "stored"
+FAILED = "failed"
+
+# Runs of this process still processing their videos, see start_run
+_live_runs: Set[str] = set()
+_live_runs_lock = threading.Lock()
+
+def start_run(run_id: str):
+    """
+    Mark a run of this process as live, so its unfinished videos aren't resumed by a concurrent run
+
+    :param run_id: ID of the run
+    """
+    with _live_runs_lock:
+        _live_runs.add(run_id)
+
+def finish_run(run_id: str):
+    """
+    Mark a run of this process as finished, its unfinished videos can be resumed from now on
+
+    :param run_id: ID of the run
+    """
+    with _live_runs_lock:
+        _live_runs.discard(run_id)
+
+def queue_videos(db_file, videos: Iterable[Dict], run_id: str, source: str):
+    """
+    Record videos as queued by a run of this process. A video queued again keeps its failed attempts.
+
+    :param db_file: Path to the DB, initialized with database.init_db
+    :param videos: Videos as returned by get_yt_videos, URL is the key of the journal
+    :param run_id: ID of the run
+    :param source: Channel or video the videos were listed from
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        conn.executemany(
+            f"INSERT INTO {JOURNAL_TABLE_NAME} (video_url, video, source, run_id, owner_pid, state, updated_at) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?) "
+            f"ON CONFLICT (video_url) DO UPDATE SET video = excluded.video, source = excluded.source, "
+            f"run_id = excluded.run_id, owner_pid = excluded.owner_pid, state = excluded.state, error = NULL, "
+            f"updated_at = excluded.updated_at",
+            [(video["URL"], json.dumps(video, default=str), source, run_id, os.getpid(), QUEUED, now)
+             for video in videos]
+        )
+        conn.commit()
+
+def set_state(db_file, video_url: str, state: str, error: Optional[str] = None):
+    """
+    Move a video to the next state. Moving it to FAILED counts an attempt.
+
+    :param db_file: Path to the DB
+    :param video_url: URL of the video
+    :param state: DOWNLOADED, TRANSCRIBED, STORED or FAILED
+    :param error: Error message of a failure
+    """
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        conn.execute(
+            f"UPDATE {JOURNAL_TABLE_NAME} SET state = ?, error = ?, updated_at = ?, "
+            f"attempts = attempts + ? WHERE video_url = ?",
+            (state, error, datetime.now(timezone.utc).isoformat(), int(state == FAILED), video_url)
+        )
+        conn.commit()
+
+def get_unfinished(db_file, max_attempts: int) -> List[Dict]:
+    """
+    Return the videos previous runs didn't store, in the order they were first queued. Videos
+    a live run is still processing are left to it, failed videos are always returned.
+
+    Only the state is journaled, not the audio or transcript, so a resumed video is downloaded
+    and transcribed again whichever state it reached.
+
+    :param db_file: Path to the DB
+    :param max_attempts: Videos that failed this many times are given up on
+    :return: Videos as they were queued
+    """
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        rows = conn.execute(
+            f"SELECT video, state, run_id, owner_pid FROM {JOURNAL_TABLE_NAME} "
+            f"WHERE state != ? AND attempts < ? ORDER BY rowid",
+            (STORED, max_attempts)
+        ).fetchall()
+
+    videos = [json.loads(video) for video, state, run_id, owner_pid in rows
+              if state == FAILED or not _is_live(run_id, owner_pid)]
+    if len(videos) < len(rows):
+        logger.info(f"Leaving {len(rows) - len(videos)} video(s) to the runs still processing them")
+    return videos
+
+def _is_live(run_id: Optional[str], owner_pid: Optional[int]) -> bool:
+    if owner_pid is None:
+        return False
+    if owner_pid == os.getpid():
+        with _live_runs_lock:
+            return run_id in _live_runs
+    if os.name == "nt":
+        # Signal 0 doesn't probe a process on Windows, the journal can't tell whether the run crashed
+        return False
+    try:
+        os.kill(owner_pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+def get_given_up_urls(db_file, max_attempts: int) -> Set[str]:
+    """
+    :param db_file: Path to the DB
+    :param max_attempts: Number of failed attempts after which a video is given up on
+    :return: URLs of the videos that failed max_attempts times
+    """
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        rows = conn.execute(
+            f"SELECT video_url FROM {JOURNAL_TABLE_NAME} WHERE state = ? AND attempts >= ?",
+            (FAILED, max_attempts)
+        )
+        return {row[0] for row in rows}
+
+def get_journal(db_file, run_id: Optional[str] = None) -> List[Dict]:
+    """
+    :param db_file: Path to the DB
+    :param run_id: Only return the videos of this run
+    :return: URL, Source, RunId, State, Attempts, Error and UpdatedAt of the journaled videos
+    """
+    query = f"SELECT video_url, source, run_id, state, attempts, error, updated_at FROM {JOURNAL_TABLE_NAME}"
+    params = []
+    if run_id:
+        query += " WHERE run_id = ?"
+        params.append(run_id)
+
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        rows = conn.execute(query + " ORDER BY rowid", params).fetchall()
+
+    return [{"URL": row[0], "Source": row[1], "RunId": row[2], "State": row[3], "Attempts": row[4],
+             "Error": row[5], "UpdatedAt": row[6]} for row in rows]
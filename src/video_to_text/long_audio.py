@@ -0,0 +1,219 @@
+import logging
+import multiprocessing
+import os
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from video_to_text.constants import LONG_AUDIO_CHUNK_SECONDS, LONG_AUDIO_PADDING_SECONDS, WHISPER_SAMPLE_RATE
+from video_to_text.helper import shift_segment
+
+logger = logging.getLogger(__name__)
+
+Chunk = Tuple[int, int]
+
+# Model owned by each worker process, loaded once by the pool initializer
+_worker_model = None
+
+def plan_chunks(speech_timestamps: List[Dict],
+                total_samples: int,
+                chunk_samples: int) -> List[Chunk]:
+    """
+    Group speech into chunks of roughly chunk_samples, cutting in the middle of the silence
+    between two speech spans so that no word is split across chunks.
+
+    :param speech_timestamps: Speech spans as returned by faster_whisper.vad.get_speech_timestamps
+    :param total_samples: Length of the audio in samples
+    :param chunk_samples: Target chunk length in samples
+    :return: List of (start, end) sample ranges covering the whole audio
+    """
+    chunks = []
+    chunk_start = 0
+
+    for span, next_span in zip(speech_timestamps, speech_timestamps[1:]):
+        if span["end"] - chunk_start >= chunk_samples:
+            boundary = (span["end"] + next_span["start"]) // 2
+            chunks.append((chunk_start, boundary))
+            chunk_start = boundary
+
+    if chunk_start < total_samples:
+        chunks.append((chunk_start, total_samples))
+
+    return chunks
+
+def stitch_segments(chunk_segments: List[Tuple[Chunk, List]]) -> List:
+    """
+    Merge per-chunk segments into one transcript. Chunks are transcribed with padding, so
+    segments in the overlap are kept only by the chunk that owns their midpoint, and a
+    repeated segment straddling a boundary is dropped.
+
+    :param chunk_segments: (chunk, segments) pairs with segment timestamps relative to the whole audio
+    :return: Segments ordered by time
+    """
+    stitched = []
+    for (start, end), segments in sorted(chunk_segments, key=lambda c: c[0][0]):
+        start_s, end_s = start / WHISPER_SAMPLE_RATE, end / WHISPER_SAMPLE_RATE
+        for segment in segments:
+            midpoint = (segment.start + segment.end) / 2
+            if not start_s <= midpoint < end_s:
+                continue
+            if (stitched
+                    and segment.start < stitched[-1].end
+                    and _normalize(segment.text) == _normalize(stitched[-1].text)):
+                continue
+            stitched.append(segment)
+
+    return [shift_segment(segment, offset=0.0, segment_id=i) for i, segment in enumerate(stitched, start=1)]
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def _init_worker(model_size: str, cpu_threads: int, compute_type: str):
+    global _worker_model
+    from faster_whisper import WhisperModel
+
+    _worker_model = WhisperModel(model_size_or_path=model_size, device="cpu", compute_type=compute_type,
+                                 cpu_threads=cpu_threads)
+
+def _transcribe_chunk(audio: np.ndarray, offset: float, transcribe_options: Dict) -> List:
+    segments, _ = _worker_model.transcribe(audio=audio, **transcribe_options)
+    return [shift_segment(segment, offset=offset, segment_id=segment.id) for segment in segments]
+
+class ParallelTranscriber:
+    """
+    Transcribes long audio by splitting it at silence (VAD) and transcribing the chunks
+    concurrently in a pool of processes, each holding its own CTranslate2 model (int8 by default).
+    The pool is started on first use and reused for subsequent videos. Closing it while audio is
+    being transcribed stops the pool once that transcription finishes.
+    """
+
+    def __init__(self,
+                 model_size: str,
+                 workers: int,
+                 compute_type: Optional[str] = None,
+                 chunk_seconds: float = LONG_AUDIO_CHUNK_SECONDS,
+                 padding_seconds: float = LONG_AUDIO_PADDING_SECONDS,
+                 cpu_threads: Optional[int] = None):
+        """
+        :param model_size: Whisper model size
+        :param workers: Number of worker processes
+        :param compute_type: CTranslate2 compute type of the worker models, int8 when None
+        :param chunk_seconds: Target chunk length
+        :param padding_seconds: Audio added on both sides of a chunk to catch words at its edges
+        :param cpu_threads: Threads per worker, cores are split evenly between workers by default
+        """
+        self.model_size = model_size
+        self.workers = workers
+        self.compute_type = compute_type or "int8"
+        self.chunk_seconds = chunk_seconds
+        self.padding_seconds = padding_seconds
+        self.cpu_threads = cpu_threads or max(1, (os.cpu_count() or 1) // workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Transcriptions running on the pool, and whether close was called during one
+        self._active = 0
+        self._closing = False
+
+    def transcribe(self, audio: np.ndarray, **transcribe_options) -> List:
+        """
+        Transcribe 16 kHz mono audio
+
+        :param audio: Audio samples
+        :param transcribe_options: Extra options for WhisperModel.transcribe passed to every chunk, e.g. beam_size
+        :return: Segments with timestamps relative to the start of the audio
+        """
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        chunk_samples = int(self.chunk_seconds * WHISPER_SAMPLE_RATE)
+        padding = int(self.padding_seconds * WHISPER_SAMPLE_RATE)
+
+        speech = get_speech_timestamps(audio, VadOptions(max_speech_duration_s=self.chunk_seconds))
+        chunks = plan_chunks(speech, total_samples=len(audio), chunk_samples=chunk_samples)
+        logger.info(f"Transcribing {len(audio) / WHISPER_SAMPLE_RATE:.0f}s of audio in {len(chunks)} chunk(s) "
+                    f"across {self.workers} process(es)")
+
+        executor = self._get_executor()
+        try:
+            futures = []
+            for start, end in chunks:
+                padded_start = max(start - padding, 0)
+                padded_end = min(end + padding, len(audio))
+                futures.append(((start, end), executor.submit(_transcribe_chunk,
+                                                              audio[padded_start:padded_end],
+                                                              padded_start / WHISPER_SAMPLE_RATE,
+                                                              transcribe_options)))
+
+            return stitch_segments([(chunk, future.result()) for chunk, future in futures])
+        finally:
+            with self._lock:
+                self._active -= 1
+                if self._closing and not self._active:
+                    self._shutdown()
+
+    def close(self):
+        """
+        Stop the worker processes, once the transcriptions running on them finish
+        """
+        with self._lock:
+            if self._active:
+                self._closing = True
+            else:
+                self._shutdown()
+
+    def _shutdown(self):
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self._closing = False
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            self._active += 1
+            if self._executor is None:
+                # Spawn rather than fork: CTranslate2 and OpenMP thread pools don't survive fork
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=_init_worker,
+                                                     initargs=(self.model_size, self.cpu_threads, self.compute_type))
+            return self._executor
+
+# Every worker process holds a copy of the model outside the ModelRegistry budget, so only the pool
+# of the last requested model, worker count and compute type is kept
+_transcriber: Optional[ParallelTranscriber] = None
+_transcriber_lock = threading.Lock()
+
+def get_parallel_transcriber(model_size: str, workers: int, compute_type: Optional[str] = None) -> ParallelTranscriber:
+    """
+    Return the process-wide parallel transcriber for a model size, worker count and compute type.
+    The pool of a previous transcriber with other settings is closed.
+
+    :param model_size: Whisper model size
+    :param workers: Number of worker processes
+    :param compute_type: CTranslate2 compute type of the worker models, int8 when None
+    :return: ParallelTranscriber
+    """
+    global _transcriber
+    with _transcriber_lock:
+        current = _transcriber
+        if current is not None and (current.model_size, current.workers, current.compute_type) == \
+                (model_size, workers, compute_type or "int8"):
+            return current
+        if current is not None:
+            logger.info(f"Closing the {current.model_size} pool of {current.workers} process(es)")
+            current.close()
+        _transcriber = ParallelTranscriber(model_size=model_size, workers=workers, compute_type=compute_type)
+        return _transcriber
+
+def close_parallel_transcribers():
+    """
+    Stop the worker processes of the process-wide parallel transcriber, e.g. when the CLI, the API
+    or the worker shuts down
+    """
+    global _transcriber
+    with _transcriber_lock:
+        if _transcriber is not None:
+            _transcriber.close()
+            _transcriber = None
@@ -0,0 +1,117 @@
+import csv
+import json
+import logging
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List
+
+from video_to_text.constants import MANIFEST_KEYS
+from video_to_text.exceptions import ManifestError
+
+logger = logging.getLogger(__name__)
+
+def load_manifest(path: Path) -> List[Dict]:
+    """
+    Load the channels and videos of a batch run from a JSON, YAML or CSV manifest.
+
+    JSON and YAML manifests hold a list of entries, or a mapping with the list under
+    "entries". CSV manifests have one entry per row with the keys as header, empty cells
+    are unset. Every entry names one channel_name or one video_id and can narrow it down
+    with max_videos (integer or "all"), min_duration, max_duration, start_date and end_date.
+
+    :param path: Path to the manifest, the format is chosen by its extension
+    :return: Entries with only the keys that were set, dates parsed and "all" as None
+    :raises ManifestError: Unknown format or invalid entry
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    if suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    elif suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ModuleNotFoundError:
+            raise ManifestError("Reading YAML manifests requires PyYAML (pip install video-to-text[yaml])")
+        with open(path, encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    elif suffix == ".csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            data = [{k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()}
+                    for row in csv.DictReader(f)]
+    else:
+        raise ManifestError(f"Unsupported manifest format '{suffix}', use .json, .yaml, .yml or .csv")
+
+    if isinstance(data, dict):
+        data = data.get("entries")
+    if not isinstance(data, list) or not data:
+        raise ManifestError(f"Manifest {path} doesn't list any entries")
+
+    entries = [parse_entry(entry, line) for line, entry in enumerate(data, start=1)]
+    logger.info(f"Loaded {len(entries)} manifest entr{'y' if len(entries) == 1 else 'ies'} from {path}")
+    return entries
+
+def parse_entry(entry: Dict, line: int = 1) -> Dict:
+    """
+    Validate a manifest entry and convert its values
+
+    :param entry: Raw entry
+    :param line: Position of the entry in the manifest, used in error messages
+    :return: Parsed entry
+    :raises ManifestError: Invalid entry
+    """
+    if not isinstance(entry, dict):
+        raise ManifestError(f"Manifest entry {line} must be a mapping, got {entry!r}")
+
+    unknown = set(entry) - set(MANIFEST_KEYS)
+    if unknown:
+        raise ManifestError(f"Manifest entry {line} has unknown key(s): {', '.join(sorted(unknown))}")
+
+    if bool(entry.get("channel_name")) == bool(entry.get("video_id")):
+        raise ManifestError(f"Manifest entry {line} must set either channel_name or video_id and not both")
+
+    parsed = {k: v for k, v in entry.items() if v is not None}
+    if "channel_name" in parsed:
+        parsed["channel_name"] = str(parsed["channel_name"])
+    if "video_id" in parsed:
+        parsed["video_id"] = str(parsed["video_id"])
+
+    if "max_videos" in parsed:
+        value = parsed["max_videos"]
+        if isinstance(value, str) and value.lower() == "all":
+            parsed["max_videos"] = None
+        else:
+            parsed["max_videos"] = _positive_int(value, "max_videos", line)
+
+    for key in ("min_duration", "max_duration"):
+        if key in parsed:
+            parsed[key] = _positive_int(parsed[key], key, line, minimum=0)
+
+    for key in ("start_date", "end_date"):
+        if key in parsed:
+            value = parsed[key]
+            # YAML already parses unquoted dates
+            if isinstance(value, date) and not isinstance(value, datetime):
+                value = datetime(value.year, value.month, value.day)
+            elif not isinstance(value, datetime):
+                try:
+                    value = datetime.strptime(str(value), "%Y-%m-%d")
+                except ValueError:
+                    raise ManifestError(f"Manifest entry {line}: {key} must be a date (YYYY-MM-DD), got {value!r}")
+            parsed[key] = value
+
+    return parsed
+
+def _positive_int(value, key: str, line: int, minimum: int = 1) -> int:
+    # int() would truncate 2.5 and accept True, YAML and JSON parse both from an unquoted value
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        ivalue = None
+    else:
+        try:
+            ivalue = int(value)
+        except (TypeError, ValueError):
+            ivalue = None
+    if ivalue is None or ivalue < minimum:
+        raise ManifestError(f"Manifest entry {line}: {key} must be an integer >= {minimum}, got {value!r}")
+    return ivalue
@@ -0,0 +1,98 @@
+import json
+import logging
+import sqlite3
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from video_to_text.constants import METADATA_CACHE_TABLE_NAME, METADATA_CACHE_TTL_SECONDS
+from video_to_text.database import batched
+
+logger = logging.getLogger(__name__)
+
+class MetadataCache:
+    """
+    YouTube metadata kept in the DB between runs, so repeat runs don't spend API quota on
+    lookups whose answer doesn't change: channel name -> channel ID (a 100 unit /search
+    call), channel ID -> uploads playlist ID and video ID -> title, publish date and duration.
+
+    Entries expire after a TTL per kind. With refresh, cached entries are ignored but
+    still replaced by the fresh values.
+    """
+
+    def __init__(self,
+                 db_file,
+                 refresh: bool = False,
+                 ttl_seconds: Optional[Dict[str, float]] = None,
+                 now: Callable[[], datetime] = lambda: datetime.now(timezone.utc)):
+        """
+        :param db_file: Path to the DB, initialized with database.init_db
+        :param refresh: Ignore cached entries
+        :param ttl_seconds: Time to live per kind of entry, METADATA_CACHE_TTL_SECONDS by default
+        :param now: Returns the current time
+        """
+        self.db_file = db_file
+        self.refresh = refresh
+        self.ttl_seconds = {**METADATA_CACHE_TTL_SECONDS, **(ttl_seconds or {})}
+        self.now = now
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """
+        :param kind: Kind of entry, e.g. "video"
+        :param key: Key within the kind, e.g. a video ID
+        :return: Cached value, None if missing or expired
+        """
+        return self.get_many(kind, [key]).get(key)
+
+    def get_many(self, kind: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        :param kind: Kind of entries
+        :param keys: Keys to look up
+        :return: Dict of key to cached value for the keys that are cached and not expired
+        """
+        keys = list(keys)
+        if self.refresh or not keys:
+            return {}
+
+        now = self.now()
+        ttl = self.ttl_seconds.get(kind)
+        found = {}
+        with sqlite3.connect(self.db_file, timeout=30) as conn:
+            for batch in batched(keys):
+                placeholders = ", ".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, value, fetched_at FROM {METADATA_CACHE_TABLE_NAME} "
+                    f"WHERE kind = ? AND key IN ({placeholders})",
+                    [kind, *batch]
+                ).fetchall()
+                for key, value, fetched_at in rows:
+                    if ttl is None or (now - datetime.fromisoformat(fetched_at)).total_seconds() < ttl:
+                        found[key] = json.loads(value)
+
+        logger.debug(f"Metadata cache: {len(found)}/{len(keys)} {kind} hit(s)")
+        return found
+
+    def set(self, kind: str, key: str, value: Any):
+        """
+        :param kind: Kind of entry
+        :param key: Key within the kind
+        :param value: JSON serializable value
+        """
+        self.set_many(kind, {key: value})
+
+    def set_many(self, kind: str, values: Dict[str, Any]):
+        """
+        :param kind: Kind of entries
+        :param values: Dict of key to JSON serializable value
+        """
+        if not values:
+            return
+
+        fetched_at = self.now().isoformat()
+        with sqlite3.connect(self.db_file, timeout=30) as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {METADATA_CACHE_TABLE_NAME} (kind, key, value, fetched_at) "
+                f"VALUES (?, ?, ?, ?)",
+                [(kind, key, json.dumps(value), fetched_at) for key, value in values.items()]
+            )
+            conn.commit()
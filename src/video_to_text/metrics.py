@@ -0,0 +1,225 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from video_to_text.constants import REALTIME_FACTOR_BUCKETS, RUNS_TABLE_NAME, STAGE_SECONDS_BUCKETS, STAGES
+
+logger = logging.getLogger(__name__)
+
+# Name: (type, help, histogram buckets)
+METRICS = {
+    "video_to_text_stage_seconds": ("histogram", "Seconds spent on a video in each pipeline stage",
+                                    STAGE_SECONDS_BUCKETS),
+    "video_to_text_realtime_factor": ("histogram", "Seconds of audio transcribed per second of decoding",
+                                      REALTIME_FACTOR_BUCKETS),
+    "video_to_text_download_bytes_total": ("counter", "Bytes of audio downloaded", None),
+    "video_to_text_audio_seconds_total": ("counter", "Seconds of audio transcribed", None),
+    "video_to_text_videos_total": ("counter", "Videos processed by outcome", None),
+    "video_to_text_reused_transcripts_total": ("counter", "Videos stored with the transcript of a matching video",
+                                               None),
+    "video_to_text_retranscribed_seconds_total": ("counter", "Seconds of audio the adaptive model policy "
+                                                             "transcribed again with a larger model", None),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Metrics:
+    """
+    Process-wide counters and histograms, rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        # Per histogram: count per bucket (the last one is +Inf), sum and count
+        self._histograms: Dict[Tuple[str, Labels], List] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """
+        :param name: Counter, one of METRICS
+        :param value: Amount to add
+        :param labels: Labels of the series
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        :param name: Histogram, one of METRICS
+        :param value: Observed value
+        :param labels: Labels of the series
+        """
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [[0] * (len(buckets) + 1), 0.0, 0])
+            histogram[0][bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def render(self) -> str:
+        """
+        :return: All series in the Prometheus text exposition format
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: [list(value[0]), value[1], value[2]] for key, value in self._histograms.items()}
+
+        lines = []
+        for name, (kind, description, buckets) in METRICS.items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            if kind == "counter":
+                for (series, labels), value in sorted(counters.items()):
+                    if series == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+
+            for (series, labels), (counts, total, count) in sorted(histograms.items()):
+                if series != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip([*buckets, math.inf], counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == math.inf else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+class RunRecorder:
+    """
+    Stage timings of the videos of a run, persisted in the runs table and observed in the
+    process-wide metrics.
+
+        with recorder.stage("decode", video_url=url) as extra:
+            ...
+            extra["AudioSeconds"] = 600.0
+    """
+
+    def __init__(self, db_file, run_id: str, metrics: Optional[Metrics] = None):
+        """
+        :param db_file: Path to the DB, initialized with database.init_db
+        :param run_id: ID of the run
+        :param metrics: Metrics to observe, the process-wide metrics when not provided
+        """
+        self.db_file = db_file
+        self.run_id = run_id
+        self.metrics = metrics or get_metrics()
+
+    @contextmanager
+    def stage(self, stage: str, video_url: Optional[str] = None, source: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Time a stage, recorded only if it completes. The yielded dict takes the Bytes moved
+        and the AudioSeconds processed by the stage.
+
+        :param stage: One of STAGES
+        :param video_url: URL of the video, None for stages of a whole source
+        :param source: Channel or video the video was listed from
+        """
+        extra = {}
+        start = time.perf_counter()
+        yield extra
+        self.record(stage=stage, seconds=time.perf_counter() - start, video_url=video_url, source=source,
+                    num_bytes=extra.get("Bytes"), audio_seconds=extra.get("AudioSeconds"))
+
+    def record(self,
+               stage: str,
+               seconds: float,
+               video_url: Optional[str] = None,
+               source: Optional[str] = None,
+               num_bytes: Optional[int] = None,
+               audio_seconds: Optional[float] = None):
+        """
+        :param stage: One of STAGES
+        :param seconds: Duration of the stage
+        :param video_url: URL of the video, None for stages of a whole source
+        :param source: Channel or video the video was listed from
+        :param num_bytes: Bytes moved by the stage, e.g. downloaded
+        :param audio_seconds: Seconds of audio processed by the stage
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}'. Expected one of {', '.join(STAGES)}")
+
+        self.metrics.observe("video_to_text_stage_seconds", seconds, stage=stage)
+        if num_bytes:
+            self.metrics.inc("video_to_text_download_bytes_total", num_bytes)
+        if audio_seconds:
+            self.metrics.inc("video_to_text_audio_seconds_total", audio_seconds)
+            if seconds > 0:
+                self.metrics.observe("video_to_text_realtime_factor", audio_seconds / seconds)
+
+        with sqlite3.connect(self.db_file, timeout=30) as conn:
+            conn.execute(f"INSERT INTO {RUNS_TABLE_NAME} "
+                         f"(run_id, source, video_url, stage, seconds, bytes, audio_seconds, recorded_at) "
+                         f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (self.run_id, source, video_url, stage, seconds, num_bytes, audio_seconds,
+                          datetime.now(timezone.utc).isoformat()))
+            conn.commit()
+
+def get_stage_summary(db_file, run_id: str) -> List[Dict]:
+    """
+    Aggregate the stage timings of a run
+
+    :param db_file: Path to the DB
+    :param run_id: ID of the run
+    :return: Stage, Count, TotalSeconds, MeanSeconds, P95Seconds, MBPerSecond (download) and
+             RealtimeFactor (decode) of every stage that ran, in pipeline order
+    """
+    with sqlite3.connect(db_file, timeout=30) as conn:
+        rows = conn.execute(f"SELECT stage, seconds, bytes, audio_seconds FROM {RUNS_TABLE_NAME} WHERE run_id = ?",
+                            (run_id,)).fetchall()
+
+    summary = []
+    for stage in STAGES:
+        timings = [row for row in rows if row[0] == stage]
+        if not timings:
+            continue
+        seconds = sorted(row[1] for row in timings)
+        total = sum(seconds)
+        total_bytes = sum(row[2] or 0 for row in timings)
+        audio = sum(row[3] or 0 for row in timings)
+        summary.append({"Stage": stage,
+                        "Count": len(seconds),
+                        "TotalSeconds": round(total, 2),
+                        "MeanSeconds": round(total / len(seconds), 2),
+                        "P95Seconds": round(_percentile(seconds, 0.95), 2),
+                        "MBPerSecond": round(total_bytes / 1024 ** 2 / total, 2) if total_bytes and total else None,
+                        "RealtimeFactor": round(audio / total, 2) if audio and total else None})
+    return summary
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    # Nearest rank on sorted values
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> Metrics:
+    """
+    Return the process-wide metrics shared by the CLI and the API
+
+    :return: Metrics
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
@@ -0,0 +1,154 @@
+import logging
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from video_to_text.constants import (BEAM_SEARCH_COST, DEFAULT_BEAM_SIZE, DEFAULT_FAST_MODEL, DEFAULT_MODEL_SIZE,
+                                     FAST_BEAM_SIZE, MODEL_POLICIES, MODEL_REALTIME_FACTOR, RETRY_MAX_NO_SPEECH_PROB,
+                                     RETRY_MIN_AVG_LOGPROB)
+from video_to_text.model_registry import get_device, model_family
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Decoding:
+    """
+    Model and decoding options of one transcription pass
+    """
+    model_size: str
+    beam_size: int = DEFAULT_BEAM_SIZE
+    # CTranslate2 compute type, the default of the device when None
+    compute_type: Optional[str] = None
+
+@dataclass(frozen=True)
+class ModelPolicy:
+    """
+    Adaptive choice of model, beam size and compute type per video.
+
+    A fast pass transcribes the whole video with a small model and greedy decoding. Runs of
+    segments it is unsure about (low avg_logprob) are transcribed again with the largest model,
+    up to the requested model size, whose estimated cost still fits the CPU budget of the video.
+    The more confident transcript of a run is kept, so clear speech never reaches the large
+    model and long videos fall back to smaller models instead of exceeding the budget.
+    """
+    # Model of the fast pass, never larger than the requested model size
+    fast_model: str = DEFAULT_FAST_MODEL
+    # Estimated seconds of decoding per video on one CPU, None for no limit
+    cpu_budget: Optional[float] = None
+    # Segments less confident than this are transcribed again
+    min_avg_logprob: float = RETRY_MIN_AVG_LOGPROB
+    # Segments more likely than this to be silence or music are kept as they are
+    max_no_speech_prob: float = RETRY_MAX_NO_SPEECH_PROB
+
+    def fast_pass(self, model_size: str = DEFAULT_MODEL_SIZE, duration: Optional[float] = None) -> Decoding:
+        """
+        :param model_size: Largest model to transcribe with
+        :param duration: Seconds of audio, None when unknown, e.g. for streamed audio
+        :return: Decoding of the fast pass, the largest model up to fast_model within the budget
+        """
+        fast_model = self.fast_model if _rank(self.fast_model) < _rank(model_size) else model_size
+        if fast_model == model_size:
+            # Nothing larger to fall back on, so the only pass uses beam search
+            return Decoding(model_size=model_size, beam_size=DEFAULT_BEAM_SIZE)
+
+        candidates = model_ladder(fast_model)
+        if self.cpu_budget is not None and duration is not None:
+            fitting = [size for size in candidates
+                       if estimate_decode_seconds(size, duration, FAST_BEAM_SIZE) <= self.cpu_budget]
+            fast_model = fitting[-1] if fitting else candidates[0]
+
+        return Decoding(model_size=fast_model, beam_size=FAST_BEAM_SIZE, compute_type=_fast_compute_type())
+
+    def retry(self, model_size: str, fast: Decoding, seconds: float, spent: float = 0.0) -> Optional[Decoding]:
+        """
+        :param model_size: Largest model to transcribe with
+        :param fast: Decoding of the fast pass
+        :param seconds: Seconds of audio to transcribe again
+        :param spent: Estimated seconds of decoding the video already took
+        :return: Decoding of the largest model above the fast pass within the budget, None if none fits
+        """
+        candidates = [size for size in model_ladder(model_size) if _rank(size) > _rank(fast.model_size)]
+        for size in reversed(candidates):
+            if (self.cpu_budget is None
+                    or spent + estimate_decode_seconds(size, seconds, DEFAULT_BEAM_SIZE) <= self.cpu_budget):
+                return Decoding(model_size=size, beam_size=DEFAULT_BEAM_SIZE)
+        return None
+
+    def describe(self, model_size: str = DEFAULT_MODEL_SIZE) -> str:
+        """
+        :param model_size: Largest model to transcribe with
+        :return: Model recorded with the transcripts of the policy, e.g. "base+medium". Only the same
+                 policy and sizes cover it, see model_registry.model_covers
+        """
+        return f"{self.fast_model}+{model_size}"
+
+    def needs_retry(self, segment) -> bool:
+        """
+        :param segment: faster-whisper Segment of the fast pass
+        :return: Whether the segment is speech the fast pass is unsure about
+        """
+        return (segment.avg_logprob is not None
+                and segment.avg_logprob < self.min_avg_logprob
+                and (segment.no_speech_prob or 0.0) <= self.max_no_speech_prob)
+
+def get_model_policy(name: str,
+                     fast_model: str = DEFAULT_FAST_MODEL,
+                     cpu_budget: Optional[float] = None) -> Optional[ModelPolicy]:
+    """
+    Return a model policy by name
+
+    :param name: One of MODEL_POLICIES
+    :param fast_model: Model of the fast pass of the adaptive policy
+    :param cpu_budget: Estimated seconds of decoding per video of the adaptive policy
+    :return: ModelPolicy, None for the fixed policy
+    """
+    if name not in MODEL_POLICIES:
+        raise ValueError(f"Unknown model policy '{name}'. Expected one of {', '.join(MODEL_POLICIES)}")
+    if name == "fixed":
+        return None
+    return ModelPolicy(fast_model=fast_model, cpu_budget=cpu_budget)
+
+def model_ladder(model_size: str) -> List[str]:
+    """
+    :param model_size: Model size name or path
+    :return: Known smaller sizes, smallest first, followed by model_size, e.g. tiny.en, base.en and
+             small.en for "small.en". Just model_size for models of unknown size
+    """
+    family = model_family(model_size)
+    if family is None:
+        return [model_size]
+    sizes = list(MODEL_REALTIME_FACTOR)
+    suffix = ".en" if str(model_size).endswith(".en") else ""
+    return [f"{size}{suffix}" for size in sizes[:sizes.index(family)]] + [model_size]
+
+def estimate_decode_seconds(model_size: str, seconds: float, beam_size: int = DEFAULT_BEAM_SIZE) -> float:
+    """
+    :param model_size: Model size name or path, unknown models are estimated as the default size
+    :param seconds: Seconds of audio
+    :param beam_size: Beam size, 1 for greedy decoding
+    :return: Estimated seconds of decoding on one CPU, see MODEL_REALTIME_FACTOR
+    """
+    cost = seconds / MODEL_REALTIME_FACTOR[model_family(model_size) or DEFAULT_MODEL_SIZE]
+    return cost * BEAM_SEARCH_COST if beam_size > 1 else cost
+
+def segment_confidence(segments: Sequence) -> float:
+    """
+    :param segments: faster-whisper Segments
+    :return: avg_logprob of the segments weighted by their duration, -inf without segments
+    """
+    scored = [s for s in segments if s.avg_logprob is not None]
+    if not scored:
+        return float("-inf")
+    weights = [max(s.end - s.start, 0.0) for s in scored]
+    if not sum(weights):
+        return sum(s.avg_logprob for s in scored) / len(scored)
+    return sum(s.avg_logprob * w for s, w in zip(scored, weights)) / sum(weights)
+
+def _rank(model_size: str) -> int:
+    # Position in MODEL_REALTIME_FACTOR, custom models are assumed to be the largest
+    family = model_family(model_size)
+    return list(MODEL_REALTIME_FACTOR).index(family) if family else len(MODEL_REALTIME_FACTOR)
+
+def _fast_compute_type() -> Optional[str]:
+    # int8 is already the CPU default, on GPUs int8 weights halve the memory of the fast model
+    return None if get_device() == "cpu" else "int8_float16"
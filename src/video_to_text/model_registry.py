@@ -0,0 +1,302 @@
+import logging
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from video_to_text.constants import (DEFAULT_MODEL_SIZE, MODEL_MEMORY_BUDGET_ENV,
+                                     MODEL_MEMORY_MB)
+
+logger = logging.getLogger(__name__)
+
+ModelKey = Tuple[str, str, str]
+
+@lru_cache(maxsize=1)
+def get_device() -> str:
+    """
+    Detect the device to run inference on. The result is cached, so torch is
+    probed at most once per process.
+
+    :return: "cuda" if a CUDA GPU is available, otherwise "cpu"
+    """
+    try:
+        import torch
+    except ModuleNotFoundError:
+        logger.warning("PyTorch not installed. Using CPU only.")
+        return "cpu"
+
+    # Check GPU availability
+    if torch.cuda.is_available():
+        logger.info("Using CUDA GPU")
+        return "cuda"
+    else:
+        logger.info("Using CPU")
+        return "cpu"
+
+def get_compute_type(device: str) -> str:
+    """
+    Default CTranslate2 compute type for a device
+
+    :param device: "cpu" or "cuda"
+    :return: "int8" on CPU, "float16" otherwise
+    """
+    return "int8" if device == "cpu" else "float16"
+
+def model_family(model_size: str) -> Optional[str]:
+    """
+    Size a model is a variant of, e.g. "large" for "large-v3" and "small" for "small.en"
+
+    :param model_size: Model size name or path
+    :return: One of the sizes of MODEL_MEMORY_MB, None for other models
+    """
+    name = os.path.basename(str(model_size).rstrip("/")).lower()
+    for size in MODEL_MEMORY_MB:
+        if name == size or name.startswith(f"{size}-") or name.startswith(f"{size}."):
+            return size
+    return None
+
+def model_covers(model: Optional[str], model_size: str) -> bool:
+    """
+    Whether a transcript made with a model is as good as one made with the requested model
+
+    :param model: Model a transcript was made with, None if unknown
+    :param model_size: Requested model size name or path
+    :return: True for the same model or a larger size, e.g. "large-v3" covers "medium"
+    """
+    if model is None:
+        return False
+    if model == model_size:
+        return True
+    family, requested = model_family(model), model_family(model_size)
+    if family is None or requested is None:
+        return False
+    sizes = list(MODEL_MEMORY_MB)
+    return sizes.index(family) >= sizes.index(requested)
+
+def estimate_model_memory(model_size: str) -> int:
+    """
+    Approximate memory footprint (MB) of a model, e.g. "large-v3" is sized as "large"
+
+    :param model_size: Model size name or path
+    :return: Estimated size in MB
+    """
+    return MODEL_MEMORY_MB[model_family(model_size) or DEFAULT_MODEL_SIZE]
+
+def _load_whisper_model(model_size: str, device: str, compute_type: str):
+    from faster_whisper import WhisperModel
+
+    return WhisperModel(model_size_or_path=model_size, device=device, compute_type=compute_type)
+
+class _Entry:
+    def __init__(self, model, memory_mb: int):
+        self.model = model
+        self.memory_mb = memory_mb
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded Whisper models keyed by (model size, device, compute type).
+
+    Models are loaded on first use and kept until the memory budget is exceeded, at which
+    point the least recently used idle models are evicted. Models currently in use are
+    never evicted.
+    """
+
+    def __init__(self,
+                 memory_budget_mb: Optional[int] = None,
+                 loader: Optional[Callable[[str, str, str], object]] = None):
+        """
+        :param memory_budget_mb: Memory budget for loaded models in MB. None means unbounded
+        :param loader: Callable (model_size, device, compute_type) -> model
+        """
+        self.memory_budget_mb = memory_budget_mb
+        self._loader = loader or _load_whisper_model
+        self._entries: "OrderedDict[ModelKey, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+
+    @staticmethod
+    def resolve_key(model_size: str = DEFAULT_MODEL_SIZE,
+                    device: Optional[str] = None,
+                    compute_type: Optional[str] = None) -> ModelKey:
+        """
+        Fill in device and compute type defaults
+
+        :param model_size: Model size name or path
+        :param device: Device, detected when not provided
+        :param compute_type: Compute type, derived from device when not provided
+        :return: Registry key
+        """
+        device = device or get_device()
+        compute_type = compute_type or get_compute_type(device)
+        return model_size, device, compute_type
+
+    def get(self,
+            model_size: str = DEFAULT_MODEL_SIZE,
+            device: Optional[str] = None,
+            compute_type: Optional[str] = None):
+        """
+        Return a cached model, loading it if needed
+
+        :param model_size: Model size name or path
+        :param device: Device to load model on
+        :param compute_type: CTranslate2 compute type
+        :return: Loaded model
+        """
+        key = self.resolve_key(model_size, device, compute_type)
+        return self._get_entry(key, acquire=False).model
+
+    @contextmanager
+    def acquire(self,
+                model_size: str = DEFAULT_MODEL_SIZE,
+                device: Optional[str] = None,
+                compute_type: Optional[str] = None) -> Iterator:
+        """
+        Context manager yielding a cached model that is protected from eviction while in use
+
+        :param model_size: Model size name or path
+        :param device: Device to load model on
+        :param compute_type: CTranslate2 compute type
+        """
+        key = self.resolve_key(model_size, device, compute_type)
+        entry = self._get_entry(key, acquire=True)
+        try:
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def warmup(self,
+               model_sizes: Iterable[str] = (DEFAULT_MODEL_SIZE,),
+               device: Optional[str] = None,
+               compute_type: Optional[str] = None) -> List[ModelKey]:
+        """
+        Load models ahead of time, e.g. at application startup
+
+        :param model_sizes: Model sizes to load
+        :param device: Device to load models on
+        :param compute_type: CTranslate2 compute type
+        :return: Keys of loaded models
+        """
+        keys = []
+        for model_size in model_sizes:
+            key = self.resolve_key(model_size, device, compute_type)
+            logger.info(f"Warming up model {key}")
+            self._get_entry(key, acquire=False)
+            keys.append(key)
+        return keys
+
+    def evict_idle(self, max_idle_seconds: float = 0) -> List[ModelKey]:
+        """
+        Evict models that have not been used for at least max_idle_seconds
+
+        :param max_idle_seconds: Minimum idle time before a model is evicted
+        :return: Keys of evicted models
+        """
+        now = time.monotonic()
+        with self._lock:
+            idle = [key for key, entry in self._entries.items()
+                    if not entry.in_use and now - entry.last_used >= max_idle_seconds]
+            for key in idle:
+                self._evict(key)
+        return idle
+
+    def clear(self):
+        """
+        Drop all idle models
+        """
+        self.evict_idle(max_idle_seconds=0)
+
+    def loaded(self) -> List[ModelKey]:
+        """
+        :return: Keys of loaded models, least recently used first
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def memory_in_use(self) -> int:
+        """
+        :return: Estimated memory of loaded models in MB
+        """
+        with self._lock:
+            return sum(entry.memory_mb for entry in self._entries.values())
+
+    def _get_entry(self, key: ModelKey, acquire: bool) -> _Entry:
+        with self._lock:
+            entry = self._touch(key, acquire)
+            if entry:
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available; the per-key
+        # lock makes concurrent requests for the same model wait for a single load.
+        with key_lock:
+            with self._lock:
+                entry = self._touch(key, acquire)
+                if entry:
+                    return entry
+                memory_mb = estimate_model_memory(key[0])
+                self._make_room(memory_mb)
+
+            logger.info(f"Loading model: size={key[0]} device={key[1]} compute_type={key[2]}")
+            start = time.perf_counter()
+            model = self._loader(*key)
+            logger.info(f"Loaded model {key[0]} in {time.perf_counter() - start:.1f}s")
+
+            with self._lock:
+                entry = _Entry(model=model, memory_mb=memory_mb)
+                if acquire:
+                    entry.in_use += 1
+                self._entries[key] = entry
+                return entry
+
+    def _touch(self, key: ModelKey, acquire: bool) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        entry.last_used = time.monotonic()
+        if acquire:
+            entry.in_use += 1
+        return entry
+
+    def _make_room(self, memory_mb: int):
+        if self.memory_budget_mb is None:
+            return
+
+        for key in list(self._entries):
+            if self.memory_in_use() + memory_mb <= self.memory_budget_mb:
+                return
+            if not self._entries[key].in_use:
+                self._evict(key)
+
+        if self.memory_in_use() + memory_mb > self.memory_budget_mb:
+            logger.warning(f"Model memory budget of {self.memory_budget_mb} MB exceeded; "
+                           f"all loaded models are in use")
+
+    def _evict(self, key: ModelKey):
+        logger.info(f"Evicting model {key}")
+        del self._entries[key]
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ModelRegistry:
+    """
+    Return the process-wide model registry shared by the CLI and the API.
+    The memory budget is read from VIDEO_TO_TEXT_MODEL_MEMORY_MB if set.
+
+    :return: ModelRegistry
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            budget = os.getenv(MODEL_MEMORY_BUDGET_ENV)
+            _registry = ModelRegistry(memory_budget_mb=int(budget) if budget else None)
+        return _registry
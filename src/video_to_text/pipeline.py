@@ -0,0 +1,193 @@
+import logging
+import queue
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from video_to_text.constants import DEFAULT_DOWNLOAD_WORKERS, DEFAULT_PREFETCH, DEFAULT_TRANSCRIBE_WORKERS
+from video_to_text.exceptions import TranscriptionCancelled
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+class Pipeline:
+    """
+    Staged download -> transcribe -> store pipeline connected by bounded queues.
+
+    A pool of downloaders prefetches up to `prefetch` videos ahead of the transcription
+    stage, `transcribe_workers` threads transcribe, and a single writer thread stores the
+    results, so downloads overlap with CPU bound transcription and only one thread writes
+    to SQLite.
+    """
+
+    def __init__(self,
+                 download: Callable[[Dict], Any],
+                 transcribe: Callable[[Dict, Any], Any],
+                 store: Callable[[Dict, Any], Any],
+                 release: Optional[Callable[[Any], None]] = None,
+                 download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+                 transcribe_workers: int = DEFAULT_TRANSCRIBE_WORKERS,
+                 prefetch: int = DEFAULT_PREFETCH):
+        """
+        :param download: Download stage, video -> downloaded audio
+        :param transcribe: Transcription stage, (video, downloaded audio) -> transcript
+        :param store: Storage stage, (video, transcript) -> result
+        :param release: Called with every downloaded audio once it is no longer needed, e.g. to
+                        delete temporary files
+        :param download_workers: Number of concurrent downloads
+        :param transcribe_workers: Number of concurrent transcriptions
+        :param prefetch: Number of videos downloaded ahead of the transcription stage
+        """
+        if download_workers < 1 or transcribe_workers < 1 or prefetch < 0:
+            raise ValueError("Worker counts must be positive and prefetch must not be negative")
+
+        self.download = download
+        self.transcribe = transcribe
+        self.store = store
+        self.release = release
+        self.download_workers = download_workers
+        self.transcribe_workers = transcribe_workers
+        self.prefetch = prefetch
+
+    def run(self,
+            videos: Iterable[Dict],
+            cancel: Optional[threading.Event] = None,
+            on_result: Optional[Callable[[Any], None]] = None,
+            on_error: Optional[Callable[[Dict, Exception], None]] = None) -> List:
+        """
+        Run all videos through the pipeline. The first error stops the pipeline and is re-raised,
+        unless on_error is given: a video failing in any stage is then reported and skipped.
+
+        :param videos: Videos to process
+        :param cancel: Stops the pipeline when set, run then raises TranscriptionCancelled
+        :param on_result: Called from the writer thread with every result of the store stage
+        :param on_error: Called with a video and the exception it failed with, the pipeline carries on
+                         with the next video. Errors listing the videos still stop the pipeline
+        :return: Results of the store stage, in input order
+        """
+        results: Dict[int, Any] = {}
+        errors: List[BaseException] = []
+        stop = threading.Event()
+        fed = {"count": 0, "exhausted": False, "failed": 0}
+        failed_lock = threading.Lock()
+
+        def stopped() -> bool:
+            return stop.is_set() or (cancel is not None and cancel.is_set())
+
+        # Bounds the number of videos that are downloaded (or downloading) but not yet transcribed
+        slots = threading.Semaphore(self.prefetch + self.transcribe_workers)
+        transcribe_queue: "queue.Queue" = queue.Queue()
+        store_queue: "queue.Queue" = queue.Queue(maxsize=self.prefetch + self.transcribe_workers)
+
+        def fail(e: BaseException):
+            if not stop.is_set():
+                errors.append(e)
+                stop.set()
+
+        def fail_video(video: Dict, e: BaseException):
+            # Cancellation and interrupts stop the whole pipeline, not just the video
+            if on_error is None or not isinstance(e, Exception) or isinstance(e, TranscriptionCancelled):
+                fail(e)
+                return
+            with failed_lock:
+                fed["failed"] += 1
+            try:
+                on_error(video, e)
+            except BaseException as handler_error:
+                fail(handler_error)
+
+        def feed(executor: ThreadPoolExecutor):
+            try:
+                for index, video in enumerate(videos):
+                    while not slots.acquire(timeout=0.1):
+                        if stopped():
+                            return
+                    if stopped():
+                        return
+                    transcribe_queue.put((index, video, executor.submit(self.download, video)))
+                    fed["count"] += 1
+                fed["exhausted"] = True
+            except BaseException as e:
+                fail(e)
+            finally:
+                for _ in range(self.transcribe_workers):
+                    transcribe_queue.put(_DONE)
+
+        def transcribe_worker():
+            while True:
+                item = transcribe_queue.get()
+                if item is _DONE:
+                    break
+
+                index, video, download = item
+                try:
+                    if stopped():
+                        if not download.cancel():
+                            download.add_done_callback(self._release_future)
+                        continue
+                    downloaded = download.result()
+                    try:
+                        if not stopped():
+                            store_queue.put((index, video, self.transcribe(video, downloaded)))
+                    finally:
+                        self._release(downloaded)
+                except BaseException as e:
+                    fail_video(video, e)
+                finally:
+                    slots.release()
+
+        def store_worker():
+            while True:
+                item = store_queue.get()
+                if item is _DONE:
+                    break
+
+                index, video, transcript = item
+                # Transcripts finished before a cancellation are still stored, only errors discard them
+                if stop.is_set():
+                    continue
+                try:
+                    results[index] = self.store(video, transcript)
+                except BaseException as e:
+                    fail_video(video, e)
+                    continue
+                if on_result:
+                    try:
+                        on_result(results[index])
+                    except BaseException as e:
+                        fail(e)
+
+        with ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix="download") as executor:
+            feeder = threading.Thread(target=feed, args=(executor,), name="pipeline-feed", daemon=True)
+            transcribers = [threading.Thread(target=transcribe_worker, name=f"transcribe-{i}", daemon=True)
+                            for i in range(self.transcribe_workers)]
+            writer = threading.Thread(target=store_worker, name="store", daemon=True)
+
+            for thread in [feeder, *transcribers, writer]:
+                thread.start()
+
+            feeder.join()
+            for thread in transcribers:
+                thread.join()
+            store_queue.put(_DONE)
+            writer.join()
+
+        if errors:
+            raise errors[0]
+        if cancel and cancel.is_set() and (not fed["exhausted"] or len(results) + fed["failed"] < fed["count"]):
+            raise TranscriptionCancelled(f"Cancelled after {len(results)} video(s)")
+
+        return [results[index] for index in sorted(results)]
+
+    def _release(self, downloaded: Any):
+        if self.release:
+            try:
+                self.release(downloaded)
+            except Exception as e:
+                logger.warning(f"Could not release downloaded audio: {e}")
+
+    def _release_future(self, download: Future):
+        if not download.cancelled() and download.exception() is None:
+            self._release(download.result())
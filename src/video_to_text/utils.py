@@ -1,7 +1,21 @@
 import os
-from dotenv import load_dotenv
+import threading
 
-load_dotenv()
+_env_loaded = False
+_env_lock = threading.Lock()
+
+def load_env():
+    """
+    Load variables from a .env file into the environment, once per process. Variables already
+    set in the environment take precedence.
+    """
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _env_loaded = True
 
 def get_api_key(key_name) -> str:
     """
@@ -10,6 +24,7 @@ def get_api_key(key_name) -> str:
     :param key_name: API key name
     :return: API key
     """
+    load_env()
     api_key = os.getenv(key_name)
 
     if api_key is None:
@@ -1,38 +1,225 @@
-import yt_dlp
 import logging
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
 from tenacity import (retry, stop_after_attempt, wait_exponential,
                       before_log, after_log)
+from typing import Dict, Iterator, List, Optional
+
+from video_to_text.constants import (AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT, STREAM_CHUNK_SECONDS, STREAM_PIPE_BYTES,
+                                     WHISPER_SAMPLE_RATE)
 
 logger = logging.getLogger(__name__)
 
+def get_download_options(tempdir, audio_format: str = DEFAULT_AUDIO_FORMAT) -> dict:
+    """
+    Build yt-dlp options for an audio format
+
+    native: keep the downloaded m4a/webm stream as-is, faster-whisper decodes it directly
+    pcm: convert to 16 kHz mono WAV, the sample format Whisper consumes
+    mp3: 192 kbps MP3, for archiving the audio
+
+    :param tempdir: Directory to download into
+    :param audio_format: One of "native", "pcm" or "mp3"
+    :return: Dict of yt-dlp options
+    """
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio format '{audio_format}'. Expected one of {', '.join(AUDIO_FORMATS)}")
+
+    ydl_opts = {
+        'format': '140/251/bestaudio',
+        'outtmpl': f'{tempdir}/%(title)s-%(id)s.%(ext)s',
+    }
+
+    if audio_format == "pcm":
+        ydl_opts['postprocessors'] = [
+            {'key': 'FFmpegExtractAudio',
+             'preferredcodec': 'wav'}
+        ]
+        ydl_opts['postprocessor_args'] = {
+            'extractaudio': ['-ar', str(WHISPER_SAMPLE_RATE), '-ac', '1']
+        }
+    elif audio_format == "mp3":
+        ydl_opts['postprocessors'] = [
+            {'key': 'FFmpegExtractAudio',
+             'preferredcodec': 'mp3',
+             'preferredquality': '192'}
+        ]
+
+    return ydl_opts
+
 @retry(stop=stop_after_attempt(3),
        wait=wait_exponential(multiplier=2),
        before=before_log(logger, logging.INFO),
        after=after_log(logger, logging.INFO),
        reraise=True)
-def download_audio(youtube_url, tempdir) -> str:
+def download_audio(youtube_url, tempdir, audio_format: str = DEFAULT_AUDIO_FORMAT,
+                   stats: Optional[Dict] = None) -> str:
     """
     Download audio file from YouTube URL
 
     :param youtube_url: YouTube URL
     :param tempdir: Temporary directory
+    :param audio_format: One of "native" (default), "pcm" or "mp3"
+    :param stats: Filled with the DownloadBytes and the TranscodeSeconds ffmpeg spent converting the audio
     :return: str containing filename
     """
-    ydl_opts = {
-        'format': '140/251/bestaudio',
-        'outtmpl': f'{tempdir}/%(title)s-%(id)s.%(ext)s',
-        'postprocessors': [
-            {'key': 'FFmpegExtractAudio',
-             'preferredcodec': 'mp3',
-             'preferredquality': '192'}
-        ]
-    }
+    import yt_dlp
+
+    ydl_opts = get_download_options(tempdir=tempdir, audio_format=audio_format)
+    if stats is not None:
+        stats.update({"DownloadBytes": 0, "TranscodeSeconds": 0.0})
+        ydl_opts["progress_hooks"] = [lambda d: _record_download(d, stats)]
+        ydl_opts["postprocessor_hooks"] = [lambda d: _record_transcode(d, stats)]
+
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info = ydl.extract_info(youtube_url)
 
-        for fmt in info.get("requested_downloads", []):
+        requested_downloads = info.get("requested_downloads", [])
+        for fmt in requested_downloads:
             logger.debug(f"Chosen format: id={fmt.get('format_id')} note={fmt.get('format_note')}")
 
+        # yt-dlp updates filepath once post-processors have run
+        if requested_downloads and requested_downloads[0].get("filepath"):
+            return requested_downloads[0]["filepath"]
+
         output_path = ydl.prepare_filename(info)
-        file_path = yt_dlp.utils.replace_extension(output_path, "mp3")
-    return file_path
+        if audio_format == "pcm":
+            return yt_dlp.utils.replace_extension(output_path, "wav")
+        if audio_format == "mp3":
+            return yt_dlp.utils.replace_extension(output_path, "mp3")
+        return output_path
+
+def _record_download(progress: Dict, stats: Dict):
+    if progress["status"] == "finished":
+        stats["DownloadBytes"] = progress.get("total_bytes") or progress.get("downloaded_bytes") or 0
+
+def _record_transcode(progress: Dict, stats: Dict):
+    if progress.get("postprocessor") != "ExtractAudio":
+        return
+    if progress["status"] == "started":
+        stats["_transcode_started"] = time.perf_counter()
+    elif progress["status"] == "finished" and "_transcode_started" in stats:
+        stats["TranscodeSeconds"] += time.perf_counter() - stats.pop("_transcode_started")
+
+class AudioStream:
+    """
+    Audio of a YouTube video decoded to 16 kHz mono float32 while it downloads.
+
+    yt-dlp writes the audio stream to stdout, which is copied to ffmpeg by a thread counting
+    the downloaded bytes. Nothing is written to disk and the pipes apply backpressure, so
+    memory use is bounded by the chunk size no matter how long the video is. Processes are
+    started by start() or on the first iteration, see stats() for what was transferred.
+
+        with AudioStream(url) as stream:
+            for chunk in stream:
+                ...
+    """
+
+    def __init__(self,
+                 youtube_url: str,
+                 chunk_seconds: float = STREAM_CHUNK_SECONDS,
+                 download_cmd: Optional[List[str]] = None,
+                 decode_cmd: Optional[List[str]] = None):
+        """
+        :param youtube_url: YouTube URL
+        :param chunk_seconds: Seconds of audio per chunk
+        :param download_cmd: Command writing the audio stream to stdout, yt-dlp by default
+        :param decode_cmd: Command decoding stdin to raw float32 samples on stdout, ffmpeg by default
+        """
+        self.youtube_url = youtube_url
+        self.chunk_bytes = int(chunk_seconds * WHISPER_SAMPLE_RATE) * 4
+        self.download_cmd = download_cmd or [sys.executable, "-m", "yt_dlp", "--quiet", "--no-progress",
+                                             "-f", "140/251/bestaudio", "-o", "-", youtube_url]
+        self.decode_cmd = decode_cmd or ["ffmpeg", "-loglevel", "error", "-i", "pipe:0",
+                                         "-f", "f32le", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE), "pipe:1"]
+        self._download: Optional[subprocess.Popen] = None
+        self._decode: Optional[subprocess.Popen] = None
+        self._pipe: Optional[threading.Thread] = None
+        self._started: Optional[float] = None
+        self._download_seconds: Optional[float] = None
+        self._download_bytes = 0
+        self._audio_samples = 0
+
+    def start(self) -> "AudioStream":
+        """
+        Start downloading and decoding
+        """
+        if self._download is None:
+            logger.info(f"Streaming audio from {self.youtube_url}")
+            self._started = time.perf_counter()
+            self._download = subprocess.Popen(self.download_cmd, stdout=subprocess.PIPE)
+            self._decode = subprocess.Popen(self.decode_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self._pipe = threading.Thread(target=self._copy, name="audio-stream-pipe", daemon=True)
+            self._pipe.start()
+        return self
+
+    def _copy(self):
+        try:
+            while True:
+                # read1 passes on what has arrived instead of waiting for a full buffer
+                data = self._download.stdout.read1(STREAM_PIPE_BYTES)
+                if not data:
+                    break
+                self._download_bytes += len(data)
+                self._decode.stdin.write(data)
+        except (OSError, ValueError):
+            # The decoder exited or the stream was closed, the exit codes tell which
+            pass
+        finally:
+            self._download_seconds = time.perf_counter() - self._started
+            for pipe in (self._decode.stdin, self._download.stdout):
+                try:
+                    pipe.close()
+                except OSError:
+                    pass
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        self.start()
+        pending = b""
+        while True:
+            data = self._decode.stdout.read(self.chunk_bytes)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % 4
+            pending = data[usable:]
+            if usable:
+                self._audio_samples += usable // 4
+                yield np.frombuffer(data[:usable], dtype=np.float32)
+
+        if self._decode.wait() != 0 or self._download.wait() != 0:
+            raise RuntimeError(f"Streaming audio from {self.youtube_url} failed "
+                               f"(download exit code {self._download.returncode}, "
+                               f"decode exit code {self._decode.returncode})")
+
+    def stats(self) -> Dict:
+        """
+        :return: DownloadBytes received from the downloader, DownloadSeconds from the start until the
+                 download ended (None while it runs, paced by the reader of the audio) and AudioSeconds decoded
+        """
+        return {"DownloadBytes": self._download_bytes,
+                "DownloadSeconds": self._download_seconds,
+                "AudioSeconds": self._audio_samples / WHISPER_SAMPLE_RATE}
+
+    def close(self):
+        """
+        Stop downloading and decoding
+        """
+        for process in (self._decode, self._download):
+            if process and process.poll() is None:
+                process.kill()
+                process.wait()
+        if self._pipe:
+            self._pipe.join()
+        if self._decode and self._decode.stdout:
+            self._decode.stdout.close()
+
+    def __enter__(self) -> "AudioStream":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
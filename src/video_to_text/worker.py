@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from platformdirs import user_data_dir
+
+from video_to_text.constants import (APP_NAME, DEFAULT_MAX_JOBS, WORKER_CONNECT_TIMEOUT, WORKER_SOCKET_ENV,
+                                     WORKER_SOCKET_NAME)
+from video_to_text.exceptions import WorkerError, WorkerUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Parameters of a batch sent as paths and dates, see core.run_batch
+_PATH_PARAMS = ("output_dir",)
+_DATE_KEYS = ("start_date", "end_date")
+
+def get_socket_path() -> Path:
+    """
+    :return: Socket of the worker, from VIDEO_TO_TEXT_WORKER_SOCKET or in the user data directory
+    """
+    return Path(os.getenv(WORKER_SOCKET_ENV) or Path(user_data_dir(appname=APP_NAME))/WORKER_SOCKET_NAME)
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Long-lived local worker keeping models and the YouTube client, with its connection pool and
+    ETag cache, warm between CLI invocations. DB connections are not kept: like everywhere else
+    they are opened per query, which costs far less than the query itself, and the metadata
+    cache lives in the DB so the worker reads it as warm as the page cache keeps it.
+
+    Clients send one JSON line with a command and read JSON lines back until the last event.
+    A batch is cancelled when its client disconnects, e.g. on Ctrl-C, and at most max_jobs
+    batches run at the same time.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, max_jobs: int = DEFAULT_MAX_JOBS):
+        """
+        :param socket_path: Path of the Unix socket to listen on
+        :param max_jobs: Batches run at the same time, the others wait
+        """
+        self.socket_path = Path(socket_path)
+        self.slots = threading.Semaphore(max_jobs)
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            if is_running(self.socket_path):
+                raise WorkerError(f"A worker is already listening on {self.socket_path}")
+            # Left behind by a worker that didn't shut down cleanly
+            self.socket_path.unlink()
+        # Only the user running the worker may submit work. The socket is created without access for
+        # others, a chmod after bind would leave a window in which anyone could connect
+        umask = os.umask(0o077)
+        try:
+            super().__init__(str(self.socket_path), _Handler)
+        finally:
+            os.umask(umask)
+        os.chmod(self.socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: WorkerServer
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            self._send({"event": "error", "error": "Malformed request"})
+            return
+
+        if request.get("command") == "ping":
+            from video_to_text.model_registry import get_registry
+
+            self._send({"event": "pong", "pid": os.getpid(), "models": [key[0] for key in get_registry().loaded()]})
+        elif request.get("command") == "run_batch":
+            self._run_batch(request.get("params", {}))
+        else:
+            self._send({"event": "error", "error": f"Unknown command {request.get('command')!r}"})
+
+    def _run_batch(self, params: Dict):
+        from video_to_text.core import run_batch
+
+        cancel = threading.Event()
+        # The client sends nothing after its request, so end of input means it went away
+        threading.Thread(target=self._watch_disconnect, args=(cancel,), daemon=True).start()
+
+        with self.server.slots:
+            if cancel.is_set():
+                return
+            logger.info(f"Running batch of {len(params.get('sources', []))} source(s) for a client")
+            try:
+                _, summary = run_batch(**decode_params(params),
+                                       cancel=cancel,
+                                       on_stored=lambda video: self._send({"event": "stored", "video": video}))
+            except Exception as e:
+                logger.exception("Batch failed")
+                self._send({"event": "error", "error": str(e), "type": type(e).__name__})
+                return
+
+        self._send({"event": "done", "summary": summary})
+
+    def _watch_disconnect(self, cancel: threading.Event):
+        try:
+            while self.rfile.read(1):
+                pass
+        except (OSError, ValueError):
+            pass
+        cancel.set()
+
+    def _send(self, event: Dict):
+        try:
+            self.wfile.write((json.dumps(event, default=str) + "\n").encode())
+            self.wfile.flush()
+        except OSError:
+            # The client went away, _watch_disconnect cancels the batch
+            pass
+
+def serve(socket_path: Optional[Path] = None,
+          warmup_models: Iterable[str] = (),
+          max_jobs: int = DEFAULT_MAX_JOBS):
+    """
+    Run a worker until interrupted
+
+    :param socket_path: Path of the Unix socket, see get_socket_path
+    :param warmup_models: Model sizes loaded before accepting work
+    :param max_jobs: Batches run at the same time
+    """
+    from video_to_text.long_audio import close_parallel_transcribers
+    from video_to_text.model_registry import get_registry
+
+    warmup_models = list(warmup_models)
+    if warmup_models:
+        get_registry().warmup(warmup_models)
+
+    if threading.current_thread() is threading.main_thread():
+        # Service managers stop the worker with SIGTERM, shut down as on Ctrl-C
+        signal.signal(signal.SIGTERM, _interrupt)
+
+    with WorkerServer(socket_path=socket_path or get_socket_path(), max_jobs=max_jobs) as server:
+        logger.info(f"Worker {os.getpid()} listening on {server.socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Worker stopped")
+        finally:
+            close_parallel_transcribers()
+            get_registry().clear()
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def is_running(socket_path: Optional[Path] = None) -> bool:
+    """
+    :param socket_path: Path of the Unix socket, see get_socket_path
+    :return: Whether a worker answers on the socket
+    """
+    try:
+        events = list(_request(socket_path or get_socket_path(), {"command": "ping"}))
+    except (WorkerUnavailable, WorkerError):
+        return False
+    return bool(events) and events[-1].get("event") == "pong"
+
+def submit(params: Dict,
+           socket_path: Optional[Path] = None,
+           on_stored: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """
+    Run a batch on the worker
+
+    :param params: Keyword arguments of core.run_batch, except the callbacks and cancel
+    :param socket_path: Path of the Unix socket, see get_socket_path
+    :param on_stored: Called with every video once its transcript is saved
+    :return: Summary per source, see core.run_batch
+    :raises WorkerUnavailable: No worker is running, the batch can run in-process instead
+    :raises WorkerError: The batch failed on the worker
+    """
+    for event in _request(socket_path or get_socket_path(), {"command": "run_batch", "params": encode_params(params)}):
+        if event["event"] == "stored" and on_stored:
+            on_stored(event["video"])
+        elif event["event"] == "done":
+            return event["summary"]
+        elif event["event"] == "error":
+            raise WorkerError(event["error"])
+    raise WorkerError("The worker closed the connection before the batch finished")
+
+def _request(socket_path: Path, request: Dict) -> Iterable[Dict]:
+    if not hasattr(socket, "AF_UNIX"):
+        raise WorkerUnavailable("Unix sockets aren't supported on this platform")
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(WORKER_CONNECT_TIMEOUT)
+        try:
+            sock.connect(str(socket_path))
+        except OSError as e:
+            raise WorkerUnavailable(f"No worker listening on {socket_path}: {e}")
+        # Batches take as long as they take
+        sock.settimeout(None)
+        sock.sendall((json.dumps(request) + "\n").encode())
+
+        with sock.makefile("rb") as stream:
+            for line in stream:
+                yield json.loads(line)
+    finally:
+        sock.close()
+
+def encode_params(params: Dict) -> Dict:
+    """
+    :param params: Keyword arguments of core.run_batch
+    :return: JSON serializable parameters, the audio cache is sent as its directory and size and the
+             model policy as its fields
+    """
+    encoded = dict(params)
+    for key in _PATH_PARAMS:
+        if encoded.get(key) is not None:
+            # The worker doesn't share the working directory of the CLI
+            encoded[key] = str(Path(encoded[key]).resolve())
+
+    cache = encoded.pop("audio_cache", None)
+    if cache is not None:
+        encoded["audio_cache"] = {"directory": str(Path(cache.directory).resolve()), "max_bytes": cache.max_bytes}
+
+    if encoded.get("model_policy") is not None:
+        encoded["model_policy"] = asdict(encoded["model_policy"])
+
+    encoded["sources"] = [{key: value.isoformat() if key in _DATE_KEYS and value is not None else value
+                           for key, value in source.items()} for source in encoded.get("sources", [])]
+    return encoded
+
+def decode_params(params: Dict) -> Dict:
+    """
+    :param params: Parameters as encoded by encode_params
+    :return: Keyword arguments of core.run_batch
+    """
+    from video_to_text.audio_cache import AudioCache
+    from video_to_text.model_policy import ModelPolicy
+
+    decoded = dict(params)
+    for key in _PATH_PARAMS:
+        if decoded.get(key) is not None:
+            decoded[key] = Path(decoded[key])
+
+    cache = decoded.pop("audio_cache", None)
+    if cache is not None:
+        decoded["audio_cache"] = AudioCache(directory=Path(cache["directory"]), max_bytes=cache["max_bytes"])
+
+    if decoded.get("model_policy") is not None:
+        decoded["model_policy"] = ModelPolicy(**decoded["model_policy"])
+
+    decoded["sources"] = [{key: datetime.fromisoformat(value) if key in _DATE_KEYS and value is not None else value
+                           for key, value in source.items()} for source in decoded.get("sources", [])]
+    return decoded
@@ -0,0 +1,242 @@
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from video_to_text.constants import (YOUTUBE_API_URL, YOUTUBE_CONNECTION_BACKOFF_SECONDS, YOUTUBE_ETAG_CACHE_SIZE,
+                                     YOUTUBE_MAX_CONNECTION_RETRIES, YOUTUBE_MAX_RETRIES, YOUTUBE_QUOTA_COSTS,
+                                     YOUTUBE_RATE_LIMIT_REASONS, YOUTUBE_RETRY_STATUSES, YOUTUBE_TIMEOUT_SECONDS)
+from video_to_text.exceptions import YouTubeAPIException
+
+logger = logging.getLogger(__name__)
+
+class YouTubeClient:
+    """
+    Client for the YouTube Data API shared by all requests of a process.
+
+    Connections are kept alive in a pooled session, transient errors (429, 5xx, per-second
+    rate limits) are retried with exponential backoff, connection errors and timeouts a few
+    times more with a short backoff, and responses are revalidated with If-None-Match so unchanged resources are not downloaded again. Latency
+    and quota units are accounted per endpoint, see stats().
+    """
+
+    def __init__(self,
+                 session: Optional[requests.Session] = None,
+                 base_url: str = YOUTUBE_API_URL,
+                 max_retries: int = YOUTUBE_MAX_RETRIES,
+                 backoff: float = 1.0,
+                 max_connection_retries: int = YOUTUBE_MAX_CONNECTION_RETRIES,
+                 connection_backoff: float = YOUTUBE_CONNECTION_BACKOFF_SECONDS,
+                 timeout: float = YOUTUBE_TIMEOUT_SECONDS,
+                 pool_size: int = 10,
+                 etag_cache_size: int = YOUTUBE_ETAG_CACHE_SIZE,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        :param session: Session to send requests with, a new pooled session by default
+        :param base_url: URL of the API
+        :param max_retries: Retries of a request failing with a transient error
+        :param backoff: Delay before the first retry in seconds, doubled for every further retry
+        :param max_connection_retries: Retries of a request failing to connect or timing out
+        :param connection_backoff: Delay before the first retry of a connection error in seconds
+        :param timeout: Timeout of a single request in seconds
+        :param pool_size: Connections kept alive, should cover the number of concurrent callers
+        :param etag_cache_size: Number of responses kept for conditional requests, 0 disables
+        :param sleep: Function used to wait between retries
+        """
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+        self.session = session
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_connection_retries = max_connection_retries
+        self.connection_backoff = connection_backoff
+        self.timeout = timeout
+        self.etag_cache_size = etag_cache_size
+        self.sleep = sleep
+        self._etags: "OrderedDict[Tuple, Tuple[str, Dict]]" = OrderedDict()
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, params: Dict) -> Dict:
+        """
+        Send a GET request to an endpoint of the API
+
+        :param endpoint: Endpoint name, e.g. "videos"
+        :param params: Query parameters, including the API key
+        :return: Decoded JSON response
+        :raises ValueError: API error with a message, e.g. exhausted quota
+        :raises requests.HTTPError: Other unsuccessful responses
+        :raises YouTubeAPIException: The API could not be reached
+        """
+        url = f"{self.base_url}/{endpoint}"
+        # The API key doesn't change the resource, keep it out of the cache key
+        cache_key = (endpoint, tuple(sorted((k, str(v)) for k, v in params.items() if k != "key")))
+
+        attempt = connection_attempt = 0
+        while True:
+            headers = {}
+            cached = self._cached(cache_key)
+            if cached:
+                headers["If-None-Match"] = cached[0]
+
+            start = time.perf_counter()
+            try:
+                resp = self.session.get(url=url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(endpoint, time.perf_counter() - start, status=None)
+                if connection_attempt >= self.max_connection_retries:
+                    raise YouTubeAPIException(f"YouTube API unreachable: {e}") from e
+                connection_attempt += 1
+                self._wait(endpoint, connection_attempt, reason=type(e).__name__, backoff=self.connection_backoff,
+                           max_retries=self.max_connection_retries)
+                continue
+            except requests.RequestException as e:
+                self._record(endpoint, time.perf_counter() - start, status=None)
+                raise YouTubeAPIException(f"YouTube API request failed: {e}") from e
+
+            elapsed = time.perf_counter() - start
+            self._record(endpoint, elapsed, status=resp.status_code)
+            logger.debug(f"GET {endpoint} -> {resp.status_code} in {elapsed * 1000:.0f} ms")
+
+            if resp.status_code == 304 and cached:
+                return cached[1]
+
+            if self._is_transient(resp) and attempt < self.max_retries:
+                attempt += 1
+                self._wait(endpoint, attempt, reason=str(resp.status_code), retry_after=resp.headers.get("Retry-After"))
+                continue
+
+            if not resp.ok:
+                extract_error_message(resp, url)
+
+            body = resp.json()
+            etag = resp.headers.get("ETag") or body.get("etag")
+            if etag:
+                self._store(cache_key, etag, body)
+            return body
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        :return: Per endpoint counts of requests, retries, errors, not modified responses,
+                 quota units and total latency in seconds
+        """
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+
+    def quota_used(self) -> int:
+        """
+        :return: Quota units spent by this client
+        """
+        with self._lock:
+            return sum(stats["quota"] for stats in self._stats.values())
+
+    def log_stats(self):
+        """
+        Log a summary of the requests sent so far
+        """
+        for endpoint, stats in sorted(self.stats().items()):
+            logger.info(f"YouTube API /{endpoint}: {stats['requests']} request(s), {stats['retries']} retried, "
+                        f"{stats['not_modified']} not modified, {stats['quota']} quota unit(s), "
+                        f"avg {stats['latency'] / max(stats['requests'], 1) * 1000:.0f} ms")
+
+    def close(self):
+        """
+        Close the pooled connections
+        """
+        self.session.close()
+
+    def _is_transient(self, resp) -> bool:
+        if resp.status_code in YOUTUBE_RETRY_STATUSES:
+            return True
+        if resp.status_code == 403:
+            # A per-second rate limit clears after a pause, the exhausted daily quota doesn't
+            try:
+                errors = resp.json().get("error", {}).get("errors", [])
+            except ValueError:
+                return False
+            return any(e.get("reason") in YOUTUBE_RATE_LIMIT_REASONS for e in errors)
+        return False
+
+    def _wait(self, endpoint: str, attempt: int, reason: str, retry_after: Optional[str] = None,
+              backoff: Optional[float] = None, max_retries: Optional[int] = None):
+        backoff = self.backoff if backoff is None else backoff
+        max_retries = self.max_retries if max_retries is None else max_retries
+        delay = backoff * 2 ** (attempt - 1)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+
+        with self._lock:
+            self._stats[endpoint]["retries"] += 1
+        logger.warning(f"YouTube API /{endpoint} failed ({reason}), retry {attempt}/{max_retries} "
+                       f"in {delay:.1f}s")
+        self.sleep(delay)
+
+    def _record(self, endpoint: str, latency: float, status: Optional[int]):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {"requests": 0, "retries": 0, "errors": 0,
+                                                      "not_modified": 0, "quota": 0, "latency": 0.0})
+            stats["requests"] += 1
+            stats["latency"] += latency
+            # Every request that reaches the API is charged, including errors and revalidations
+            if status is not None:
+                stats["quota"] += YOUTUBE_QUOTA_COSTS.get(endpoint, 1)
+            if status == 304:
+                stats["not_modified"] += 1
+            elif status is None or status >= 400:
+                stats["errors"] += 1
+
+    def _cached(self, cache_key: Tuple) -> Optional[Tuple[str, Dict]]:
+        with self._lock:
+            if cache_key in self._etags:
+                self._etags.move_to_end(cache_key)
+                return self._etags[cache_key]
+            return None
+
+    def _store(self, cache_key: Tuple, etag: str, body: Dict):
+        if self.etag_cache_size <= 0:
+            return
+        with self._lock:
+            self._etags[cache_key] = (etag, body)
+            self._etags.move_to_end(cache_key)
+            while len(self._etags) > self.etag_cache_size:
+                self._etags.popitem(last=False)
+
+def extract_error_message(resp, url):
+    """
+    Extract detailed error message from YouTube API
+
+    :param resp: Response from YouTube API
+    :param url: URL request was made to
+    :return:
+    """
+    error_message = resp.json().get("error", {}).get("message")
+    if error_message:
+        logger.error(f"An error occurred while making request to {url}: {error_message}")
+        raise ValueError(f"YouTube API error: {error_message}")
+
+    resp.raise_for_status()
+
+_client: Optional[YouTubeClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> YouTubeClient:
+    """
+    Return the process-wide YouTube client
+
+    :return: YouTubeClient
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = YouTubeClient()
+        return _client
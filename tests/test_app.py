@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.main import transcribe_video_stream
+from app.schemas import ChannelTranscriptionRequest
+from video_to_text.jobs import JobManager
+
+EVENTS = [("video", {"URL": "https://www.youtube.com/watch?v=a"}),
+          ("segment", {"Index": 0, "Text": "Hello"}),
+          ("segment", {"Index": 1, "Text": "world"}),
+          ("done", {"URL": "https://www.youtube.com/watch?v=a", "id": 1})]
+
+class FakeRequest:
+    """
+    Request of a client disconnecting once it has read the given number of events
+    """
+
+    def __init__(self, jobs, disconnect_after=None):
+        self.app = SimpleNamespace(state=SimpleNamespace(jobs=jobs))
+        self.disconnect_after = disconnect_after
+        self.checks = 0
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.disconnect_after is not None and self.checks > self.disconnect_after
+
+@pytest.fixture
+def api_request():
+    jobs = JobManager(run=lambda **kwargs: [], max_jobs=1)
+    yield FakeRequest(jobs)
+    jobs.shutdown()
+
+def fake_stream(video_id, slot=None, **kwargs):
+    with slot:
+        yield from EVENTS
+
+def stream(request, format, events=fake_stream):
+    with patch("app.main.stream_transcription", side_effect=events):
+        response = transcribe_video_stream(video_id="a", request=request, model_size="tiny", stream=False,
+                                           batch_size=0, backend="fake", model_policy="fixed", fast_model="base",
+                                           cpu_budget=None, format=format)
+
+    async def read():
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    return response, asyncio.run(read())
+
+def test_stream_sse_framing(api_request):
+    response, body = stream(api_request, "sse")
+
+    assert response.media_type == "text/event-stream"
+    messages = body.split("\n\n")
+    assert messages[-1] == ""
+    assert [m.splitlines()[0] for m in messages[:-1]] == [f"event: {event}" for event, _ in EVENTS]
+    assert [json.loads(m.splitlines()[1].removeprefix("data: ")) for m in messages[:-1]] == [d for _, d in EVENTS]
+
+def test_stream_ndjson_framing(api_request):
+    response, body = stream(api_request, "ndjson")
+
+    assert response.media_type == "application/x-ndjson"
+    assert body.endswith("\n")
+    assert [json.loads(line) for line in body.splitlines()] == [{"event": e, "data": d} for e, d in EVENTS]
+
+def test_stream_refused_when_jobs_are_busy(api_request):
+    with api_request.app.state.jobs.slot():
+        with pytest.raises(HTTPException) as e:
+            stream(api_request, "sse")
+
+    assert e.value.status_code == 503
+    assert "Retry-After" in e.value.headers
+    # The finished stream released its slot
+    stream(api_request, "sse")
+
+def test_channel_request_rejects_streaming_mp3():
+    with pytest.raises(ValidationError, match="mp3"):
+        ChannelTranscriptionRequest(channel_name="NASA", stream=True, audio_format="mp3")
+
+    assert ChannelTranscriptionRequest(channel_name="NASA", stream=True).stream
+
+def test_stream_disconnect_releases_slot(api_request):
+    api_request.disconnect_after = 1
+    closed = []
+
+    def endless_stream(video_id, slot=None, **kwargs):
+        with slot:
+            try:
+                while True:
+                    yield EVENTS[1]
+            finally:
+                closed.append(True)
+
+    response, body = stream(api_request, "ndjson", events=endless_stream)
+
+    assert len(body.splitlines()) == 2
+    # The events are closed by the thread producing them, once it is idle
+    for _ in range(100):
+        if closed:
+            break
+        time.sleep(0.01)
+    assert closed
+    with api_request.app.state.jobs.slot(blocking=False):
+        pass
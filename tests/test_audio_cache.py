@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from video_to_text.audio_cache import AudioCache
+
+class Clock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        self.time += 1
+        return self.time
+
+@pytest.fixture
+def cache(tmp_path):
+    return AudioCache(directory=tmp_path / "cache", max_bytes=1000, now=Clock())
+
+def write_audio(tmp_path, name, size, fill=b"a"):
+    path = tmp_path / name
+    path.write_bytes(fill * size)
+    return path
+
+def test_fetch_returns_cached_copy(cache, tmp_path):
+    audio = write_audio(tmp_path, "abc.m4a", 100)
+    cache.put("abc", "native", audio)
+    audio.unlink()
+
+    destination = tmp_path / "run"
+    destination.mkdir()
+    path = cache.fetch("abc", "native", destination)
+
+    assert path == str(destination / "abc.m4a")
+    assert open(path, "rb").read() == b"a" * 100
+    assert cache.fetch("abc", "pcm", destination) is None
+    assert cache.fetch("other", "native", destination) is None
+
+def test_identical_audio_stored_once(cache, tmp_path):
+    cache.put("abc", "native", write_audio(tmp_path, "abc.m4a", 100))
+    cache.put("def", "native", write_audio(tmp_path, "def.m4a", 100))
+
+    assert cache.size() == 100
+    assert len(list((cache.directory / "objects").rglob("*.m4a"))) == 1
+
+def test_evicts_least_recently_used(cache, tmp_path):
+    cache.put("a", "native", write_audio(tmp_path, "a.m4a", 400, b"a"))
+    cache.put("b", "native", write_audio(tmp_path, "b.m4a", 400, b"b"))
+    # Using a makes b the least recently used
+    assert cache.fetch("a", "native", tmp_path)
+
+    cache.put("c", "native", write_audio(tmp_path, "c.m4a", 400, b"c"))
+
+    assert cache.size() == 800
+    assert cache.fetch("b", "native", tmp_path) is None
+    assert cache.fetch("a", "native", tmp_path)
+    assert cache.fetch("c", "native", tmp_path)
+
+def test_corrupt_audio_is_dropped(cache, tmp_path):
+    cache.put("abc", "native", write_audio(tmp_path, "abc.m4a", 100))
+    cached = next((cache.directory / "objects").rglob("*.m4a"))
+    os.chmod(cached, 0o644)
+    cached.write_bytes(b"b" * 100)
+
+    assert cache.fetch("abc", "native", tmp_path) is None
+    assert not cached.exists()
+    assert cache.size() == 0
@@ -0,0 +1,131 @@
+import threading
+
+import numpy as np
+import pytest
+
+from unittest.mock import patch
+from faster_whisper.transcribe import Segment
+
+from video_to_text.audio_to_text import FasterWhisperBackend, transcribe_segments, transcribe_stream, transcribe_video
+from video_to_text.exceptions import TranscriptionCancelled
+from video_to_text.model_registry import ModelRegistry
+
+SAMPLE_RATE = 16000
+
+class BlockModel:
+    """
+    Fake model emitting one segment per 10 seconds of audio. The text of a segment is the
+    sample value at its start, which the tests set to the absolute second of the stream.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio, **kwargs):
+        self.calls += 1
+        segments = []
+        for start in range(0, len(audio), 10 * SAMPLE_RATE):
+            end = min(start + 10 * SAMPLE_RATE, len(audio))
+            segments.append(Segment(id=len(segments) + 1, seek=0, start=start / SAMPLE_RATE, end=end / SAMPLE_RATE,
+                                    text=str(int(audio[start])), tokens=[], avg_logprob=-0.1,
+                                    compression_ratio=1.0, no_speech_prob=0.0, words=None, temperature=0.0))
+        return iter(segments), None
+
+def make_chunks(seconds, chunk_seconds):
+    audio = np.repeat(np.arange(seconds, dtype=np.float32), SAMPLE_RATE)
+    return [audio[i:i + chunk_seconds * SAMPLE_RATE] for i in range(0, len(audio), chunk_seconds * SAMPLE_RATE)]
+
+def test_transcribe_stream_offsets_segments_without_gaps_or_duplicates():
+    model = BlockModel()
+    segments = list(transcribe_stream(model=model, chunks=make_chunks(95, 5), window_seconds=30))
+
+    assert [s.text for s in segments] == [str(i) for i in range(0, 95, 10)]
+    assert [s.start for s in segments] == [float(i) for i in range(0, 95, 10)]
+    assert segments[-1].end == 95.0
+    assert [s.id for s in segments] == list(range(1, 11))
+    assert model.calls > 1
+
+def test_transcribe_stream_yields_before_stream_ends():
+    consumed = []
+
+    def chunks():
+        for chunk in make_chunks(120, 10):
+            consumed.append(chunk)
+            yield chunk
+
+    first = next(transcribe_stream(model=BlockModel(), chunks=chunks(), window_seconds=30))
+
+    assert first.text == "0"
+    assert len(consumed) < 12
+
+def test_transcribe_stream_empty():
+    assert list(transcribe_stream(model=BlockModel(), chunks=[])) == []
+
+@pytest.mark.parametrize("seconds", [5, 30])
+def test_transcribe_stream_short_audio(seconds):
+    segments = list(transcribe_stream(model=BlockModel(), chunks=make_chunks(seconds, 10), window_seconds=60))
+
+    assert segments[0].start == 0.0
+    assert segments[-1].end == float(seconds)
+
+def test_transcribe_segments_batched_wraps_cached_model():
+    model = BlockModel()
+    registry = ModelRegistry(loader=lambda *key: model)
+    audio = np.zeros(20 * SAMPLE_RATE, dtype=np.float32)
+
+    with patch("faster_whisper.BatchedInferencePipeline") as pipeline:
+        pipeline.return_value.transcribe.return_value = (iter([]), None)
+        list(transcribe_segments(audio=audio, model_size="tiny", registry=registry, batch_size=8))
+
+    pipeline.assert_called_once_with(model=model)
+    assert pipeline.return_value.transcribe.call_args.kwargs["batch_size"] == 8
+    assert model.calls == 0
+
+def test_transcribe_segments_chunked_ignores_batch_size(caplog):
+    registry = ModelRegistry(loader=lambda *key: BlockModel())
+    audio = np.zeros(1200 * SAMPLE_RATE, dtype=np.float32)
+
+    with patch("video_to_text.audio_to_text.get_parallel_transcriber") as parallel, \
+         patch("faster_whisper.BatchedInferencePipeline") as pipeline:
+        parallel.return_value.transcribe.return_value = iter([])
+        list(transcribe_segments(audio=audio, model_size="tiny", registry=registry, chunk_workers=2, batch_size=8))
+
+    parallel.assert_called_once_with(model_size="tiny", workers=2, compute_type=None)
+    pipeline.assert_not_called()
+    assert "Ignoring batch_size 8" in caplog.text
+
+def test_transcribe_segments_chunked_forwards_decoding_options():
+    backend = FasterWhisperBackend(registry=ModelRegistry(loader=lambda *key: BlockModel()))
+    audio = np.zeros(1200 * SAMPLE_RATE, dtype=np.float32)
+
+    with patch("video_to_text.audio_to_text.get_parallel_transcriber") as parallel:
+        parallel.return_value.transcribe.return_value = iter([])
+        list(backend.transcribe(audio, model_size="base", chunk_workers=2, beam_size=1, compute_type="int8_float16"))
+
+    parallel.assert_called_once_with(model_size="base", workers=2, compute_type="int8_float16")
+    assert parallel.return_value.transcribe.call_args.kwargs == {"beam_size": 1}
+
+def test_transcribe_segments_sequential_uses_cached_model():
+    model = BlockModel()
+    registry = ModelRegistry(loader=lambda *key: model)
+    audio = np.zeros(20 * SAMPLE_RATE, dtype=np.float32)
+
+    segments = list(transcribe_segments(audio=audio, model_size="tiny", registry=registry))
+    segments += list(transcribe_segments(audio=audio, model_size="tiny", registry=registry))
+
+    assert len(segments) == 4
+    assert model.calls == 2
+    assert len(registry.loaded()) == 1
+
+def test_transcribe_video_stops_when_cancelled(tmp_path):
+    registry = ModelRegistry(loader=lambda *key: BlockModel())
+    cancel = threading.Event()
+    cancel.set()
+
+    with pytest.raises(TranscriptionCancelled):
+        transcribe_video(audio_path=make_chunks(60, 10), video={"URL": "https://www.youtube.com/watch?v=a"},
+                         output_dir=tmp_path, model_size="tiny", registry=registry, cancel=cancel)
+
+    # The model is released by the abandoned generator, so it can be evicted
+    registry.evict_idle()
+    assert registry.loaded() == []
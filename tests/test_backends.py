@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from video_to_text.audio_to_text import FasterWhisperBackend, transcribe_segments, transcribe_video
+from video_to_text.backends import Capabilities, FakeBackend, get_backend
+from video_to_text.constants import WHISPER_SAMPLE_RATE
+from video_to_text.model_registry import ModelRegistry
+
+def make_audio(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * WHISPER_SAMPLE_RATE), dtype=np.float32)
+
+class ArrayOnlyBackend:
+    name = "array-only"
+    capabilities = Capabilities()
+
+    def __init__(self):
+        self.calls = []
+
+    def load(self, model_size="tiny"):
+        pass
+
+    def transcribe(self, audio, model_size="tiny", chunk_workers=0, batch_size=0):
+        self.calls.append((audio, chunk_workers, batch_size))
+        return iter([])
+
+def test_get_backend_by_name():
+    registry = ModelRegistry(loader=lambda *key: None)
+
+    assert isinstance(get_backend("fake"), FakeBackend)
+    backend = get_backend("faster-whisper", registry=registry)
+    assert isinstance(backend, FasterWhisperBackend)
+    assert backend.registry is registry
+
+def test_get_backend_returns_instances_as_is():
+    backend = FakeBackend()
+    assert get_backend(backend) is backend
+
+def test_get_backend_unknown():
+    with pytest.raises(ValueError, match="Unknown transcriber backend"):
+        get_backend("whisper.cpp")
+
+def test_fake_backend_is_deterministic():
+    backend = FakeBackend(segment_seconds=5)
+
+    first = list(backend.transcribe(make_audio(12)))
+    second = list(backend.transcribe(make_audio(12)))
+
+    assert first == second
+    assert [(s.start, s.end) for s in first] == [(0.0, 5.0), (5.0, 10.0), (10.0, 12.0)]
+    assert [s.text for s in first] == [" Fake segment 1.", " Fake segment 2.", " Fake segment 3."]
+
+def test_fake_backend_streams_chunks():
+    chunks = [make_audio(3) for _ in range(4)]
+
+    segments = list(FakeBackend(segment_seconds=5).transcribe(iter(chunks)))
+
+    assert [(s.start, s.end) for s in segments] == [(0.0, 5.0), (5.0, 10.0), (10.0, 12.0)]
+
+def test_fake_backend_simulates_realtime_factor():
+    slept = []
+
+    list(FakeBackend(segment_seconds=5, realtime_factor=10, sleep=slept.append).transcribe(make_audio(12)))
+
+    assert slept == pytest.approx([0.5, 0.5, 0.2])
+
+def test_fake_backend_decodes_files(tmp_path):
+    import wave
+
+    path = tmp_path/"audio.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(WHISPER_SAMPLE_RATE)
+        f.writeframes(np.zeros(7 * WHISPER_SAMPLE_RATE, dtype=np.int16).tobytes())
+
+    segments = list(FakeBackend(segment_seconds=5).transcribe(str(path)))
+
+    assert [(s.start, round(s.end, 2)) for s in segments] == [(0.0, 5.0), (5.0, 7.0)]
+
+def test_transcribe_segments_ignores_unsupported_options(caplog):
+    backend = ArrayOnlyBackend()
+
+    list(transcribe_segments(audio=make_audio(1), backend=backend, chunk_workers=4, batch_size=8))
+
+    assert backend.calls[0][1:] == (0, 0)
+    assert "ignoring chunk_workers" in caplog.text
+    assert "ignoring batch_size" in caplog.text
+
+def test_transcribe_segments_joins_chunks_without_streaming():
+    backend = ArrayOnlyBackend()
+
+    list(transcribe_segments(audio=iter([make_audio(1), make_audio(2)]), backend=backend))
+
+    audio = backend.calls[0][0]
+    assert isinstance(audio, np.ndarray)
+    assert len(audio) == 3 * WHISPER_SAMPLE_RATE
+
+def test_transcribe_video_with_fake_backend(tmp_path):
+    text, segments = transcribe_video(audio_path=[make_audio(8)], video={"URL": "https://www.youtube.com/watch?v=a"},
+                                      output_dir=tmp_path, backend="fake")
+
+    assert text == " Fake segment 1.  Fake segment 2."
+    assert len(segments) == 2
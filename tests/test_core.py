@@ -0,0 +1,251 @@
+import sqlite3
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from faster_whisper.transcribe import Segment
+
+from video_to_text.backends import Capabilities
+from video_to_text.constants import DB_NAME, RUNS_TABLE_NAME
+from video_to_text.core import run_batch, stream_transcription
+from video_to_text.database import get_channel_sync, get_segments, get_transcribed_urls
+from video_to_text.exceptions import JobsBusy, YouTubeAPIException
+from video_to_text.jobs import JobManager
+
+def make_video(video_id):
+    return {"URL": f"https://www.youtube.com/watch?v={video_id}", "Title": video_id,
+            "PublishedAt": "2025-01-01T00:00:00Z"}
+
+def make_segment(start, end, text):
+    return Segment(id=1, seek=0, start=start, end=end, text=text, tokens=[], avg_logprob=-0.1,
+                   compression_ratio=1.0, no_speech_prob=0.0, words=None, temperature=0.0)
+
+class ListBackend:
+    """
+    Emits the given segments whatever the audio
+    """
+    name = "list"
+    capabilities = Capabilities(streaming=True, needs_model=False)
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    def load(self, model_size="tiny", compute_type=None):
+        pass
+
+    def transcribe(self, audio, model_size="tiny", chunk_workers=0, batch_size=0, beam_size=5, compute_type=None):
+        yield from self.segments
+
+class FakeCrawler:
+    """
+    Lists the videos of channels[channel_id] like ChannelCrawler, raising the error instead if it is one
+    """
+    channels = {}
+
+    def __init__(self, channel_id, **filters):
+        self.videos = self.channels[channel_id]
+        self.newest_upload = None
+        self.truncated = False
+
+    def __iter__(self):
+        if isinstance(self.videos, Exception):
+            raise self.videos
+        if self.videos:
+            self.newest_upload = {"VideoId": self.videos[0]["URL"].split("=")[-1],
+                                  "PublishedAt": self.videos[0]["PublishedAt"]}
+        yield from self.videos
+
+def fake_transcribe(audio_path, video, **kwargs):
+    return f"text of {video['Title']}", [make_segment(0.0, 60.0, f"text of {video['Title']}")]
+
+@pytest.fixture
+def youtube():
+    with patch("video_to_text.core.get_youtube_api_key", return_value="DUMMY"), \
+         patch("video_to_text.core.get_channel_id", side_effect=lambda name, *args, **kwargs: name), \
+         patch("video_to_text.core.ChannelCrawler", FakeCrawler):
+        yield FakeCrawler.channels
+    FakeCrawler.channels.clear()
+
+@pytest.fixture
+def transcriber(tmp_path):
+    def download(youtube_url, tempdir, **kwargs):
+        path = tmp_path / f"{youtube_url.split('=')[-1]}.m4a"
+        path.write_bytes(b"audio")
+        return str(path)
+
+    with patch("video_to_text.core.download_audio", side_effect=download) as download_audio, \
+         patch("video_to_text.core.transcribe_video", side_effect=fake_transcribe) as transcribe_video:
+        yield download_audio, transcribe_video
+
+def test_incremental_sync_recorded(tmp_path, youtube, transcriber):
+    youtube["NASA"] = [make_video("b"), make_video("a")]
+
+    run_batch(sources=[{"channel_name": "NASA"}], output_dir=tmp_path/"out", save_as_text=False,
+              backend=ListBackend([]), incremental=True)
+
+    assert get_channel_sync(tmp_path/"out"/DB_NAME, "NASA")["VideoId"] == "b"
+
+@pytest.mark.parametrize("filters", [{"min_duration": 120}, {"max_duration": 600}, {"start_date": "2025-01-01"}])
+def test_incremental_sync_not_recorded_with_filters(tmp_path, youtube, transcriber, filters):
+    youtube["NASA"] = [make_video("b"), make_video("a")]
+
+    _, summary = run_batch(sources=[{"channel_name": "NASA", **filters}], output_dir=tmp_path/"out",
+                           save_as_text=False, backend=ListBackend([]), incremental=True)
+
+    assert summary[0]["Transcribed"] == 2
+    # Uploads the filters left out must be listed by the next run
+    assert get_channel_sync(tmp_path/"out"/DB_NAME, "NASA") is None
+
+def test_run_batch_dedups_and_isolates_errors(tmp_path, youtube, transcriber):
+    download_audio, transcribe_video = transcriber
+    youtube["NASA"] = [make_video("a"), make_video("shared"), make_video("broken")]
+    youtube["Gone"] = YouTubeAPIException("Channel 'Gone' not found")
+    youtube["SpaceX"] = [make_video("shared"), make_video("b")]
+
+    def transcribe(audio_path, video, **kwargs):
+        if video["Title"] == "broken":
+            raise RuntimeError("decoding failed")
+        return fake_transcribe(audio_path, video)
+    transcribe_video.side_effect = transcribe
+
+    video_data, summary = run_batch(sources=[{"channel_name": "NASA"}, {"channel_name": "Gone"},
+                                             {"channel_name": "SpaceX"}],
+                                    output_dir=tmp_path/"out", save_as_text=False, backend=ListBackend([]))
+
+    # The shared video is transcribed once, for the source listing it first
+    assert sorted(call.kwargs["youtube_url"] for call in download_audio.call_args_list) == \
+        sorted(make_video(video_id)["URL"] for video_id in ("a", "shared", "broken", "b"))
+    assert sorted(video["Title"] for video in video_data) == ["a", "b", "shared"]
+    assert get_transcribed_urls(tmp_path/"out"/DB_NAME) == {make_video(video_id)["URL"]
+                                                            for video_id in ("a", "shared", "b")}
+
+    assert [(s["Source"], s["Listed"], s["Transcribed"], s["Failed"]) for s in summary] == [
+        ("channel NASA", 3, 2, 1),
+        ("channel Gone", 0, 0, 0),
+        ("channel SpaceX", 1, 1, 0),
+    ]
+    assert summary[1]["Error"] == "Channel 'Gone' not found"
+    assert summary[0]["Error"] is None and summary[2]["Error"] is None
+
+def test_run_batch_without_isolate_errors_raises(tmp_path, youtube, transcriber):
+    youtube["Gone"] = YouTubeAPIException("Channel 'Gone' not found")
+
+    with pytest.raises(YouTubeAPIException):
+        run_batch(sources=[{"channel_name": "Gone"}], output_dir=tmp_path/"out", save_as_text=False,
+                  backend=ListBackend([]), isolate_errors=False)
+
+def test_fake_transcripts_are_marked_and_transcribed_again(tmp_path, youtube, transcriber):
+    youtube["NASA"] = [make_video("a")]
+    _, transcribe_video = transcriber
+
+    run_batch(sources=[{"channel_name": "NASA"}], output_dir=tmp_path/"out", save_as_text=False, backend="fake",
+              incremental=True)
+    with sqlite3.connect(tmp_path/"out"/DB_NAME) as conn:
+        assert conn.execute("SELECT backend FROM transcripts").fetchall() == [("fake",)]
+    assert get_channel_sync(tmp_path/"out"/DB_NAME, "NASA") is None
+
+    # Fake transcripts don't count as transcribed for the next incremental run
+    run_batch(sources=[{"channel_name": "NASA"}], output_dir=tmp_path/"out", save_as_text=False, backend="fake",
+              incremental=True)
+    assert transcribe_video.call_count == 2
+
+def test_reuse_transcripts_decodes_audio_once(tmp_path, youtube, transcriber):
+    _, transcribe_video = transcriber
+    youtube["NASA"] = [make_video("a")]
+    samples = np.zeros(16000, dtype=np.float32)
+
+    with patch("video_to_text.core.decode_and_fingerprint",
+               return_value=(samples, np.zeros(0, dtype=np.uint32))) as decode_and_fingerprint:
+        run_batch(sources=[{"channel_name": "NASA"}], output_dir=tmp_path/"out", save_as_text=False,
+                  backend=ListBackend([]), reuse_transcripts=True)
+
+    decode_and_fingerprint.assert_called_once_with(str(tmp_path/"a.m4a"))
+    # The transcriber gets the samples decoded for the fingerprint, not the file
+    assert transcribe_video.call_args.kwargs["audio_path"] is samples
+
+class FakeStream:
+    """
+    AudioStream of a download that transferred 1000 bytes in 2 seconds
+    """
+    started = []
+
+    def __init__(self, youtube_url):
+        self.youtube_url = youtube_url
+
+    def start(self):
+        self.started.append(self.youtube_url)
+        return self
+
+    def stats(self):
+        return {"DownloadBytes": 1000, "DownloadSeconds": 2.0, "AudioSeconds": 60.0}
+
+    def close(self):
+        pass
+
+def test_streamed_audio_starts_in_transcription_and_records_download(tmp_path, youtube, transcriber):
+    download_audio, transcribe_video = transcriber
+    youtube["NASA"] = [make_video("a"), make_video("b")]
+
+    with patch("video_to_text.core.AudioStream", FakeStream):
+        run_batch(sources=[{"channel_name": "NASA"}], output_dir=tmp_path/"out", save_as_text=False,
+                  backend=ListBackend([]), stream=True, prefetch=4)
+
+    # Prefetching doesn't start a download, the transcriber does once it reads the stream
+    assert FakeStream.started == []
+    assert all(isinstance(call.kwargs["audio_path"], FakeStream) for call in transcribe_video.call_args_list)
+    download_audio.assert_not_called()
+    with sqlite3.connect(tmp_path/"out"/DB_NAME) as conn:
+        rows = conn.execute(f"SELECT seconds, bytes FROM {RUNS_TABLE_NAME} WHERE stage = 'download'").fetchall()
+    assert rows == [(2.0, 1000), (2.0, 1000)]
+
+@pytest.fixture
+def single_video(tmp_path):
+    def download(youtube_url, tempdir, **kwargs):
+        return str(tmp_path / "a.m4a")
+
+    with patch("video_to_text.core.get_youtube_api_key", return_value="DUMMY"), \
+         patch("video_to_text.core.get_single_video", return_value=[make_video("a")]), \
+         patch("video_to_text.core.download_audio", side_effect=download):
+        yield make_video("a")
+
+def test_stream_transcription_events_in_order(tmp_path, single_video):
+    backend = ListBackend([make_segment(0.0, 5.0, " Hello"), make_segment(5.0, 9.0, " world")])
+
+    events = list(stream_transcription(video_id="a", output_dir=tmp_path, backend=backend))
+
+    assert [event for event, _ in events] == ["video", "segment", "segment", "done"]
+    assert events[0][1]["URL"] == single_video["URL"]
+    assert [(data["Index"], data["Text"]) for _, data in events[1:3]] == [(0, "Hello"), (1, "world")]
+    assert events[-1][1]["id"]
+
+def test_stream_transcription_saves_after_last_segment(tmp_path, single_video):
+    backend = ListBackend([make_segment(0.0, 5.0, " Hello"), make_segment(5.0, 9.0, " world")])
+    db_file = tmp_path/DB_NAME
+
+    events = stream_transcription(video_id="a", output_dir=tmp_path, backend=backend)
+    for event, _ in events:
+        if event == "segment":
+            assert get_transcribed_urls(db_file) == set()
+        if event == "done":
+            break
+
+    assert get_transcribed_urls(db_file) == {single_video["URL"]}
+    assert [s["Text"] for s in get_segments(db_file, single_video["URL"])] == ["Hello", "world"]
+
+def test_stream_transcription_holds_job_slot(tmp_path, single_video):
+    jobs = JobManager(run=lambda **kwargs: [], max_jobs=1)
+    backend = ListBackend([make_segment(0.0, 5.0, " Hello")])
+
+    events = stream_transcription(video_id="a", output_dir=tmp_path, backend=backend, slot=jobs.slot(blocking=False))
+    assert next(events)[0] == "video"
+    with pytest.raises(JobsBusy):
+        next(stream_transcription(video_id="a", output_dir=tmp_path, backend=backend,
+                                  slot=jobs.slot(blocking=False)))
+
+    # A client disconnecting closes the stream and frees the slot
+    events.close()
+    with jobs.slot(blocking=False):
+        pass
+    jobs.shutdown()
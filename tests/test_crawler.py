@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+
+from video_to_text.crawler import ChannelCrawler
+from video_to_text.exceptions import YouTubeAPIException
+
+class FakeClient:
+    """
+    YouTube client stand-in serving an uploads playlist of `pages` pages with 3 videos each.
+    Video i is published on day 28 - i of January and lasts i minutes.
+    """
+
+    def __init__(self, pages=3, durations_gate=None):
+        self.pages = pages
+        self.durations_gate = durations_gate
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get(self, endpoint, params):
+        with self.lock:
+            self.requests.append((endpoint, params.get("pageToken") or params.get("id")))
+
+        if endpoint == "channels":
+            return {"items": [{"contentDetails": {"relatedPlaylists": {"uploads": "UU123"}}}]}
+
+        if endpoint == "playlistItems":
+            page = int(params.get("pageToken", 0))
+            items = [{"contentDetails": {"videoId": f"video{i}"},
+                      "snippet": {"title": f"Video {i}", "publishedAt": f"2025-01-{28 - i:02d}T00:00:00Z"}}
+                     for i in range(page * 3, page * 3 + 3)]
+            res = {"items": items}
+            if page + 1 < self.pages:
+                res["nextPageToken"] = str(page + 1)
+            return res
+
+        if endpoint == "videos":
+            if self.durations_gate:
+                self.durations_gate(params)
+            return {"items": [{"id": vid, "contentDetails": {"duration": f"PT{int(vid[5:])}M"}}
+                              for vid in params["id"].split(",")]}
+
+        raise AssertionError(endpoint)
+
+    def playlist_requests(self):
+        return [r for r in self.requests if r[0] == "playlistItems"]
+
+def test_crawler_lists_all_pages_in_order():
+    crawler = ChannelCrawler(channel_id="UC123", api_key="fake_key", client=FakeClient(pages=3))
+
+    videos = list(crawler)
+
+    assert [v["Title"] for v in videos] == [f"Video {i}" for i in range(9)]
+    assert crawler.newest_upload == {"VideoId": "video0", "PublishedAt": "2025-01-28T00:00:00Z"}
+    assert not crawler.truncated
+
+def test_crawler_applies_filters_like_list_channel_videos():
+    client = FakeClient(pages=3)
+    crawler = ChannelCrawler(channel_id="UC123", api_key="fake_key", client=client,
+                             min_duration=120, exclude_urls={"https://www.youtube.com/watch?v=video4"},
+                             until_video_id="video7")
+
+    assert [v["Title"] for v in crawler] == ["Video 2", "Video 3", "Video 5", "Video 6"]
+    assert len(client.playlist_requests()) == 3
+
+def test_crawler_fetches_next_page_while_resolving_durations():
+    next_page_requested = threading.Event()
+    overlapped = []
+
+    def durations_gate(params):
+        if params["id"].startswith("video0"):
+            # The second page must be requested while durations of the first page are pending
+            overlapped.append(next_page_requested.wait(timeout=2))
+
+    client = FakeClient(pages=2, durations_gate=durations_gate)
+    original_get = client.get
+
+    def get(endpoint, params):
+        if endpoint == "playlistItems" and params.get("pageToken") == "1":
+            next_page_requested.set()
+        return original_get(endpoint, params)
+
+    client.get = get
+    videos = list(ChannelCrawler(channel_id="UC123", api_key="fake_key", client=client, min_duration=1))
+
+    assert overlapped == [True]
+    # Video 0 lasts 0 minutes
+    assert [v["Title"] for v in videos] == [f"Video {i}" for i in range(1, 6)]
+
+def test_crawler_yields_before_listing_completes():
+    client = FakeClient(pages=20)
+
+    async def first_video():
+        crawler = ChannelCrawler(channel_id="UC123", api_key="fake_key", client=client)
+        async for video in crawler:
+            return video
+
+    assert asyncio.run(first_video())["Title"] == "Video 0"
+    assert len(client.playlist_requests()) < 20
+
+def test_crawler_stops_at_max_videos():
+    client = FakeClient(pages=10)
+    crawler = ChannelCrawler(channel_id="UC123", api_key="fake_key", client=client, max_num_of_videos=4)
+
+    assert [v["Title"] for v in crawler] == [f"Video {i}" for i in range(4)]
+    assert crawler.truncated
+    assert len(client.playlist_requests()) < 10
+
+def test_crawler_raises_api_errors():
+    client = FakeClient()
+    client.get = lambda endpoint, params: {"items": []}
+
+    with pytest.raises(YouTubeAPIException, match="Could not fetch channel details"):
+        list(ChannelCrawler(channel_id="UC123", api_key="fake_key", client=client))
@@ -0,0 +1,157 @@
+import math
+import sqlite3
+
+import pytest
+
+from faster_whisper.transcribe import Segment
+
+from video_to_text.database import (batched, get_channel_sync, get_segments, get_transcribed_urls, init_db,
+                                    save_to_db, search_transcripts, set_channel_sync, to_fts_query)
+
+@pytest.fixture
+def db_file(tmp_path):
+    db_file = tmp_path / "transcripts.db"
+    init_db(db_file=db_file)
+    return db_file
+
+def test_get_transcribed_urls(db_file):
+    save_to_db("https://www.youtube.com/watch?v=a", "A", "2025-01-01T00:00:00Z", "text a", db_file)
+    save_to_db("https://www.youtube.com/watch?v=b", "B", "2025-01-02T00:00:00Z", "text b", db_file)
+
+    assert get_transcribed_urls(db_file) == {"https://www.youtube.com/watch?v=a",
+                                             "https://www.youtube.com/watch?v=b"}
+    assert get_transcribed_urls(db_file, ["https://www.youtube.com/watch?v=b",
+                                          "https://www.youtube.com/watch?v=c"]) == {"https://www.youtube.com/watch?v=b"}
+
+def test_get_transcribed_urls_ignores_fake_transcripts(db_file):
+    save_to_db("https://www.youtube.com/watch?v=a", "A", "2025-01-01T00:00:00Z", "text a", db_file,
+               backend="faster-whisper")
+    save_to_db("https://www.youtube.com/watch?v=b", "B", "2025-01-02T00:00:00Z", "Fake segment 1.", db_file,
+               backend="fake")
+
+    assert get_transcribed_urls(db_file) == {"https://www.youtube.com/watch?v=a"}
+    assert get_transcribed_urls(db_file, ["https://www.youtube.com/watch?v=b"]) == set()
+
+def test_channel_sync_round_trip(db_file):
+    assert get_channel_sync(db_file, "channel123") is None
+
+    set_channel_sync(db_file, "channel123", "video1", "2025-01-01T00:00:00Z")
+    set_channel_sync(db_file, "channel123", "video2", "2025-01-02T00:00:00Z")
+
+    sync = get_channel_sync(db_file, "channel123")
+    assert sync["VideoId"] == "video2"
+    assert sync["PublishedAt"] == "2025-01-02T00:00:00Z"
+    assert sync["SyncedAt"]
+
+def make_segment(start, end, text, avg_logprob=-0.2):
+    return Segment(id=0, seek=0, start=start, end=end, text=text, tokens=[], avg_logprob=avg_logprob,
+                   compression_ratio=1.0, no_speech_prob=0.01, words=None, temperature=0.0)
+
+def test_save_to_db_with_segments(db_file):
+    segments = [make_segment(0.0, 4.0, " Hello"), make_segment(4.0, 9.5, " world"), make_segment(9.5, 12.0, " again")]
+    save_to_db("https://www.youtube.com/watch?v=a", "A", "2025-01-01T00:00:00Z", "Hello world again", db_file,
+               segments=segments)
+
+    stored = get_segments(db_file, "https://www.youtube.com/watch?v=a")
+
+    assert [s["Text"] for s in stored] == ["Hello", "world", "again"]
+    assert [s["Index"] for s in stored] == [0, 1, 2]
+    assert stored[1]["Start"] == 4.0 and stored[1]["End"] == 9.5
+    assert stored[0]["Confidence"] == pytest.approx(math.exp(-0.2))
+    assert stored[0]["NoSpeechProb"] == 0.01
+
+def test_get_segments_time_range(db_file):
+    segments = [make_segment(i * 10.0, i * 10.0 + 10.0, f"segment {i}") for i in range(10)]
+    save_to_db("https://www.youtube.com/watch?v=a", "A", "2025-01-01T00:00:00Z", "text", db_file, segments=segments)
+
+    stored = get_segments(db_file, "https://www.youtube.com/watch?v=a", start=35.0, end=60.0)
+
+    assert [s["Text"] for s in stored] == ["segment 3", "segment 4", "segment 5"]
+
+def test_save_to_db_replaces_segments(db_file):
+    url = "https://www.youtube.com/watch?v=a"
+    save_to_db(url, "A", "2025-01-01T00:00:00Z", "old", db_file, segments=[make_segment(0, 1, "old")] * 3)
+    save_to_db(url, "A", "2025-01-01T00:00:00Z", "new", db_file, segments=[make_segment(0, 1, "new")])
+
+    with sqlite3.connect(db_file) as conn:
+        count = conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+    assert count == 1
+    assert [s["Text"] for s in get_segments(db_file, url)] == ["new"]
+
+def test_segments_indexed_by_video_and_start(db_file):
+    with sqlite3.connect(db_file) as conn:
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM segments WHERE video_id = 1 AND start_time > 10").fetchall()
+
+    assert "idx_segments_video_start" in str(plan)
+
+def test_search_transcripts_ranks_and_snippets(db_file):
+    save_to_db("https://www.youtube.com/watch?v=a", "Cooking pasta", "2025-01-01T00:00:00Z",
+               "today we boil water and cook pasta with tomato sauce", db_file)
+    save_to_db("https://www.youtube.com/watch?v=b", "Rocket launch", "2025-01-02T00:00:00Z",
+               "the rocket launch was delayed because of weather", db_file)
+
+    results = search_transcripts(db_file, "tomato sauce")
+
+    assert [r["URL"] for r in results] == ["https://www.youtube.com/watch?v=a"]
+    assert "[tomato]" in results[0]["Snippet"]
+    assert results[0]["Segments"] == []
+
+def test_search_transcripts_returns_segment_timestamps(db_file):
+    segments = [make_segment(0.0, 5.0, " Welcome back"), make_segment(5.0, 12.0, " Today we launch a rocket"),
+                make_segment(12.0, 20.0, " Thanks for watching")]
+    save_to_db("https://www.youtube.com/watch?v=a", "Launch day", "2025-01-01T00:00:00Z",
+               "Welcome back Today we launch a rocket Thanks for watching", db_file, segments=segments)
+
+    results = search_transcripts(db_file, "launching rockets")
+
+    assert len(results) == 1
+    assert results[0]["Segments"] == [{"Start": 5.0, "End": 12.0, "Text": "Today we launch a rocket"}]
+
+def test_search_index_follows_replaced_transcripts(db_file):
+    url = "https://www.youtube.com/watch?v=a"
+    save_to_db(url, "Title", "2025-01-01T00:00:00Z", "first version", db_file, segments=[make_segment(0, 1, "first")])
+    save_to_db(url, "Title", "2025-01-01T00:00:00Z", "second version", db_file, segments=[make_segment(0, 1, "second")])
+
+    assert search_transcripts(db_file, "first") == []
+    assert [r["URL"] for r in search_transcripts(db_file, "second")] == [url]
+
+def test_save_to_db_records_model_and_source(db_file):
+    save_to_db("https://www.youtube.com/watch?v=short", "Short", "2025-01-01T00:00:00Z", "text", db_file,
+               model="medium", reused_from="https://www.youtube.com/watch?v=stream", reused_offset=12.5)
+
+    with sqlite3.connect(db_file) as conn:
+        row = conn.execute("SELECT model, reused_from, reused_offset FROM transcripts").fetchone()
+
+    assert row == ("medium", "https://www.youtube.com/watch?v=stream", 12.5)
+
+def test_search_index_built_for_existing_db(tmp_path):
+    db_file = tmp_path / "transcripts.db"
+    with sqlite3.connect(db_file) as conn:
+        conn.execute("CREATE TABLE transcripts (id INTEGER PRIMARY KEY AUTOINCREMENT, video_url TEXT UNIQUE, "
+                     "title TEXT, published_at TEXT, transcript TEXT)")
+        conn.execute("INSERT INTO transcripts (video_url, title, published_at, transcript) "
+                     "VALUES ('https://www.youtube.com/watch?v=a', 'Old', '2024-01-01', 'transcribed before indexing')")
+
+    init_db(db_file)
+
+    assert len(search_transcripts(db_file, "indexing")) == 1
+    # Columns added later are added to the existing table
+    save_to_db("https://www.youtube.com/watch?v=b", "New", "2025-01-01", "text", db_file, model="tiny")
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("rocket launch", '"rocket" "launch"'),
+        ('"rocket launch" delay', '"rocket launch" "delay"'),
+        ("don't OR -x", "\"don't\" \"OR\" \"-x\""),
+        ("   ", ""),
+    ],
+)
+def test_to_fts_query(query, expected):
+    assert to_fts_query(query) == expected
+
+def test_batched():
+    assert [len(batch) for batch in batched(range(1201))] == [500, 500, 201]
+    assert list(batched(iter("abc"), size=2)) == [["a", "b"], ["c"]]
+    assert list(batched([])) == []
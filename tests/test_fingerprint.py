@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from faster_whisper.transcribe import Segment
+
+from video_to_text.constants import WHISPER_SAMPLE_RATE
+from video_to_text.database import get_segments, init_db, save_to_db
+from video_to_text.fingerprint import (bit_error_rate, compute_fingerprint, find_match, reuse_transcript,
+                                       save_fingerprint)
+
+@pytest.fixture
+def db_file(tmp_path):
+    db_file = tmp_path / "transcripts.db"
+    init_db(db_file)
+    return db_file
+
+def make_audio(seconds, seed):
+    """
+    Sequence of random chords changing every 200 ms, a stand-in for speech or music
+    """
+    rng = np.random.default_rng(seed)
+    step = int(0.2 * WHISPER_SAMPLE_RATE)
+    t = np.arange(step) / WHISPER_SAMPLE_RATE
+    chords = []
+    for _ in range(int(seconds / 0.2)):
+        freqs, amps = rng.uniform(200, 2500, 3), rng.uniform(0.1, 1, 3)
+        chords.append(sum(a * np.sin(2 * np.pi * f * t) for a, f in zip(amps, freqs)))
+    return np.concatenate(chords).astype(np.float32)
+
+def test_fingerprint_survives_noise_and_volume():
+    audio = make_audio(60, seed=1)
+    noisy = 0.5 * audio + 0.05 * np.random.default_rng(0).standard_normal(len(audio)).astype(np.float32)
+
+    fingerprint = compute_fingerprint(audio)
+
+    assert len(fingerprint) == pytest.approx(600, abs=5)
+    assert bit_error_rate(fingerprint, compute_fingerprint(noisy)) < 0.25
+    assert bit_error_rate(fingerprint, compute_fingerprint(make_audio(60, seed=2))) > 0.45
+
+def test_find_match_of_contained_span(db_file):
+    stream = make_audio(300, seed=1)
+    save_fingerprint(db_file, "https://www.youtube.com/watch?v=stream", compute_fingerprint(stream))
+    save_fingerprint(db_file, "https://www.youtube.com/watch?v=other", compute_fingerprint(make_audio(300, seed=2)))
+
+    start = int(123.45 * WHISPER_SAMPLE_RATE)
+    short = 0.7 * stream[start:start + 45 * WHISPER_SAMPLE_RATE]
+    match = find_match(db_file, compute_fingerprint(short))
+
+    assert match["URL"] == "https://www.youtube.com/watch?v=stream"
+    assert match["Offset"] == pytest.approx(123.45, abs=0.1)
+    assert match["BitErrorRate"] < 0.25
+
+def test_find_match_ignores_unrelated_and_excluded_audio(db_file):
+    audio = make_audio(60, seed=1)
+    save_fingerprint(db_file, "https://www.youtube.com/watch?v=a", compute_fingerprint(audio))
+
+    assert find_match(db_file, compute_fingerprint(make_audio(60, seed=3))) is None
+    assert find_match(db_file, compute_fingerprint(audio), exclude_url="https://www.youtube.com/watch?v=a") is None
+
+def test_find_match_requires_same_or_larger_model(db_file):
+    audio = make_audio(60, seed=1)
+    url = "https://www.youtube.com/watch?v=a"
+    save_to_db(url, "A", "2025-01-01T00:00:00Z", "text", db_file, model="small")
+    save_fingerprint(db_file, url, compute_fingerprint(audio))
+
+    assert find_match(db_file, compute_fingerprint(audio), model_size="medium") is None
+    assert find_match(db_file, compute_fingerprint(audio), model_size="small")["Model"] == "small"
+    assert find_match(db_file, compute_fingerprint(audio), model_size="base")["URL"] == url
+
+def test_find_match_ignores_fake_transcripts(db_file):
+    audio = make_audio(60, seed=1)
+    url = "https://www.youtube.com/watch?v=a"
+    save_to_db(url, "A", "2025-01-01T00:00:00Z", "Fake segment 1.", db_file, model="medium", backend="fake")
+    save_fingerprint(db_file, url, compute_fingerprint(audio))
+
+    assert find_match(db_file, compute_fingerprint(audio)) is None
+
+def make_segment(start, end, text):
+    return Segment(id=0, seek=0, start=start, end=end, text=text, tokens=[], avg_logprob=-0.2,
+                   compression_ratio=1.0, no_speech_prob=0.01, words=None, temperature=0.0)
+
+def test_reuse_transcript_cuts_and_shifts_segments(db_file):
+    url = "https://www.youtube.com/watch?v=stream"
+    save_to_db(url, "Stream", "2025-01-01T00:00:00Z", "one two three four", db_file,
+               segments=[make_segment(0, 10, " one"), make_segment(10, 20, " two"), make_segment(20, 31, " three"),
+                         make_segment(31, 40, " four")])
+
+    audio_text, segments = reuse_transcript(db_file, {"URL": url, "Offset": 9.0, "Duration": 20.0})
+
+    assert audio_text == "two three"
+    assert [(s.start, s.end) for s in segments] == [(1.0, 11.0), (11.0, 20.0)]
+
+    # Reused segments can be stored like transcribed ones
+    save_to_db("https://www.youtube.com/watch?v=short", "Short", "2025-01-02T00:00:00Z", audio_text, db_file,
+               segments=segments)
+    assert [s["Text"] for s in get_segments(db_file, "https://www.youtube.com/watch?v=short")] == ["two", "three"]
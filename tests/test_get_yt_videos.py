@@ -1,6 +1,6 @@
 import pytest
 from datetime import datetime
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from video_to_text.exceptions import YouTubeAPIException
 from video_to_text.get_yt_videos import (
@@ -9,8 +9,15 @@ from video_to_text.get_yt_videos import (
     get_channel_videos,
     parse_duration,
     get_video_duration,
-    get_uploads_playlist_id
+    get_video_durations,
+    get_uploads_playlist_id,
+    list_channel_videos
 )
+from video_to_text.youtube_client import YouTubeClient
+
+@pytest.fixture
+def client():
+    return MagicMock(spec=YouTubeClient)
 
 @pytest.fixture
 def fake_videos():
@@ -90,7 +97,7 @@ def test_get_single_video_success(api_key):
 
 def test_get_single_video_failure(api_key):
     video_id="test"
-    videos = get_single_video(video_id, api_key)
+    videos = get_single_video(video_id, api_key, client=YouTubeClient(sleep=lambda delay: None))
 
     assert videos == []
 
@@ -107,17 +114,16 @@ def test_get_single_video_failure(api_key):
     ],
 )
 @patch("video_to_text.get_yt_videos.get_uploads_playlist_id")
-@patch("video_to_text.get_yt_videos.get_video_duration")
-@patch("video_to_text.get_yt_videos.requests.get")
+@patch("video_to_text.get_yt_videos.get_video_durations")
 def test_get_channel_videos_duration_filter(
-        mock_get, mock_duration, mock_playlist_id,
+        mock_duration, mock_playlist_id, client,
         mock_duration_val, min_d, max_d, should_skip
 ):
     # Arrange
-    mock_duration.return_value = mock_duration_val
+    mock_duration.side_effect = lambda video_ids, api_key, **kwargs: {v: mock_duration_val for v in video_ids}
     mock_playlist_id.return_value = "fake-playlist-id"
 
-    mock_get.return_value.json.return_value = {
+    client.get.return_value = {
         "items": [
             {
                 "id": {"videoId": "vid123"},
@@ -138,7 +144,8 @@ def test_get_channel_videos_duration_filter(
         api_key="fake_key",
         max_num_of_videos=1,
         min_duration=min_d,
-        max_duration=max_d
+        max_duration=max_d,
+        client=client
     )
 
     # Assert
@@ -149,16 +156,15 @@ def test_get_channel_videos_duration_filter(
         assert videos[0]["Title"] == "Sample Video"
 
 @patch("video_to_text.get_yt_videos.get_uploads_playlist_id")
-@patch("video_to_text.get_yt_videos.get_video_duration")
-@patch("video_to_text.get_yt_videos.requests.get")
-def test_get_channel_videos_returns_all_when_min_video_is_none(mock_get, mock_duration, mock_playlist_id, fake_videos):
+@patch("video_to_text.get_yt_videos.get_video_durations")
+def test_get_channel_videos_returns_all_when_min_video_is_none(mock_duration, mock_playlist_id, client, fake_videos):
     # Mock video duration shorter than MIN_VIDEO_DURATION
     mock_duration.return_value = 10
     mock_playlist_id.return_value = "fake-playlist-id"
 
-    mock_get.return_value.json.return_value = fake_videos
+    client.get.return_value = fake_videos
 
-    videos = get_channel_videos(channel_id="channel123", api_key="fake_key", max_num_of_videos=None)
+    videos = get_channel_videos(channel_id="channel123", api_key="fake_key", max_num_of_videos=None, client=client)
     assert len(videos) == 3
     assert videos == [
         {
@@ -179,18 +185,17 @@ def test_get_channel_videos_returns_all_when_min_video_is_none(mock_get, mock_du
     ]
 
 @patch("video_to_text.get_yt_videos.get_uploads_playlist_id")
-@patch("video_to_text.get_yt_videos.get_video_duration")
-@patch("video_to_text.get_yt_videos.requests.get")
-def test_get_channel_videos_no_video_present(mock_get, mock_duration, mock_playlist_id):
+@patch("video_to_text.get_yt_videos.get_video_durations")
+def test_get_channel_videos_no_video_present(mock_duration, mock_playlist_id, client):
     # Mock video duration shorter than MIN_VIDEO_DURATION
     mock_duration.return_value = 10
     mock_playlist_id.return_value = "fake-playlist-id"
 
-    mock_get.return_value.json.return_value = {
+    client.get.return_value = {
         "items": []
     }
 
-    videos = get_channel_videos(channel_id="channel123", api_key="fake_key", max_num_of_videos=1)
+    videos = get_channel_videos(channel_id="channel123", api_key="fake_key", max_num_of_videos=1, client=client)
     assert videos == []
 
 @pytest.mark.parametrize(
@@ -219,39 +224,139 @@ def test_get_channel_videos_no_video_present(mock_get, mock_duration, mock_playl
     ],
 )
 @patch("video_to_text.get_yt_videos.get_uploads_playlist_id")
-@patch("video_to_text.get_yt_videos.get_video_duration")
-@patch("video_to_text.get_yt_videos.requests.get")
-def test_get_channel_videos_date_range(mock_get, mock_duration, mock_playlist_id, fake_videos,
+@patch("video_to_text.get_yt_videos.get_video_durations")
+def test_get_channel_videos_date_range(mock_duration, mock_playlist_id, client, fake_videos,
                                        start_date, end_date, expected_titles):
     mock_duration.return_value = 10
     mock_playlist_id.return_value = "fake-playlist-id"
 
-    mock_get.return_value.json.return_value = fake_videos
+    client.get.return_value = fake_videos
 
     videos = get_channel_videos(channel_id="channel123",
                                 api_key="fake_key",
                                 max_num_of_videos=None,
                                 start_date=start_date,
-                                end_date=end_date)
+                                end_date=end_date,
+                                client=client)
     titles = [v["Title"] for v in videos]
     assert sorted(titles) == sorted(expected_titles)
 
-@patch("video_to_text.get_yt_videos.requests.get")
-def test_get_video_duration_success(mock_get):
-    mock_get.return_value.json.return_value = {
+def test_get_video_duration_success(client):
+    client.get.return_value = {
         "items": [
             {"contentDetails": {"duration": "PT5M"}}
         ]
     }
 
-    duration = get_video_duration("video123", "fake_key")
+    duration = get_video_duration("video123", "fake_key", client=client)
     assert duration == 300
 
-@patch("video_to_text.get_yt_videos.requests.get")
-def test_get_video_duration_invalid(mock_get):
-    mock_get.return_value.json.return_value = {
+def test_get_video_duration_invalid(client):
+    client.get.return_value = {
         "items": []
     }
 
-    duration = get_video_duration("video123", "fake_key")
+    duration = get_video_duration("video123", "fake_key", client=client)
     assert duration == 0
+
+def test_get_video_durations_batches_ids(client):
+    video_ids = [f"video{i}" for i in range(120)]
+    client.get.side_effect = [
+        {"items": [{"id": v, "contentDetails": {"duration": "PT1M"}} for v in video_ids[:50]]},
+        {"items": [{"id": v, "contentDetails": {"duration": "PT2M"}} for v in video_ids[50:100]]},
+        {"items": [{"id": v, "contentDetails": {"duration": "PT3M"}} for v in video_ids[100:]]},
+    ]
+
+    durations = get_video_durations(video_ids, "fake_key", client=client)
+
+    assert client.get.call_count == 3
+    requested_ids = [c.kwargs["params"]["id"].split(",") for c in client.get.call_args_list]
+    assert requested_ids == [video_ids[:50], video_ids[50:100], video_ids[100:]]
+    assert durations["video0"] == 60
+    assert durations["video119"] == 180
+    assert len(durations) == 120
+
+@patch("video_to_text.get_yt_videos.get_uploads_playlist_id")
+def test_get_channel_videos_single_duration_request_per_page(mock_playlist_id, client, fake_videos):
+    mock_playlist_id.return_value = "fake-playlist-id"
+    client.get.side_effect = [
+        fake_videos,
+        {"items": [
+            {"id": "video123", "contentDetails": {"duration": "PT10M"}},
+            {"id": "video234", "contentDetails": {"duration": "PT30S"}},
+            {"id": "video345", "contentDetails": {"duration": "PT20M"}},
+        ]},
+    ]
+
+    videos = get_channel_videos(channel_id="channel123", api_key="fake_key", max_num_of_videos=None, min_duration=60,
+                                client=client)
+
+    assert client.get.call_count == 2
+    assert client.get.call_args_list[1].kwargs["params"]["id"] == "video123,video234,video345"
+    assert [v["Title"] for v in videos] == ["1st Video", "3rd Video"]
+
+def test_get_single_video_list_of_ids(client):
+    client.get.return_value = {
+        "items": [
+            {"id": "video123", "snippet": {"title": "1st Video", "publishedAt": "2025-01-25T00:00:00Z"}},
+            {"id": "video234", "snippet": {"title": "2nd Video", "publishedAt": "2025-01-26T00:00:00Z"}},
+        ]
+    }
+
+    videos = get_single_video(["video123", "video234"], "fake_key", client=client)
+
+    assert client.get.call_count == 1
+    assert client.get.call_args.kwargs["params"]["id"] == "video123,video234"
+    assert [v["URL"] for v in videos] == [
+        "https://www.youtube.com/watch?v=video123",
+        "https://www.youtube.com/watch?v=video234",
+    ]
+
+@patch("video_to_text.get_yt_videos.get_uploads_playlist_id")
+def test_list_channel_videos_stops_at_synced_upload(mock_playlist_id, client, fake_videos):
+    mock_playlist_id.return_value = "fake-playlist-id"
+    client.get.return_value = {**fake_videos, "nextPageToken": "page2"}
+
+    videos, newest_upload = list_channel_videos(channel_id="channel123",
+                                                api_key="fake_key",
+                                                max_num_of_videos=None,
+                                                until_video_id="video234",
+                                                client=client)
+
+    assert client.get.call_count == 1
+    assert [v["Title"] for v in videos] == ["1st Video"]
+    assert newest_upload == {"VideoId": "video123", "PublishedAt": "2025-01-25T00:00:00Z"}
+
+@patch("video_to_text.get_yt_videos.get_uploads_playlist_id")
+def test_list_channel_videos_stops_at_older_upload(mock_playlist_id, client):
+    mock_playlist_id.return_value = "fake-playlist-id"
+    client.get.return_value = {
+        "nextPageToken": "page2",
+        "items": [
+            {"contentDetails": {"videoId": "new"}, "snippet": {"title": "New", "publishedAt": "2025-02-01T00:00:00Z"}},
+            {"contentDetails": {"videoId": "old"}, "snippet": {"title": "Old", "publishedAt": "2025-01-01T00:00:00Z"}},
+        ]
+    }
+
+    videos, _ = list_channel_videos(channel_id="channel123",
+                                    api_key="fake_key",
+                                    max_num_of_videos=None,
+                                    until_video_id="deleted-video",
+                                    until_published_at=datetime(2025, 1, 15),
+                                    client=client)
+
+    assert client.get.call_count == 1
+    assert [v["Title"] for v in videos] == ["New"]
+
+@patch("video_to_text.get_yt_videos.get_uploads_playlist_id")
+def test_get_channel_videos_excludes_urls(mock_playlist_id, client, fake_videos):
+    mock_playlist_id.return_value = "fake-playlist-id"
+    client.get.return_value = fake_videos
+
+    videos = get_channel_videos(channel_id="channel123",
+                                api_key="fake_key",
+                                max_num_of_videos=2,
+                                exclude_urls={"https://www.youtube.com/watch?v=video123"},
+                                client=client)
+
+    assert [v["Title"] for v in videos] == ["2nd Video", "3rd Video"]
@@ -1,7 +1,10 @@
+import math
 import pytest
 from datetime import datetime
 
-from video_to_text.helper import convert_iso_to_datetime
+from faster_whisper.transcribe import Segment
+
+from video_to_text.helper import convert_iso_to_datetime, format_timestamp, segment_to_dict
 
 @pytest.mark.parametrize(
     "iso_date, expected_results",
@@ -22,3 +25,22 @@ def test_convert_iso_to_datetime(iso_date, expected_results):
     assert isinstance(result, datetime)
     assert not result.tzinfo
     assert result == expected_results
+
+@pytest.mark.parametrize(
+    "seconds, expected_results",
+    [
+        (0, "0:00"),
+        (65.9, "1:05"),
+        (3725, "1:02:05")
+    ]
+)
+def test_format_timestamp(seconds, expected_results):
+    assert format_timestamp(seconds) == expected_results
+
+def test_segment_to_dict():
+    segment = Segment(id=3, seek=0, start=1.5, end=4.0, text=" Hello there ", tokens=[], avg_logprob=-0.5,
+                      compression_ratio=1.0, no_speech_prob=0.1, words=None, temperature=0.0)
+
+    assert segment_to_dict(segment, index=2) == {"Index": 2, "Start": 1.5, "End": 4.0, "Text": "Hello there",
+                                                 "AvgLogprob": -0.5, "NoSpeechProb": 0.1,
+                                                 "Confidence": math.exp(-0.5)}
@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+
+import pytest
+
+import video_to_text
+
+SRC = str(Path(video_to_text.__file__).resolve().parents[1])
+
+# Loaded by the stages needing them, never at import
+HEAVY_MODULES = ("faster_whisper", "ctranslate2", "av", "onnxruntime", "yt_dlp", "torch")
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    env = {key: value for key, value in os.environ.items() if key != "YOUTUBE_API_KEY"}
+    env["PYTHONPATH"] = SRC + os.pathsep + env.get("PYTHONPATH", "")
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, timeout=60)
+
+@pytest.mark.parametrize("module", ["video_to_text.entrypoint", "video_to_text.core", "video_to_text.cli.search"])
+def test_import_loads_no_heavy_modules(module):
+    result = run_python("-c", f"import json, sys, {module}; "
+                              f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout) == []
+
+@pytest.mark.parametrize("args", [["--help"], ["search", "--help"]])
+def test_cli_runs_without_api_key(args):
+    result = run_python("-m", "video_to_text.entrypoint", *args)
+
+    assert result.returncode == 0, result.stderr
+    assert "Usage:" in result.stdout
+
+def test_missing_api_key_fails_when_needed(monkeypatch):
+    from video_to_text import config
+
+    monkeypatch.delenv("YOUTUBE_API_KEY", raising=False)
+    monkeypatch.setattr("video_to_text.utils._env_loaded", True)
+
+    with pytest.raises(ValueError, match="YOUTUBE_API_KEY"):
+        config.get_youtube_api_key()
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from video_to_text.exceptions import JobsBusy, TranscriptionCancelled
+from video_to_text.jobs import CANCELLED, CANCELLING, COMPLETED, FAILED, QUEUED, RUNNING, JobManager
+
+def wait_for(job, statuses, timeout=2):
+    deadline = time.monotonic() + timeout
+    while job.status not in statuses:
+        assert time.monotonic() < deadline, f"job still {job.status}"
+        time.sleep(0.01)
+
+def test_job_reports_progress_and_results():
+    proceed = threading.Event()
+
+    def run(channel_name, cancel, on_listed, on_stored):
+        videos = [{"URL": f"{channel_name}/{i}"} for i in range(3)]
+        on_listed(videos)
+        on_stored(videos[0])
+        proceed.wait(timeout=2)
+        for video in videos[1:]:
+            on_stored(video)
+        return videos
+
+    manager = JobManager(run=run)
+    job = manager.submit(channel_name="NASA")
+
+    wait_for(job, [RUNNING])
+    while not job.transcriptions:
+        time.sleep(0.01)
+    assert job.to_dict()["progress"] == {"completed": 1, "total": 3}
+
+    proceed.set()
+    wait_for(job, [COMPLETED])
+    status = manager.get(job.id).to_dict()
+    assert status["progress"] == {"completed": 3, "total": 3}
+    assert [v["URL"] for v in status["transcriptions"]] == ["NASA/0", "NASA/1", "NASA/2"]
+    assert status["finished_at"]
+    manager.shutdown()
+
+def test_jobs_beyond_max_jobs_are_queued():
+    release = threading.Event()
+    running = []
+
+    def run(name, cancel, on_listed, on_stored):
+        running.append(name)
+        release.wait(timeout=2)
+
+    manager = JobManager(run=run, max_jobs=1)
+    first = manager.submit(name="first")
+    second = manager.submit(name="second")
+
+    wait_for(first, [RUNNING])
+    assert second.status == QUEUED
+    assert running == ["first"]
+
+    release.set()
+    wait_for(second, [COMPLETED])
+    assert running == ["first", "second"]
+    manager.shutdown()
+
+def test_slot_counts_towards_max_jobs():
+    manager = JobManager(run=lambda name, cancel, on_listed, on_stored: None, max_jobs=1)
+
+    with manager.slot():
+        job = manager.submit(name="queued")
+        time.sleep(0.1)
+        assert job.status == QUEUED
+        with pytest.raises(JobsBusy):
+            with manager.slot(blocking=False):
+                pass
+
+    wait_for(job, [COMPLETED])
+    manager.shutdown()
+
+def test_cancel_job_waiting_for_slot():
+    manager = JobManager(run=lambda name, cancel, on_listed, on_stored: None, max_jobs=1)
+
+    with manager.slot():
+        job = manager.submit(name="queued")
+        time.sleep(0.1)
+        manager.cancel(job.id)
+        wait_for(job, [CANCELLED])
+
+    # The slot of the cancelled job is free again
+    with manager.slot(blocking=False):
+        pass
+    manager.shutdown()
+
+def test_cancel_queued_and_running_jobs():
+    started = threading.Event()
+
+    def run(cancel, on_listed, on_stored):
+        started.set()
+        cancel.wait(timeout=2)
+        raise TranscriptionCancelled("cancelled")
+
+    manager = JobManager(run=run, max_jobs=1)
+    running = manager.submit()
+    queued = manager.submit()
+    started.wait(timeout=2)
+
+    assert manager.cancel(queued.id).status == CANCELLED
+    assert manager.cancel(running.id).status in (CANCELLING, CANCELLED)
+    wait_for(running, [CANCELLED])
+    assert manager.cancel("unknown") is None
+    manager.shutdown()
+
+def test_failed_job_records_error():
+    def run(cancel, on_listed, on_stored):
+        raise RuntimeError("channel not found")
+
+    manager = JobManager(run=run)
+    job = manager.submit()
+
+    wait_for(job, [FAILED])
+    assert job.error == "channel not found"
+    manager.shutdown()
+
+def test_finished_jobs_are_forgotten():
+    manager = JobManager(run=lambda cancel, on_listed, on_stored: [], max_finished=2)
+    jobs = [manager.submit() for _ in range(4)]
+    for job in jobs:
+        wait_for(job, [COMPLETED])
+
+    assert [job.id for job in manager.list()] == [job.id for job in jobs[2:]]
+    manager.shutdown()
+
+def test_rejects_invalid_max_jobs():
+    with pytest.raises(ValueError):
+        JobManager(run=lambda **kwargs: [], max_jobs=0)
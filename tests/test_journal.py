@@ -0,0 +1,77 @@
+import sqlite3
+
+from unittest.mock import patch
+
+import pytest
+
+from video_to_text.constants import JOURNAL_TABLE_NAME
+from video_to_text.database import init_db
+from video_to_text.journal import (DOWNLOADED, FAILED, QUEUED, STORED, finish_run, get_given_up_urls, get_journal,
+                                   get_unfinished, queue_videos, set_state, start_run)
+
+@pytest.fixture
+def db_file(tmp_path):
+    db_file = tmp_path / "transcripts.db"
+    init_db(db_file)
+    return db_file
+
+def make_video(i):
+    return {"URL": f"https://www.youtube.com/watch?v=video{i}", "Title": f"Video {i}",
+            "PublishedAt": "2025-01-01T00:00:00Z"}
+
+def test_journal_tracks_states(db_file):
+    queue_videos(db_file, [make_video(0), make_video(1)], run_id="run1", source="channel NASA")
+    set_state(db_file, make_video(0)["URL"], DOWNLOADED)
+    set_state(db_file, make_video(1)["URL"], STORED)
+
+    journal = get_journal(db_file, run_id="run1")
+
+    assert [(row["State"], row["Attempts"], row["Source"]) for row in journal] == [(DOWNLOADED, 0, "channel NASA"),
+                                                                                 (STORED, 0, "channel NASA")]
+
+def test_get_unfinished_in_queue_order(db_file):
+    queue_videos(db_file, [make_video(i) for i in range(4)], run_id="run1", source="channel NASA")
+    set_state(db_file, make_video(1)["URL"], STORED)
+    set_state(db_file, make_video(2)["URL"], FAILED, error="HTTP Error 403")
+
+    assert get_unfinished(db_file, max_attempts=3) == [make_video(0), make_video(2), make_video(3)]
+
+def test_failed_attempts_survive_requeue(db_file):
+    url = make_video(0)["URL"]
+    for run in range(3):
+        queue_videos(db_file, [make_video(0)], run_id=f"run{run}", source="video video0")
+        set_state(db_file, url, FAILED, error=f"attempt {run}")
+
+    assert get_unfinished(db_file, max_attempts=3) == []
+    assert get_given_up_urls(db_file, max_attempts=3) == {url}
+
+    row = get_journal(db_file)[0]
+    assert (row["Attempts"], row["Error"], row["RunId"]) == (3, "attempt 2", "run2")
+
+    queue_videos(db_file, [make_video(0)], run_id="run3", source="video video0")
+    row = get_journal(db_file)[0]
+    assert (row["State"], row["Attempts"], row["Error"]) == (QUEUED, 3, None)
+
+def test_get_unfinished_leaves_videos_of_live_runs(db_file):
+    queue_videos(db_file, [make_video(0), make_video(1)], run_id="live", source="channel NASA")
+    set_state(db_file, make_video(1)["URL"], FAILED, error="HTTP Error 403")
+
+    start_run("live")
+    try:
+        # A failed video is done with, whether its run is still going or not
+        assert get_unfinished(db_file, max_attempts=3) == [make_video(1)]
+    finally:
+        finish_run("live")
+
+    assert get_unfinished(db_file, max_attempts=3) == [make_video(0), make_video(1)]
+
+@pytest.mark.parametrize("error,resumed", [(None, False), (ProcessLookupError, True), (PermissionError, False)])
+def test_get_unfinished_checks_owner_of_other_processes(db_file, error, resumed):
+    queue_videos(db_file, [make_video(0)], run_id="other", source="channel NASA")
+    with sqlite3.connect(db_file) as conn:
+        conn.execute(f"UPDATE {JOURNAL_TABLE_NAME} SET owner_pid = ?", (2 ** 22 + 1,))
+
+    with patch("video_to_text.journal.os.kill", side_effect=error) as kill:
+        assert get_unfinished(db_file, max_attempts=3) == ([make_video(0)] if resumed else [])
+
+    kill.assert_called_once_with(2 ** 22 + 1, 0)
@@ -0,0 +1,120 @@
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from faster_whisper.transcribe import Segment
+
+from video_to_text.long_audio import (ParallelTranscriber, close_parallel_transcribers, get_parallel_transcriber,
+                                      plan_chunks, stitch_segments)
+
+SAMPLE_RATE = 16000
+
+def make_segment(start, end, text):
+    return Segment(id=0, seek=0, start=start, end=end, text=text, tokens=[], avg_logprob=-0.1,
+                   compression_ratio=1.0, no_speech_prob=0.0, words=None, temperature=0.0)
+
+def seconds(*spans):
+    return [{"start": int(s * SAMPLE_RATE), "end": int(e * SAMPLE_RATE)} for s, e in spans]
+
+def test_plan_chunks_cuts_in_silence():
+    speech = seconds((0, 40), (50, 90), (100, 130), (140, 200), (210, 230))
+
+    chunks = plan_chunks(speech, total_samples=240 * SAMPLE_RATE, chunk_samples=100 * SAMPLE_RATE)
+
+    assert chunks == [(0, 135 * SAMPLE_RATE), (135 * SAMPLE_RATE, 240 * SAMPLE_RATE)]
+
+def test_plan_chunks_covers_audio_without_speech():
+    assert plan_chunks([], total_samples=1000, chunk_samples=100) == [(0, 1000)]
+
+def test_plan_chunks_short_audio_is_single_chunk():
+    speech = seconds((1, 5), (6, 9))
+
+    assert plan_chunks(speech, total_samples=10 * SAMPLE_RATE, chunk_samples=300 * SAMPLE_RATE) == [
+        (0, 10 * SAMPLE_RATE)
+    ]
+
+def test_stitch_segments_drops_overlap():
+    first = ((0, 100 * SAMPLE_RATE), [make_segment(0, 50, "one"), make_segment(50, 99, "two"),
+                                      make_segment(99.5, 101, "three")])
+    # Padded chunk starts one second early and repeats the segment at the boundary
+    second = ((100 * SAMPLE_RATE, 200 * SAMPLE_RATE), [make_segment(98.9, 99.5, "two"),
+                                                       make_segment(99.5, 101, " Three"),
+                                                       make_segment(101, 150, "four")])
+
+    segments = stitch_segments([second, first])
+
+    assert [s.text.strip() for s in segments] == ["one", "two", "Three", "four"]
+    assert [s.id for s in segments] == [1, 2, 3, 4]
+    assert [s.start for s in segments] == [0, 50, 99.5, 101]
+
+def test_stitch_segments_drops_repeated_text_across_boundary():
+    first = ((0, 100 * SAMPLE_RATE), [make_segment(90, 99.8, "hello world")])
+    second = ((100 * SAMPLE_RATE, 200 * SAMPLE_RATE), [make_segment(99.0, 101.0, "Hello world")])
+
+    segments = stitch_segments([first, second])
+
+    assert [s.text for s in segments] == ["hello world"]
+
+class InlineExecutor:
+    """
+    Runs submitted chunks in the calling process, recording their arguments
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, function, audio, offset, transcribe_options):
+        self.calls.append((offset, transcribe_options))
+        future = Future()
+        future.set_result([make_segment(offset, offset + 1, f"chunk at {offset}")])
+        return future
+
+def test_parallel_transcriber_passes_options_to_every_chunk():
+    transcriber = ParallelTranscriber(model_size="tiny", workers=2, compute_type="int8_float32", chunk_seconds=100,
+                                      padding_seconds=0)
+    executor = InlineExecutor()
+    speech = seconds((0, 90), (110, 190), (210, 290))
+
+    with patch.object(transcriber, "_get_executor", return_value=executor), \
+         patch("faster_whisper.vad.get_speech_timestamps", return_value=speech):
+        segments = transcriber.transcribe(np.zeros(300 * SAMPLE_RATE, dtype=np.float32), beam_size=1)
+
+    assert [options for _, options in executor.calls] == [{"beam_size": 1}] * 2
+    assert len(segments) == 2
+    assert transcriber.compute_type == "int8_float32"
+    assert ParallelTranscriber(model_size="tiny", workers=2).compute_type == "int8"
+
+def test_get_parallel_transcriber_keeps_one_pool():
+    first = get_parallel_transcriber(model_size="tiny", workers=2)
+    assert get_parallel_transcriber(model_size="tiny", workers=2, compute_type="int8") is first
+
+    with patch.object(first, "close") as close:
+        second = get_parallel_transcriber(model_size="base", workers=2)
+    close.assert_called_once_with()
+
+    with patch.object(second, "close") as close:
+        close_parallel_transcribers()
+    close.assert_called_once_with()
+    assert get_parallel_transcriber(model_size="base", workers=2) is not second
+    close_parallel_transcribers()
+
+def test_close_waits_for_running_transcription():
+    transcriber = ParallelTranscriber(model_size="tiny", workers=1, padding_seconds=0)
+    executor = InlineExecutor()
+    shutdowns = []
+
+    def submit(function, audio, offset, transcribe_options):
+        # Closed while the chunks are being transcribed
+        transcriber.close()
+        shutdowns.append(executor.shutdown.call_count)
+        return InlineExecutor.submit(executor, function, audio, offset, transcribe_options)
+
+    with patch("video_to_text.long_audio.ProcessPoolExecutor", return_value=executor), \
+         patch("faster_whisper.vad.get_speech_timestamps", return_value=[]):
+        executor.submit = submit
+        executor.shutdown = Mock()
+        transcriber.transcribe(np.zeros(10 * SAMPLE_RATE, dtype=np.float32))
+
+    assert shutdowns == [0]
+    executor.shutdown.assert_called_once_with(cancel_futures=True)
@@ -0,0 +1,76 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from video_to_text.exceptions import ManifestError
+from video_to_text.manifest import load_manifest, parse_entry
+
+def test_load_json_manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps([
+        {"channel_name": "NASA", "max_videos": "all", "min_duration": 60},
+        {"video_id": "abc123"},
+    ]))
+
+    assert load_manifest(path) == [{"channel_name": "NASA", "max_videos": None, "min_duration": 60},
+                                   {"video_id": "abc123"}]
+
+def test_load_yaml_manifest(tmp_path):
+    path = tmp_path / "manifest.yaml"
+    path.write_text("entries:\n"
+                    "  - channel_name: NASA\n"
+                    "    max_videos: 5\n"
+                    "    start_date: 2025-01-01\n"
+                    "  - video_id: abc123\n")
+
+    entries = load_manifest(path)
+
+    assert entries[0] == {"channel_name": "NASA", "max_videos": 5, "start_date": datetime(2025, 1, 1)}
+    assert entries[1] == {"video_id": "abc123"}
+
+def test_load_csv_manifest_skips_empty_cells(tmp_path):
+    path = tmp_path / "manifest.csv"
+    path.write_text("channel_name,video_id,max_videos,end_date\n"
+                    "NASA,,20,2025-06-30\n"
+                    ",abc123,,\n")
+
+    assert load_manifest(path) == [{"channel_name": "NASA", "max_videos": 20, "end_date": datetime(2025, 6, 30)},
+                                   {"video_id": "abc123"}]
+
+def test_load_manifest_unknown_format(tmp_path):
+    path = tmp_path / "manifest.txt"
+    path.write_text("NASA")
+
+    with pytest.raises(ValueError, match="Unsupported manifest format"):
+        load_manifest(path)
+
+def test_load_manifest_without_entries(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text("[]")
+
+    with pytest.raises(ValueError, match="doesn't list any entries"):
+        load_manifest(path)
+
+@pytest.mark.parametrize(
+    "entry, message",
+    [
+        ({"channel_name": "NASA", "video_id": "abc123"}, "either channel_name or video_id"),
+        ({"max_videos": 5}, "either channel_name or video_id"),
+        ({"channel_name": "NASA", "max_videos": 0}, "max_videos must be an integer"),
+        ({"channel_name": "NASA", "min_duration": "long"}, "min_duration must be an integer"),
+        ({"channel_name": "NASA", "max_videos": 2.5}, "entry 3: max_videos must be an integer"),
+        ({"channel_name": "NASA", "max_videos": True}, "entry 3: max_videos must be an integer"),
+        ({"channel_name": "NASA", "max_duration": 60.5}, "entry 3: max_duration must be an integer"),
+        ({"channel_name": "NASA", "start_date": "01/01/2025"}, "start_date must be a date"),
+        ({"channel_name": "NASA", "channel": "typo"}, "unknown key"),
+        ("NASA", "must be a mapping"),
+    ],
+)
+def test_parse_entry_invalid(entry, message):
+    with pytest.raises(ManifestError, match=message):
+        parse_entry(entry, line=3)
+
+def test_parse_entry_accepts_integral_floats():
+    assert parse_entry({"channel_name": "NASA", "max_videos": 3.0, "min_duration": "60"}) == \
+        {"channel_name": "NASA", "max_videos": 3, "min_duration": 60}
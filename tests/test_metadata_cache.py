@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from video_to_text.database import init_db
+from video_to_text.get_yt_videos import get_channel_id, get_single_video, get_uploads_playlist_id, get_video_durations
+from video_to_text.metadata_cache import MetadataCache
+from video_to_text.youtube_client import YouTubeClient
+
+class Clock:
+    def __init__(self):
+        self.time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.time
+
+@pytest.fixture
+def db_file(tmp_path):
+    db_file = tmp_path / "transcripts.db"
+    init_db(db_file)
+    return db_file
+
+@pytest.fixture
+def client():
+    return MagicMock(spec=YouTubeClient)
+
+def test_cache_round_trip_and_expiry(db_file):
+    clock = Clock()
+    cache = MetadataCache(db_file, ttl_seconds={"video": 60}, now=clock)
+    cache.set_many("video", {"a": {"Title": "A"}, "b": {"Title": "B"}})
+
+    assert cache.get_many("video", ["a", "b", "c"]) == {"a": {"Title": "A"}, "b": {"Title": "B"}}
+    assert cache.get("channel_id", "a") is None
+
+    clock.time += timedelta(seconds=61)
+    assert cache.get("video", "a") is None
+
+def test_refresh_ignores_but_replaces_entries(db_file):
+    MetadataCache(db_file).set("channel_id", "nasa", "old")
+
+    refreshing = MetadataCache(db_file, refresh=True)
+    assert refreshing.get("channel_id", "nasa") is None
+    refreshing.set("channel_id", "nasa", "new")
+
+    assert MetadataCache(db_file).get("channel_id", "nasa") == "new"
+
+def test_channel_lookups_hit_api_once(db_file, client):
+    client.get.side_effect = [
+        {"items": [{"snippet": {"channelId": "UC123"}}]},
+        {"items": [{"contentDetails": {"relatedPlaylists": {"uploads": "UU123"}}}]},
+    ]
+
+    for _ in range(2):
+        cache = MetadataCache(db_file)
+        assert get_channel_id("@NASA", "fake_key", client=client, cache=cache) == "UC123"
+        assert get_uploads_playlist_id("UC123", "fake_key", client=client, cache=cache) == "UU123"
+
+    assert client.get.call_count == 2
+    # The channel name is matched case-insensitively
+    assert get_channel_id("nasa", "fake_key", client=client, cache=MetadataCache(db_file)) == "UC123"
+
+def test_video_details_only_fetch_uncached_ids(db_file, client):
+    cache = MetadataCache(db_file)
+    client.get.return_value = {"items": [
+        {"id": "a", "snippet": {"title": "A", "publishedAt": "2025-01-01T00:00:00Z"},
+         "contentDetails": {"duration": "PT1M"}},
+    ]}
+    assert get_video_durations(["a"], "fake_key", client=client, cache=cache) == {"a": 60}
+
+    client.get.return_value = {"items": [
+        {"id": "b", "snippet": {"title": "B", "publishedAt": "2025-01-02T00:00:00Z"},
+         "contentDetails": {"duration": "PT2M"}},
+    ]}
+    videos = get_single_video(["a", "b"], "fake_key", client=client, cache=cache)
+
+    assert client.get.call_args.kwargs["params"]["id"] == "b"
+    assert [v["Title"] for v in videos] == ["A", "B"]
+
+    client.get.reset_mock()
+    assert get_video_durations(["a", "b"], "fake_key", client=client, cache=cache) == {"a": 60, "b": 120}
+    client.get.assert_not_called()
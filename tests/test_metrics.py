@@ -0,0 +1,81 @@
+import pytest
+
+from video_to_text.database import init_db
+from video_to_text.metrics import Metrics, RunRecorder, get_stage_summary
+
+@pytest.fixture
+def db_file(tmp_path):
+    db_file = tmp_path/"test.db"
+    init_db(db_file=db_file)
+    return db_file
+
+def test_render_counters():
+    metrics = Metrics()
+    metrics.inc("video_to_text_videos_total", status="stored")
+    metrics.inc("video_to_text_videos_total", status="stored")
+    metrics.inc("video_to_text_videos_total", status="failed")
+
+    text = metrics.render()
+
+    assert "# TYPE video_to_text_videos_total counter" in text
+    assert 'video_to_text_videos_total{status="stored"} 2' in text
+    assert 'video_to_text_videos_total{status="failed"} 1' in text
+
+def test_render_histogram_buckets_are_cumulative():
+    metrics = Metrics()
+    for seconds in (0.2, 3.0, 4000.0):
+        metrics.observe("video_to_text_stage_seconds", seconds, stage="decode")
+
+    lines = metrics.render().splitlines()
+
+    assert 'video_to_text_stage_seconds_bucket{stage="decode",le="0.1"} 0' in lines
+    assert 'video_to_text_stage_seconds_bucket{stage="decode",le="0.5"} 1' in lines
+    assert 'video_to_text_stage_seconds_bucket{stage="decode",le="5"} 2' in lines
+    assert 'video_to_text_stage_seconds_bucket{stage="decode",le="3600"} 2' in lines
+    assert 'video_to_text_stage_seconds_bucket{stage="decode",le="+Inf"} 3' in lines
+    assert 'video_to_text_stage_seconds_sum{stage="decode"} 4003.2' in lines
+    assert 'video_to_text_stage_seconds_count{stage="decode"} 3' in lines
+
+def test_recorder_persists_and_observes(db_file):
+    metrics = Metrics()
+    recorder = RunRecorder(db_file=db_file, run_id="run1", metrics=metrics)
+
+    recorder.record(stage="download", seconds=2.0, video_url="a", source="channel NASA", num_bytes=4 * 1024 ** 2)
+    recorder.record(stage="download", seconds=2.0, video_url="b", source="channel NASA", num_bytes=2 * 1024 ** 2)
+    recorder.record(stage="decode", seconds=10.0, video_url="a", audio_seconds=100.0)
+    RunRecorder(db_file=db_file, run_id="run2", metrics=metrics).record(stage="decode", seconds=1.0)
+
+    summary = get_stage_summary(db_file=db_file, run_id="run1")
+
+    assert [row["Stage"] for row in summary] == ["download", "decode"]
+    assert summary[0]["Count"] == 2
+    assert summary[0]["MBPerSecond"] == 1.5
+    assert summary[1]["RealtimeFactor"] == 10.0
+    assert "video_to_text_download_bytes_total 6291456" in metrics.render()
+
+def test_recorder_stage_context(db_file):
+    recorder = RunRecorder(db_file=db_file, run_id="run1", metrics=Metrics())
+
+    with recorder.stage("db_write", video_url="a") as extra:
+        extra["Bytes"] = 10
+    with pytest.raises(RuntimeError):
+        with recorder.stage("decode", video_url="a"):
+            raise RuntimeError("failed")
+
+    summary = get_stage_summary(db_file=db_file, run_id="run1")
+    # Failed stages aren't recorded
+    assert [row["Stage"] for row in summary] == ["db_write"]
+
+def test_recorder_rejects_unknown_stages(db_file):
+    with pytest.raises(ValueError, match="Unknown stage"):
+        RunRecorder(db_file=db_file, run_id="run1", metrics=Metrics()).record(stage="upload", seconds=1.0)
+
+def test_stage_summary_percentile(db_file):
+    recorder = RunRecorder(db_file=db_file, run_id="run1", metrics=Metrics())
+    for seconds in range(1, 21):
+        recorder.record(stage="decode", seconds=float(seconds), video_url=str(seconds))
+
+    summary = get_stage_summary(db_file=db_file, run_id="run1")
+
+    assert summary[0]["P95Seconds"] == 19.0
+    assert summary[0]["MeanSeconds"] == 10.5
@@ -0,0 +1,178 @@
+import numpy as np
+import pytest
+
+from unittest.mock import patch
+
+from faster_whisper.transcribe import Segment
+
+from video_to_text.audio_to_text import transcribe_segments
+from video_to_text.backends import Capabilities
+from video_to_text.constants import WHISPER_SAMPLE_RATE
+from video_to_text.model_policy import (Decoding, ModelPolicy, estimate_decode_seconds, get_model_policy,
+                                        model_ladder, segment_confidence)
+
+def make_segment(start, end, text="", avg_logprob=-0.1, no_speech_prob=0.0):
+    return Segment(id=1, seek=0, start=start, end=end, text=text, tokens=[], avg_logprob=avg_logprob,
+                   compression_ratio=1.0, no_speech_prob=no_speech_prob, words=None, temperature=0.0)
+
+class ScriptedBackend:
+    """
+    Emits one segment per 10 seconds of audio. The fast pass is unsure about the segments starting
+    at the seconds in unclear, larger models score them retry_avg_logprob. Texts name the model and
+    start time.
+    """
+    name = "scripted"
+    capabilities = Capabilities(streaming=True, needs_model=False)
+
+    def __init__(self, unclear=(), retry_avg_logprob=-0.1):
+        self.unclear = set(unclear)
+        self.retry_avg_logprob = retry_avg_logprob
+        self.calls = []
+
+    def load(self, model_size="tiny", compute_type=None):
+        pass
+
+    def transcribe(self, audio, model_size="tiny", chunk_workers=0, batch_size=0, beam_size=5, compute_type=None):
+        if not isinstance(audio, np.ndarray):
+            audio = np.concatenate(list(audio))
+        self.calls.append((model_size, beam_size, len(audio) / WHISPER_SAMPLE_RATE))
+        for start in range(0, len(audio), 10 * WHISPER_SAMPLE_RATE):
+            end = min(start + 10 * WHISPER_SAMPLE_RATE, len(audio))
+            second = int(audio[start])
+            if second not in self.unclear:
+                avg_logprob = -0.1
+            else:
+                avg_logprob = -1.2 if model_size == "base" else self.retry_avg_logprob
+            yield make_segment(start / WHISPER_SAMPLE_RATE, end / WHISPER_SAMPLE_RATE, text=f"{model_size}@{second}",
+                               avg_logprob=avg_logprob)
+
+def make_audio(seconds):
+    # Every sample holds the second of the audio it belongs to
+    return np.repeat(np.arange(seconds, dtype=np.float32), WHISPER_SAMPLE_RATE)
+
+def test_get_model_policy():
+    assert get_model_policy("fixed") is None
+    assert get_model_policy("adaptive", fast_model="tiny", cpu_budget=60) == ModelPolicy(fast_model="tiny",
+                                                                                        cpu_budget=60)
+    with pytest.raises(ValueError, match="Unknown model policy"):
+        get_model_policy("fastest")
+
+def test_model_ladder():
+    assert model_ladder("medium") == ["tiny", "base", "small", "medium"]
+    assert model_ladder("large-v3") == ["tiny", "base", "small", "medium", "large-v3"]
+    assert model_ladder("small.en") == ["tiny.en", "base.en", "small.en"]
+    assert model_ladder("/models/custom") == ["/models/custom"]
+
+def test_estimate_decode_seconds():
+    assert estimate_decode_seconds("base", 600, beam_size=1) == pytest.approx(30)
+    assert estimate_decode_seconds("base", 600, beam_size=5) == pytest.approx(45)
+
+def test_fast_pass_without_budget():
+    assert ModelPolicy().fast_pass("medium", duration=3600) == Decoding("base", beam_size=1)
+
+def test_fast_pass_never_larger_than_model_size():
+    # The fast model would be the only pass, so it searches beams like the fixed policy
+    assert ModelPolicy(fast_model="small").fast_pass("base") == Decoding("base", beam_size=5)
+
+def test_fast_pass_shrinks_for_long_videos():
+    policy = ModelPolicy(fast_model="base", cpu_budget=60)
+
+    assert policy.fast_pass("medium", duration=600).model_size == "base"
+    assert policy.fast_pass("medium", duration=3600).model_size == "tiny"
+    # Nothing fits, the smallest model is used anyway
+    assert policy.fast_pass("medium", duration=36000).model_size == "tiny"
+
+def test_retry_picks_largest_model_within_budget():
+    policy = ModelPolicy(cpu_budget=100)
+    fast = Decoding("base", beam_size=1)
+
+    assert policy.retry("medium", fast, seconds=60) == Decoding("medium", beam_size=5)
+    assert policy.retry("medium", fast, seconds=60, spent=80).model_size == "small"
+    assert policy.retry("medium", fast, seconds=60, spent=99) is None
+    assert ModelPolicy().retry("base", fast, seconds=60) is None
+
+def test_needs_retry():
+    policy = ModelPolicy()
+
+    assert policy.needs_retry(make_segment(0, 1, avg_logprob=-1.0))
+    assert not policy.needs_retry(make_segment(0, 1, avg_logprob=-0.2))
+    # Probably music, a larger model won't find words in it either
+    assert not policy.needs_retry(make_segment(0, 1, avg_logprob=-1.0, no_speech_prob=0.9))
+
+def test_segment_confidence_weights_by_duration():
+    segments = [make_segment(0, 9, avg_logprob=-0.1), make_segment(9, 10, avg_logprob=-1.0)]
+
+    assert segment_confidence(segments) == pytest.approx(-0.19)
+    assert segment_confidence([]) == float("-inf")
+
+def test_adaptive_keeps_confident_fast_pass():
+    backend = ScriptedBackend()
+
+    segments = list(transcribe_segments(audio=make_audio(30), model_size="medium", backend=backend,
+                                        model_policy=ModelPolicy()))
+
+    assert [s.text for s in segments] == ["base@0", "base@10", "base@20"]
+    assert backend.calls == [("base", 1, 30.0)]
+
+def test_adaptive_retries_runs_of_unsure_segments():
+    backend = ScriptedBackend(unclear={10, 20, 40})
+
+    segments = list(transcribe_segments(audio=make_audio(50), model_size="medium", backend=backend,
+                                        model_policy=ModelPolicy()))
+
+    assert [s.text for s in segments] == ["base@0", "medium@10", "medium@20", "base@30", "medium@40"]
+    assert [(s.start, s.end) for s in segments] == [(0, 10), (10, 20), (20, 30), (30, 40), (40, 50)]
+    assert [s.id for s in segments] == [1, 2, 3, 4, 5]
+    assert backend.calls[1:] == [("medium", 5, 20.0), ("medium", 5, 10.0)]
+
+def test_adaptive_keeps_fast_pass_when_retry_is_less_confident():
+    backend = ScriptedBackend(unclear={0}, retry_avg_logprob=-2.0)
+
+    segments = list(transcribe_segments(audio=make_audio(10), model_size="medium", backend=backend,
+                                        model_policy=ModelPolicy()))
+
+    assert [s.text for s in segments] == ["base@0"]
+    assert backend.calls[1:] == [("medium", 5, 10.0)]
+
+def test_adaptive_stays_within_cpu_budget():
+    backend = ScriptedBackend(unclear={0, 10, 20})
+    # The fast pass of 30 s with base takes 1.5 s, retrying all of it with small 5.6 s and medium 15 s
+    policy = ModelPolicy(cpu_budget=8)
+
+    segments = list(transcribe_segments(audio=make_audio(30), model_size="medium", backend=backend,
+                                        model_policy=policy))
+
+    assert [s.text for s in segments] == ["small@0", "small@10", "small@20"]
+
+def test_adaptive_streamed_audio():
+    backend = ScriptedBackend(unclear={20})
+    chunks = np.split(make_audio(40), 8)
+
+    segments = list(transcribe_segments(audio=iter(chunks), model_size="small", backend=backend,
+                                        model_policy=ModelPolicy()))
+
+    assert [s.text for s in segments] == ["base@0", "base@10", "small@20", "base@30"]
+
+def test_adaptive_same_model_keeps_no_audio():
+    backend = ScriptedBackend(unclear={0, 10})
+    chunks = np.split(make_audio(40), 8)
+
+    with patch("video_to_text.audio_to_text._KeptAudio") as kept:
+        segments = list(transcribe_segments(audio=iter(chunks), model_size="base", backend=backend,
+                                            model_policy=ModelPolicy(fast_model="base")))
+
+    # Nothing can be transcribed again, so the stream isn't buffered
+    kept.assert_not_called()
+    assert len(segments) == 4
+    assert backend.calls == [("base", 5, 40.0)]
+
+def test_adaptive_same_model_passes_file_through():
+    backend = ScriptedBackend()
+    backend.transcribe = lambda audio, **options: iter([audio])
+
+    with patch("faster_whisper.decode_audio") as decode_audio:
+        segments = list(transcribe_segments(audio="talk.m4a", model_size="tiny", backend=backend,
+                                            model_policy=ModelPolicy()))
+
+    decode_audio.assert_not_called()
+    assert segments == ["talk.m4a"]
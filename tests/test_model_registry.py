@@ -0,0 +1,91 @@
+import pytest
+
+from video_to_text.model_registry import ModelRegistry, estimate_model_memory, get_compute_type, model_covers
+
+@pytest.fixture
+def loads():
+    return []
+
+@pytest.fixture
+def registry(loads):
+    def loader(model_size, device, compute_type):
+        loads.append((model_size, device, compute_type))
+        return object()
+
+    return ModelRegistry(loader=loader)
+
+def test_get_loads_model_once(registry, loads):
+    first = registry.get("medium", device="cpu")
+    second = registry.get("medium", device="cpu")
+
+    assert first is second
+    assert loads == [("medium", "cpu", "int8")]
+
+def test_get_keys_on_size_device_and_compute_type(registry, loads):
+    registry.get("medium", device="cpu")
+    registry.get("medium", device="cpu", compute_type="float32")
+    registry.get("small", device="cpu")
+
+    assert len(loads) == 3
+    assert len(registry.loaded()) == 3
+
+def test_warmup_loads_models(registry, loads):
+    keys = registry.warmup(["tiny", "base"], device="cpu")
+
+    assert keys == [("tiny", "cpu", "int8"), ("base", "cpu", "int8")]
+    assert registry.loaded() == keys
+    registry.get("tiny", device="cpu")
+    assert len(loads) == 2
+
+def test_memory_budget_evicts_least_recently_used(loads):
+    registry = ModelRegistry(memory_budget_mb=900, loader=lambda *key: loads.append(key) or object())
+
+    registry.get("small", device="cpu")
+    registry.get("base", device="cpu")
+    registry.get("small", device="cpu")
+    registry.get("tiny", device="cpu")
+    registry.get("small", device="cpu")
+
+    assert [key[0] for key in registry.loaded()] == ["tiny", "small"]
+    assert registry.memory_in_use() <= 900
+
+def test_memory_budget_keeps_models_in_use(loads):
+    registry = ModelRegistry(memory_budget_mb=1000, loader=lambda *key: object())
+
+    with registry.acquire("small", device="cpu"):
+        registry.get("base", device="cpu")
+        registry.get("tiny", device="cpu")
+        assert ("small", "cpu", "int8") in registry.loaded()
+
+def test_evict_idle(registry):
+    with registry.acquire("tiny", device="cpu"):
+        registry.get("base", device="cpu")
+        evicted = registry.evict_idle()
+
+    assert evicted == [("base", "cpu", "int8")]
+    assert registry.loaded() == [("tiny", "cpu", "int8")]
+
+@pytest.mark.parametrize(
+    "model_size, expected",
+    [
+        ("tiny", 150),
+        ("large-v3", 3200),
+        ("/models/small", 600),
+        ("custom-model", 1600),
+    ],
+)
+def test_estimate_model_memory(model_size, expected):
+    assert estimate_model_memory(model_size) == expected
+
+def test_get_compute_type():
+    assert get_compute_type("cpu") == "int8"
+    assert get_compute_type("cuda") == "float16"
+
+def test_model_covers():
+    assert model_covers("large-v3", "medium")
+    assert model_covers("medium", "medium")
+    assert not model_covers("small", "medium")
+    assert not model_covers(None, "tiny")
+    # Unknown models only cover themselves
+    assert model_covers("/models/custom", "/models/custom")
+    assert not model_covers("/models/custom", "tiny")
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+
+from video_to_text.exceptions import TranscriptionCancelled
+from video_to_text.pipeline import Pipeline
+
+def make_videos(n):
+    return [{"URL": f"https://www.youtube.com/watch?v=video{i}"} for i in range(n)]
+
+def test_pipeline_returns_results_in_input_order():
+    released = []
+
+    def download(video):
+        # Later videos finish downloading first
+        time.sleep(0.01 * (5 - int(video["URL"][-1])))
+        return video["URL"]
+
+    pipeline = Pipeline(download=download,
+                        transcribe=lambda video, audio: f"text of {audio}",
+                        store=lambda video, text: text,
+                        release=released.append,
+                        download_workers=3,
+                        transcribe_workers=2)
+
+    results = pipeline.run(make_videos(5))
+
+    assert results == [f"text of https://www.youtube.com/watch?v=video{i}" for i in range(5)]
+    assert sorted(released) == sorted(v["URL"] for v in make_videos(5))
+
+def test_pipeline_downloads_while_transcribing():
+    second_downloaded = threading.Event()
+    overlapped = []
+
+    def download(video):
+        if video["URL"].endswith("1"):
+            second_downloaded.set()
+        return video
+
+    def transcribe(video, audio):
+        if video["URL"].endswith("0"):
+            # The next download must complete while the first video is being transcribed
+            overlapped.append(second_downloaded.wait(timeout=2))
+        return "text"
+
+    Pipeline(download=download, transcribe=transcribe, store=lambda v, t: t).run(make_videos(2))
+
+    assert overlapped == [True]
+
+def test_pipeline_prefetch_is_bounded():
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+
+    def download(video):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        return video
+
+    def transcribe(video, audio):
+        time.sleep(0.01)
+        return "text"
+
+    def release(audio):
+        with lock:
+            in_flight[0] -= 1
+
+    Pipeline(download=download, transcribe=transcribe, store=lambda v, t: t, release=release,
+             download_workers=4, transcribe_workers=1, prefetch=2).run(make_videos(10))
+
+    assert peak[0] <= 3
+    assert in_flight[0] == 0
+
+def test_pipeline_raises_first_error_and_stops():
+    stored = []
+
+    def transcribe(video, audio):
+        if video["URL"].endswith("1"):
+            raise RuntimeError("transcription failed")
+        return "text"
+
+    pipeline = Pipeline(download=lambda video: video,
+                        transcribe=transcribe,
+                        store=lambda video, text: stored.append(video),
+                        prefetch=0)
+
+    with pytest.raises(RuntimeError, match="transcription failed"):
+        pipeline.run(make_videos(20))
+
+    assert len(stored) < 20
+
+def test_pipeline_single_writer():
+    writers = set()
+
+    def store(video, text):
+        writers.add(threading.current_thread().name)
+        return text
+
+    Pipeline(download=lambda v: v, transcribe=lambda v, a: "text", store=store,
+             download_workers=3, transcribe_workers=3).run(make_videos(10))
+
+    assert writers == {"store"}
+
+def test_pipeline_rejects_invalid_worker_counts():
+    with pytest.raises(ValueError):
+        Pipeline(download=lambda v: v, transcribe=lambda v, a: a, store=lambda v, t: t, download_workers=0)
+
+def test_pipeline_cancel_keeps_finished_results():
+    cancel = threading.Event()
+    stored = []
+
+    def store(video, text):
+        stored.append(video)
+        # Cancel once the first video is stored
+        cancel.set()
+        return video
+
+    pipeline = Pipeline(download=lambda v: v, transcribe=lambda v, a: "text", store=store, prefetch=0)
+
+    with pytest.raises(TranscriptionCancelled):
+        pipeline.run(make_videos(20), cancel=cancel, on_result=lambda result: None)
+
+    assert 1 <= len(stored) < 20
+
+def test_pipeline_reports_results_as_they_are_stored():
+    reported = []
+
+    results = Pipeline(download=lambda v: v, transcribe=lambda v, a: "text",
+                       store=lambda v, t: v["URL"]).run(make_videos(3), on_result=reported.append)
+
+    assert sorted(reported) == sorted(results)
+
+def test_pipeline_cancel_after_last_video_does_not_raise():
+    cancel = threading.Event()
+
+    def store(video, text):
+        if video["URL"].endswith("2"):
+            cancel.set()
+        return video
+
+    results = Pipeline(download=lambda v: v, transcribe=lambda v, a: "text", store=store,
+                       prefetch=0).run(make_videos(3), cancel=cancel)
+
+    assert len(results) == 3
+
+def test_pipeline_on_error_skips_failed_videos():
+    failed = []
+
+    def download(video):
+        if video["URL"].endswith("1"):
+            raise IOError("download failed")
+        return video
+
+    def store(video, text):
+        if video["URL"].endswith("3"):
+            raise RuntimeError("could not save")
+        return video["URL"]
+
+    pipeline = Pipeline(download=download, transcribe=lambda v, a: "text", store=store, download_workers=2)
+    results = pipeline.run(make_videos(5), on_error=lambda video, e: failed.append((video["URL"][-1], str(e))))
+
+    assert results == [f"https://www.youtube.com/watch?v=video{i}" for i in (0, 2, 4)]
+    assert sorted(failed) == [("1", "download failed"), ("3", "could not save")]
+
+def test_pipeline_on_error_does_not_swallow_cancellation():
+    def transcribe(video, audio):
+        raise TranscriptionCancelled("cancelled")
+
+    pipeline = Pipeline(download=lambda v: v, transcribe=transcribe, store=lambda v, t: t)
+
+    with pytest.raises(TranscriptionCancelled):
+        pipeline.run(make_videos(2), on_error=lambda video, e: None)
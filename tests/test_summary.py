@@ -0,0 +1,36 @@
+from video_to_text.cli.summary import format_stage_summary, format_summary
+
+def make_row(source, transcribed=2, failed=0, error=None):
+    return {"Source": source, "Listed": transcribed + failed, "Transcribed": transcribed, "Reused": 0, "Failed": failed,
+            "AudioSeconds": 600.0, "WallSeconds": 60.0 if transcribed else 0.0,
+            "VideosPerHour": 120.0 if transcribed else None, "RealtimeFactor": 10.0 if transcribed else None,
+            "Error": error}
+
+def test_format_summary():
+    table = format_summary([make_row("channel NASA"), make_row("video abc123", transcribed=1, failed=1)])
+    lines = table.splitlines()
+
+    assert lines[0].split() == ["Source", "Listed", "Transcribed", "Reused", "Failed", "AudioSeconds",
+                                "WallSeconds", "VideosPerHour", "RealtimeFactor"]
+    assert lines[1].split() == ["channel", "NASA", "2", "2", "0", "0", "600.0", "60.0", "120.0", "10.0"]
+    assert lines[-1].split() == ["total", "4", "3", "0", "1", "1200.0"]
+
+def test_format_summary_lists_failed_sources():
+    table = format_summary([make_row("channel Missing", transcribed=0, error="Channel not found")])
+
+    assert "-" in table.splitlines()[1].split()
+    assert table.splitlines()[-1] == "Failed channel Missing: Channel not found"
+
+def test_format_stage_summary():
+    table = format_stage_summary([
+        {"Stage": "download", "Count": 2, "TotalSeconds": 4.0, "MeanSeconds": 2.0, "P95Seconds": 3.0,
+         "MBPerSecond": 1.5, "RealtimeFactor": None},
+        {"Stage": "decode", "Count": 2, "TotalSeconds": 60.0, "MeanSeconds": 30.0, "P95Seconds": 40.0,
+         "MBPerSecond": None, "RealtimeFactor": 10.0},
+    ])
+    lines = table.splitlines()
+
+    assert lines[0].split() == ["Stage", "Count", "TotalSeconds", "MeanSeconds", "P95Seconds", "MBPerSecond",
+                                "RealtimeFactor"]
+    assert lines[1].split() == ["download", "2", "4.0", "2.0", "3.0", "1.5", "-"]
+    assert lines[2].split() == ["decode", "2", "60.0", "30.0", "40.0", "-", "10.0"]
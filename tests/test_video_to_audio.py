@@ -0,0 +1,81 @@
+import sys
+
+import numpy as np
+import pytest
+
+from unittest.mock import MagicMock, patch
+
+from video_to_text.video_to_audio import AudioStream, download_audio, get_download_options
+
+def test_native_format_has_no_postprocessors():
+    opts = get_download_options(tempdir="/tmp/audio", audio_format="native")
+
+    assert "postprocessors" not in opts
+    assert opts["outtmpl"].startswith("/tmp/audio/")
+
+def test_pcm_format_resamples_to_16khz_mono():
+    opts = get_download_options(tempdir="/tmp/audio", audio_format="pcm")
+
+    assert opts["postprocessors"][0]["preferredcodec"] == "wav"
+    assert opts["postprocessor_args"]["extractaudio"] == ["-ar", "16000", "-ac", "1"]
+
+def test_mp3_format_is_archival_quality():
+    opts = get_download_options(tempdir="/tmp/audio", audio_format="mp3")
+
+    assert opts["postprocessors"][0]["preferredcodec"] == "mp3"
+    assert opts["postprocessors"][0]["preferredquality"] == "192"
+
+def test_unsupported_format():
+    with pytest.raises(ValueError):
+        get_download_options(tempdir="/tmp/audio", audio_format="flac")
+
+def test_download_audio_records_bytes_and_transcode_time():
+    def youtube_dl(opts):
+        def extract_info(url):
+            opts["progress_hooks"][0]({"status": "downloading", "downloaded_bytes": 100})
+            opts["progress_hooks"][0]({"status": "finished", "total_bytes": 4096})
+            opts["postprocessor_hooks"][0]({"status": "started", "postprocessor": "ExtractAudio"})
+            opts["postprocessor_hooks"][0]({"status": "finished", "postprocessor": "ExtractAudio"})
+            return {"requested_downloads": [{"filepath": "/tmp/audio/a.wav"}]}
+
+        ydl = MagicMock()
+        ydl.__enter__.return_value.extract_info.side_effect = extract_info
+        return ydl
+
+    stats = {}
+    with patch("yt_dlp.YoutubeDL", side_effect=youtube_dl):
+        path = download_audio("https://www.youtube.com/watch?v=a", "/tmp/audio", audio_format="pcm", stats=stats)
+
+    assert path == "/tmp/audio/a.wav"
+    assert stats["DownloadBytes"] == 4096
+    assert stats["TranscodeSeconds"] >= 0.0
+    assert "_transcode_started" not in stats
+
+def test_audio_stream_yields_float32_chunks():
+    samples = np.arange(40000, dtype=np.float32)
+    download_cmd = [sys.executable, "-c",
+                    "import sys, numpy as np; sys.stdout.buffer.write(np.arange(40000, dtype=np.float32).tobytes())"]
+
+    with AudioStream("https://www.youtube.com/watch?v=video123", chunk_seconds=1,
+                     download_cmd=download_cmd, decode_cmd=["cat"]) as stream:
+        chunks = list(stream)
+
+    assert [len(c) for c in chunks] == [16000, 16000, 8000]
+    assert np.array_equal(np.concatenate(chunks), samples)
+    stats = stream.stats()
+    assert (stats["DownloadBytes"], stats["AudioSeconds"]) == (160000, 2.5)
+    assert stats["DownloadSeconds"] >= 0.0
+
+def test_audio_stream_starts_on_first_read():
+    stream = AudioStream("https://www.youtube.com/watch?v=video123", download_cmd=["false"], decode_cmd=["cat"])
+
+    assert stream.stats() == {"DownloadBytes": 0, "DownloadSeconds": None, "AudioSeconds": 0.0}
+    stream.close()
+
+def test_audio_stream_raises_when_download_fails():
+    download_cmd = [sys.executable, "-c", "import sys; sys.exit(1)"]
+
+    with AudioStream("https://www.youtube.com/watch?v=video123",
+                     download_cmd=download_cmd, decode_cmd=["cat"]) as stream:
+        with pytest.raises(RuntimeError):
+            list(stream)
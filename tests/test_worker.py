@@ -0,0 +1,118 @@
+import json
+import os
+import socket
+import stat
+import threading
+
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from video_to_text.audio_cache import AudioCache
+from video_to_text.exceptions import WorkerError, WorkerUnavailable
+from video_to_text.model_policy import ModelPolicy
+from video_to_text.worker import WorkerServer, decode_params, encode_params, is_running, submit
+
+SUMMARY = [{"Source": "video abc", "Listed": 1, "Transcribed": 1, "Reused": 0, "Failed": 0, "AudioSeconds": 60.0,
+            "WallSeconds": 6.0, "VideosPerHour": 600.0, "RealtimeFactor": 10.0, "Error": None}]
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return tmp_path/"worker.sock"
+
+@pytest.fixture
+def server(socket_path):
+    server = WorkerServer(socket_path=socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+def test_socket_only_accessible_to_user(socket_path):
+    previous = os.umask(0o022)
+    try:
+        server = WorkerServer(socket_path=socket_path)
+        # The umask is only changed while the socket is created
+        assert os.umask(0o022) == 0o022
+    finally:
+        os.umask(previous)
+
+    assert stat.S_IMODE(socket_path.stat().st_mode) == 0o600
+    server.server_close()
+
+def test_params_round_trip(tmp_path):
+    cache = AudioCache(directory=tmp_path/"cache", max_bytes=1024)
+    params = {"sources": [{"channel_name": "NASA", "start_date": datetime(2024, 1, 1), "end_date": None}],
+              "output_dir": tmp_path/"out",
+              "model_size": "tiny",
+              "audio_cache": cache,
+              "model_policy": ModelPolicy(fast_model="tiny", cpu_budget=60.0)}
+
+    decoded = decode_params(json.loads(json.dumps(encode_params(params))))
+
+    assert decoded["sources"] == params["sources"]
+    assert decoded["output_dir"] == (tmp_path/"out").resolve()
+    assert decoded["model_size"] == "tiny"
+    assert decoded["audio_cache"].directory == cache.directory.resolve()
+    assert decoded["audio_cache"].max_bytes == 1024
+    assert decoded["model_policy"] == params["model_policy"]
+
+def test_not_running(socket_path):
+    assert not is_running(socket_path)
+    with pytest.raises(WorkerUnavailable):
+        submit({"sources": []}, socket_path=socket_path)
+
+def test_submit_runs_batch_on_worker(server, socket_path, tmp_path):
+    def run_batch(**params):
+        params["on_stored"]({"URL": "https://www.youtube.com/watch?v=abc", "Title": "abc"})
+        return [], SUMMARY
+
+    stored = []
+    with patch("video_to_text.core.run_batch", side_effect=run_batch) as mock:
+        summary = submit({"sources": [{"video_id": "abc"}], "output_dir": tmp_path}, socket_path=socket_path,
+                         on_stored=stored.append)
+
+    assert is_running(socket_path)
+    assert summary == SUMMARY
+    assert stored == [{"URL": "https://www.youtube.com/watch?v=abc", "Title": "abc"}]
+    assert mock.call_args.kwargs["sources"] == [{"video_id": "abc"}]
+    assert mock.call_args.kwargs["output_dir"] == tmp_path.resolve()
+
+def test_submit_raises_worker_errors(server, socket_path):
+    with patch("video_to_text.core.run_batch", side_effect=ValueError("Streaming transcription can't keep an MP3")):
+        with pytest.raises(WorkerError, match="MP3"):
+            submit({"sources": []}, socket_path=socket_path)
+
+def test_disconnect_cancels_batch(server, socket_path):
+    started, cancelled = threading.Event(), threading.Event()
+
+    def run_batch(cancel, **params):
+        started.set()
+        if cancel.wait(timeout=5):
+            cancelled.set()
+        return [], []
+
+    with patch("video_to_text.core.run_batch", side_effect=run_batch):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(str(socket_path))
+        client.sendall(b'{"command": "run_batch", "params": {"sources": []}}\n')
+        assert started.wait(timeout=5)
+        client.close()
+
+        assert cancelled.wait(timeout=5)
+
+def test_replaces_stale_socket(socket_path):
+    socket_path.touch()
+
+    server = WorkerServer(socket_path=socket_path)
+    server.server_close()
+
+    assert not Path(socket_path).exists()
+
+def test_refuses_second_worker(server, socket_path):
+    with pytest.raises(WorkerError, match="already listening"):
+        WorkerServer(socket_path=socket_path)
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+import requests
+
+from video_to_text.exceptions import YouTubeAPIException
+from video_to_text.youtube_client import YouTubeClient
+
+def make_response(status, body=None, headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = json.dumps(body or {}).encode()
+    resp.headers.update(headers or {})
+    resp.url = "https://www.googleapis.com/youtube/v3/videos"
+    return resp
+
+class FakeSession:
+    """
+    Stand-in for requests.Session replaying queued responses (or exceptions)
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, params, headers, timeout):
+        self.requests.append({"url": url, "params": params, "headers": headers})
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        pass
+
+def make_client(*responses, **kwargs):
+    sleeps = []
+    client = YouTubeClient(session=FakeSession(*responses), sleep=sleeps.append, **kwargs)
+    return client, sleeps
+
+def test_retries_transient_errors_with_backoff():
+    client, sleeps = make_client(make_response(503), make_response(500), make_response(200, {"items": [1]}))
+
+    assert client.get("videos", params={"id": "a"}) == {"items": [1]}
+    assert sleeps == [1.0, 2.0]
+    assert client.stats()["videos"]["retries"] == 2
+    assert client.stats()["videos"]["errors"] == 2
+
+def test_honours_retry_after():
+    client, sleeps = make_client(make_response(429, headers={"Retry-After": "7"}), make_response(200))
+
+    client.get("videos", params={})
+
+    assert sleeps == [7.0]
+
+def test_retries_rate_limit_but_not_exhausted_quota():
+    rate_limited = {"error": {"message": "Slow down", "errors": [{"reason": "rateLimitExceeded"}]}}
+    quota_exceeded = {"error": {"message": "Quota exceeded", "errors": [{"reason": "quotaExceeded"}]}}
+    client, sleeps = make_client(make_response(403, rate_limited), make_response(403, quota_exceeded))
+
+    with pytest.raises(ValueError, match="Quota exceeded"):
+        client.get("videos", params={})
+
+    assert len(sleeps) == 1
+
+def test_gives_up_after_max_retries():
+    client, sleeps = make_client(*[make_response(503)] * 3, max_retries=2)
+
+    with pytest.raises(requests.HTTPError):
+        client.get("videos", params={})
+
+    assert len(sleeps) == 2
+
+def test_connection_errors_retried_less_and_wrapped():
+    client, sleeps = make_client(requests.ConnectionError("down"), requests.Timeout("slow"), make_response(200))
+
+    with pytest.raises(YouTubeAPIException, match="unreachable"):
+        client.get("videos", params={})
+
+    # One short retry instead of the backoff of HTTP errors
+    assert sleeps == [0.5]
+    # Requests that never reached the API are not charged
+    assert client.quota_used() == 0
+
+def test_other_request_errors_wrapped():
+    client, sleeps = make_client(requests.TooManyRedirects("loop"))
+
+    with pytest.raises(YouTubeAPIException):
+        client.get("videos", params={})
+
+    assert sleeps == []
+
+def test_revalidates_with_etag():
+    body = {"etag": "abc", "items": [{"id": "a"}]}
+    client, _ = make_client(make_response(200, body, headers={"ETag": "abc"}), make_response(304))
+
+    assert client.get("videos", params={"id": "a", "key": "one"}) == body
+    # The API key is not part of the resource
+    assert client.get("videos", params={"id": "a", "key": "two"}) == body
+
+    sent = client.session.requests
+    assert "If-None-Match" not in sent[0]["headers"]
+    assert sent[1]["headers"]["If-None-Match"] == "abc"
+    assert client.stats()["videos"]["not_modified"] == 1
+
+def test_accounts_quota_per_endpoint():
+    client, _ = make_client(make_response(200), make_response(200), make_response(200), etag_cache_size=0)
+
+    client.get("search", params={"q": "nasa"})
+    client.get("channels", params={"id": "a"})
+    client.get("playlistItems", params={"playlistId": "b"})
+
+    assert client.quota_used() == 102
+    assert client.stats()["search"]["requests"] == 1
+    assert client.stats()["search"]["latency"] >= 0